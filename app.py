@@ -5,6 +5,9 @@ app.py
 App Factory principal de Tutorín.
 """
 
+import os
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -14,6 +17,12 @@ from routes.analyze_prompt import router as analyze_router
 from routes.solve import router as solve_router
 from routes.analyze_image import router as image_router  # ✅ LÍNEA NUEVA
 from routes.reading_setup import router as reading_router  # ✅ Sistema de lectura
+from routes.metrics import router as metrics_router
+from routes.speak import router as speak_router
+from logic.core import metrics, timing
+from logic.core.uploads import UploadLimitMiddleware
+from logic.ai_reading import reading_jobs, reading_pool
+from modules import audio_utils
 
 def create_app() -> FastAPI:
     app = FastAPI(
@@ -37,6 +46,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Límite de tamaño de las subidas de imágenes (corta el cuerpo al recibirlo)
+    app.add_middleware(UploadLimitMiddleware)
+
     # ✅ AÑADIR: Middleware para asegurar UTF-8 en todas las respuestas
     @app.middleware("http")
     async def add_charset_to_content_type(request, call_next):
@@ -45,18 +57,64 @@ def create_app() -> FastAPI:
             response.headers["content-type"] = "application/json; charset=utf-8"
         return response
 
+    # Desglose de latencias por etapa → cabecera Server-Timing + histogramas
+    # y contadores de peticiones por ruta para /metrics.
+    # Se etiqueta con la ruta declarada (p. ej. "/solve/") para no disparar la cardinalidad.
+    route_templates = {}
+
+    @app.middleware("http")
+    async def add_server_timing(request, call_next):
+        token = timing.start_request()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            timings = timing.finish_request(token)
+            if not route_templates:
+                route_templates.update({getattr(r, "endpoint", None): r.path for r in app.routes})
+            route = route_templates.get(request.scope.get("endpoint"), "unmatched")
+            metrics.HTTP_REQUESTS.inc(route, request.method, status)
+            if timings is not None:
+                metrics.HTTP_LATENCY.observe(timings.elapsed_ms() / 1000.0, route)
+        if timings is not None:
+            response.headers["Server-Timing"] = timings.server_timing_header()
+        return response
+
     # Rutas principales
     app.include_router(analyze_router, prefix="/analyze", tags=["Analyze"])
     app.include_router(solve_router, prefix="/solve", tags=["Solve"])
     app.include_router(image_router, prefix="/analyze", tags=["Image Analysis"])  # ✅ LÍNEA NUEVA
     app.include_router(reading_router, prefix="/reading", tags=["Reading"])  # ✅ Comprensión lectora
+    app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+    app.include_router(speak_router, prefix="/speak", tags=["Speak"])
+
+    # Reserva de ejercicios de lectura pregenerados (hilos en segundo plano,
+    # solo con READING_POOL_ENABLED=1)
+    # y recuperación de trabajos asíncronos de /reading interrumpidos
+    @app.on_event("startup")
+    def start_reading_pool():
+        reading_jobs.recover_unfinished()
+        reading_pool.start_pool()
+
+    # Audios de las frases habituales (solo genera los que falten en TTS_CACHE_DIR)
+    @app.on_event("startup")
+    def prerender_tts_phrases():
+        if os.getenv("TTS_PRERENDER_ON_STARTUP", "1") == "1":
+            threading.Thread(
+                target=audio_utils.prerender_common_phrases, name="tts-prerender", daemon=True
+            ).start()
+
+    @app.on_event("shutdown")
+    def stop_reading_pool():
+        reading_pool.stop_pool()
 
     @app.get("/")
     def root():
         return {
             "message": "👋 Hola, soy Tutorín API.",
             "status": "online",
-            "routes": ["/analyze/text", "/analyze/image", "/solve", "/reading"]  # ✅ ACTUALIZADO
+            "routes": ["/analyze/text", "/analyze/image", "/solve", "/reading", "/speak", "/metrics"]
         }
 
     return app
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/
+Herramientas de rendimiento de Tutorín (benchmarks reproducibles).
+Ver benchmarks/run_benchmarks.py para el modo de uso.
+"""
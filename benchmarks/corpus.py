@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/corpus.py
+---------------------------------
+Corpus representativo de enunciados por motor para los benchmarks.
+
+Para cada motor hay operandos pequeños y grandes. Los problemas de texto
+(generic_engine) llevan su descomposición "enlatada", que devuelve el
+LLM simulado (benchmarks/stub_llm.py) para no depender de OpenAI.
+"""
+
+import json
+
+# ═══════════════════════════════════════════════════════════════
+# ENUNCIADOS POR MOTOR
+# ═══════════════════════════════════════════════════════════════
+
+ENGINE_PROMPTS = {
+    "addition_engine": ["25 + 37", "4 + 5", "32458 + 6541", "987654 + 123456"],
+    "subtraction_engine": ["45 - 18", "9 - 4", "32458 - 6541", "1000000 - 99999"],
+    "multiplication_engine": ["5 × 3", "47 * 6", "32547 * 23", "9876 * 543"],
+    "division_engine": ["24 / 6", "84 ÷ 4", "32547 / 52", "9876543 / 321"],
+    "fractions_engine": ["1/2 + 1/3", "5/6 + 4/8", "2/5 + 3/7", "17/24 - 5/36"],
+    "decimals_engine": ["2,5 + 1,25", "0.234 * 2", "0.235 / 2", "123.456 + 78.9"],
+    "percentages_engine": ["25% de 80", "10% de 50", "35% de 1240"],
+    "geometry_engine": [
+        "Calcula el área de un rectángulo de 8 cm de base y 5 cm de altura",
+        "Calcula el perímetro de un cuadrado de 7 cm de lado",
+        "Calcula el área de un círculo de 12 cm de radio",
+    ],
+    "measures_engine": ["Convierte 3 km a m", "Convierte 2500 g a kg", "Convierte 7 l a ml"],
+    "statistics_engine": [
+        "Calcula la probabilidad de sacar un 6 al lanzar un dado",
+        "En una encuesta 12 niños eligen fútbol y 8 baloncesto. ¿Cuál es la frecuencia?",
+    ],
+}
+
+# ═══════════════════════════════════════════════════════════════
+# PROBLEMAS DE TEXTO (generic_engine) CON DESCOMPOSICIÓN ENLATADA
+# ═══════════════════════════════════════════════════════════════
+
+def _decomposition(conocidos, desconocido, comprension, calculos, final, unidad=""):
+    pasos = [{
+        "numero": 0,
+        "tipo": "comprension",
+        "descripcion": "Entender el problema y los datos",
+        "operacion": "comprension",
+        "pregunta": "¿Qué nos pide calcular el problema?",
+        "respuesta_esperada": comprension,
+        "pista_contextual": "Fíjate en la pregunta final del problema.",
+    }]
+    for i, (operacion, valores, pregunta, esperada) in enumerate(calculos, start=1):
+        pasos.append({
+            "numero": i,
+            "tipo": "calculo",
+            "descripcion": f"Paso {i}: {operacion}",
+            "operacion": operacion,
+            "valores": valores,
+            "pregunta": pregunta,
+            "respuesta_esperada": esperada,
+            "explicacion_adicional": "",
+            "pista_contextual": f"Haz la {operacion} con {valores}.",
+        })
+    return {
+        "tipo_problema": "simple" if len(calculos) <= 2 else "medio",
+        "datos": {"conocidos": conocidos, "desconocido": desconocido},
+        "pasos": pasos,
+        "respuesta_final": final,
+        "unidad": unidad,
+    }
+
+
+WORD_PROBLEMS = {
+    "María tiene 5 caramelos y le dan 3 más. ¿Cuántos tiene ahora?": _decomposition(
+        ["María tiene 5 caramelos", "Le dan 3 más"], "cuántos caramelos tiene ahora",
+        "cuantos caramelos tiene",
+        [("suma", [5, 3], "¿Cuánto es 5 + 3?", "8")], "8", "caramelos",
+    ),
+    "En casa hay un cajón con 8 manteles. Al cabo de unos días se han ensuciado 6 manteles. ¿Cuántos manteles no se han ensuciado?": _decomposition(
+        ["Hay 8 manteles", "Se ensucian 6"], "cuántos manteles quedan limpios",
+        "cuantos manteles limpios",
+        [("resta", [8, 6], "¿Cuánto es 8 - 6?", "2")], "2", "manteles",
+    ),
+    "Una clase de 24 alumnos va de excursión. El autobús cuesta 360 euros y la entrada al museo 4 euros por alumno. ¿Cuánto paga cada alumno?": _decomposition(
+        ["24 alumnos", "Autobús: 360 euros", "Entrada: 4 euros por alumno"], "cuánto paga cada alumno",
+        "cuanto paga alumno",
+        [
+            ("division", [360, 24], "¿Cuánto es 360 ÷ 24?", "15"),
+            ("suma", [15, 4], "¿Cuánto es 15 + 4?", "19"),
+        ],
+        "19", "€",
+    ),
+}
+
+# ═══════════════════════════════════════════════════════════════
+# LECTURA
+# ═══════════════════════════════════════════════════════════════
+
+READING_EXERCISE = {
+    "text": (
+        "Los dinosaurios fueron animales fascinantes que vivieron hace millones de años. "
+        "Había muchos tipos diferentes, como el Tyrannosaurus Rex, que era carnívoro, "
+        "y el Triceratops, que era herbívoro. Los dinosaurios se extinguieron hace 65 "
+        "millones de años cuando un gran meteorito chocó contra la Tierra."
+    ),
+    "questions": [
+        {"q": "¿Cuándo vivieron los dinosaurios?", "answer": "hace millones de años", "type": "detail"},
+        {"q": "¿Cuál es la idea principal del texto?", "answer": "los dinosaurios y su extinción", "type": "main_idea"},
+        {"q": "¿Qué significa herbívoro?", "answer": "animal que come plantas", "type": "vocabulary"},
+        {"q": "¿Por qué se extinguieron los dinosaurios?", "answer": "por un meteorito", "type": "inference"},
+    ],
+}
+
+READING_PROMPT = json.dumps(READING_EXERCISE, ensure_ascii=False)
+
+# ═══════════════════════════════════════════════════════════════
+# PISTAS: módulo de hints → (área en hint_types.json, contexto de ejemplo)
+# ═══════════════════════════════════════════════════════════════
+
+HINT_MODULES = {
+    "hints_addition": ("suma", "32458 + 6541"),
+    "hints_subtraction": ("resta", "32458 - 6541"),
+    "hints_multiplication": ("multiplicacion", "32547 * 23"),
+    "hints_division": ("division", "32547 / 52"),
+    "hints_fractions": ("fracciones", "5/6 + 4/8 [FRAC:5/6+4/8]"),
+    "hints_decimals": ("decimales", "2,5 + 1,25"),
+    "hints_geometry": ("geometria", "área de un rectángulo de 8 por 5"),
+    "hints_measures": ("medidas", "Convierte 3 km a m"),
+    "hints_percentages": ("porcentajes", "25% de 80"),
+    "hints_statistics": ("estadistica", "probabilidad de sacar un 6 con un dado"),
+    "hints_reading": ("lectura", READING_EXERCISE["text"] + "|||¿Cuándo vivieron los dinosaurios?"),
+}
+
+
+def all_prompts():
+    """Todos los enunciados del corpus (para analyze_prompt)."""
+    prompts = [p for group in ENGINE_PROMPTS.values() for p in group]
+    prompts.extend(WORD_PROBLEMS.keys())
+    prompts.append(READING_PROMPT)
+    return prompts
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/loadgen.py
+---------------------------------
+Generador de carga que simula alumnos haciendo ejercicios completos en /solve/.
+
+Cada alumno virtual repite sesiones hasta que se acaba el tiempo:
+    1. Elige un motor según MIX_ENGINES y un enunciado del corpus
+       (o, con probabilidad --reading-ratio, crea un ejercicio en /reading/setup)
+    2. Primer turno sin respuesta
+    3. Turnos siguientes: acierta, falla o pide ayuda ("no sé") según MIX_ANSWERS,
+       hasta status "done" o --max-turns
+    4. Espera un tiempo de reflexión (--think-ms, exponencial) entre turnos
+
+Informe: peticiones/seg, sesiones completadas, latencias p50/p95/p99 por
+operación, tasa de error y crecimiento de la BD (filas y tamaño del fichero).
+
+Uso:
+    # Contra un servidor ya arrancado (p. ej. con el mock de OpenAI)
+    python -m benchmarks.loadgen --base-url http://127.0.0.1:8000 --students 50 --duration 60 \\
+        --db tutorin.db --output benchmarks/baselines/load_4workers.json
+
+    # En proceso, con el LLM simulado (sin servidor ni red)
+    python -m benchmarks.loadgen --in-process --students 20 --duration 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import corpus  # noqa: E402
+
+# Proporciones aproximadas de uso real por motor
+MIX_ENGINES = {
+    "addition_engine": 20,
+    "subtraction_engine": 15,
+    "multiplication_engine": 15,
+    "division_engine": 12,
+    "fractions_engine": 8,
+    "decimals_engine": 6,
+    "percentages_engine": 4,
+    "geometry_engine": 4,
+    "measures_engine": 4,
+    "statistics_engine": 2,
+    "generic_engine": 6,
+    "reading_engine": 4,
+}
+
+# Tipo de respuesta del alumno en cada turno (tras el primero)
+MIX_ANSWERS = {"correct": 60, "wrong": 25, "dont_know": 15}
+
+WRONG_ANSWER = "987654"
+DONT_KNOW = "no sé"
+
+
+# ═══════════════════════════════════════════════════════════════
+# ESTADÍSTICAS
+# ═══════════════════════════════════════════════════════════════
+
+class Stats:
+    """Latencias por operación, errores y contadores de la ejecución."""
+
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.requests = 0
+        self.sessions_started = 0
+        self.sessions_done = 0
+
+    def record(self, op: str, ms: float, error: Optional[str] = None) -> None:
+        self.requests += 1
+        self.latencies.setdefault(op, []).append(ms)
+        if error:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        ops = {}
+        for op, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            ops[op] = {
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 0.50), 2),
+                "p95_ms": round(_percentile(values, 0.95), 2),
+                "p99_ms": round(_percentile(values, 0.99), 2),
+                "max_ms": round(values[-1], 2),
+            }
+        total_errors = sum(self.errors.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": self.requests,
+            "requests_per_sec": round(self.requests / elapsed, 2) if elapsed else 0.0,
+            "sessions_started": self.sessions_started,
+            "sessions_done": self.sessions_done,
+            "error_rate": round(total_errors / self.requests, 4) if self.requests else 0.0,
+            "errors": self.errors,
+            "operations": ops,
+        }
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, int(round(p * len(sorted_values) + 0.5)) - 1)
+    return sorted_values[min(idx, len(sorted_values) - 1)]
+
+
+def db_snapshot(path: Optional[str]) -> Dict[str, Any]:
+    """Filas por tabla y tamaño del fichero SQLite (si se conoce la ruta)."""
+    if not path or not os.path.exists(path):
+        return {}
+    snapshot: Dict[str, Any] = {"bytes": os.path.getsize(path), "rows": {}}
+    conn = sqlite3.connect(path)
+    try:
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        for table in tables:
+            if table.startswith("sqlite_"):
+                continue
+            snapshot["rows"][table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+    return snapshot
+
+
+def _db_growth(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    if not after:
+        return {}
+    rows_before = before.get("rows", {})
+    return {
+        "bytes": after["bytes"] - before.get("bytes", 0),
+        "rows": {t: n - rows_before.get(t, 0) for t, n in after["rows"].items()},
+        "after": after,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# ALUMNO VIRTUAL
+# ═══════════════════════════════════════════════════════════════
+
+def _weighted(rng: random.Random, weights: Dict[str, int]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _prompt_for(engine: str, rng: random.Random) -> str:
+    if engine == "generic_engine":
+        return rng.choice(list(corpus.WORD_PROBLEMS))
+    if engine == "reading_engine":
+        return corpus.READING_PROMPT
+    return rng.choice(corpus.ENGINE_PROMPTS[engine])
+
+
+class Student:
+    def __init__(self, student_id: int, client: httpx.AsyncClient, stats: Stats, args: argparse.Namespace):
+        self.user_id = f"load-{student_id}"
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.rng = random.Random(args.seed * 1000 + student_id)
+
+    async def _post(self, op: str, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.post(path, timeout=self.args.timeout, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(op, (time.perf_counter() - t0) * 1000.0, type(e).__name__)
+            return None
+        ms = (time.perf_counter() - t0) * 1000.0
+        if r.status_code >= 400:
+            self.stats.record(op, ms, f"http_{r.status_code}")
+            return None
+        self.stats.record(op, ms)
+        return r.json()
+
+    async def _think(self) -> None:
+        if self.args.think_ms > 0:
+            await asyncio.sleep(self.rng.expovariate(1000.0 / self.args.think_ms))
+
+    async def _reading_setup(self) -> Optional[tuple]:
+        body = await self._post("reading_setup", "/reading/setup", json={
+            "text": corpus.READING_EXERCISE["text"],
+            "questions_text": "\n".join(
+                f"{i}. {q['q']}" for i, q in enumerate(corpus.READING_EXERCISE["questions"], 1)),
+            "level": "3",
+        })
+        if not body:
+            return None
+        # El ejercicio queda guardado: cada turno solo envía la referencia
+        return body["exercise_id"], f"reading:{body['exercise_id']}"
+
+    async def session(self) -> None:
+        self.stats.sessions_started += 1
+        if self.rng.random() < self.args.reading_ratio:
+            created = await self._reading_setup()
+            if not created:
+                return
+            exercise_id, question = created
+            op_prefix = "solve/reading_setup"
+        else:
+            engine = _weighted(self.rng, MIX_ENGINES)
+            question = _prompt_for(engine, self.rng)
+            exercise_id = f"{self.user_id}-{self.rng.getrandbits(48):012x}"
+            op_prefix = f"solve/{engine}"
+
+        payload = {"user_id": self.user_id, "exercise_id": exercise_id, "question": question, "last_answer": ""}
+        body = await self._post(f"{op_prefix}/first", "/solve/", json=payload)
+        for _ in range(self.args.max_turns):
+            if not body or body.get("status") == "done":
+                break
+            await self._think()
+            action = _weighted(self.rng, MIX_ANSWERS)
+            if action == "correct" and body.get("expected_answer"):
+                answer = str(body["expected_answer"])
+            elif action == "dont_know":
+                answer = DONT_KNOW
+            else:
+                action, answer = "wrong", WRONG_ANSWER
+            body = await self._post(f"{op_prefix}/{action}", "/solve/", json={**payload, "last_answer": answer})
+        if body and body.get("status") == "done":
+            self.stats.sessions_done += 1
+
+    async def run(self, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            await self.session()
+            await self._think()
+
+
+# ═══════════════════════════════════════════════════════════════
+# EJECUCIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def _in_process_app():
+    """Importa la app con BD temporal y LLM simulado (modo --in-process)."""
+    os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="tutorin_load_"), "load.db"))
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadgen")
+    from benchmarks import stub_llm
+    from app import app
+    stub_llm.install()
+    return app
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.in_process:
+        app = _in_process_app()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadgen"
+        db_path = args.db or os.environ["SQLITE_PATH"]
+    else:
+        transport = None
+        base_url = args.base_url
+        db_path = args.db
+
+    before = db_snapshot(db_path)
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.students, max_keepalive_connections=args.students)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits) as client:
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        students = [Student(i, client, stats, args) for i in range(args.students)]
+        if args.ramp_up > 0:
+            async def delayed(i: int, s: Student) -> None:
+                await asyncio.sleep(args.ramp_up * i / len(students))
+                await s.run(deadline)
+            await asyncio.gather(*(delayed(i, s) for i, s in enumerate(students)))
+        else:
+            await asyncio.gather(*(s.run(deadline) for s in students))
+        elapsed = time.perf_counter() - t0
+
+    report = stats.report(elapsed)
+    report["db_growth"] = _db_growth(before, db_snapshot(db_path))
+    report["meta"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": "in-process" if args.in_process else args.base_url,
+        "label": args.label,
+        "students": args.students,
+        "duration_s": args.duration,
+        "think_ms": args.think_ms,
+        "reading_ratio": args.reading_ratio,
+        "seed": args.seed,
+    }
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n📊 {report['requests']} peticiones en {report['elapsed_s']} s "
+          f"→ {report['requests_per_sec']} req/s | sesiones {report['sessions_done']}/{report['sessions_started']} "
+          f"completadas | error {report['error_rate']:.2%}")
+    if report["errors"]:
+        print(f"   errores: {report['errors']}")
+    width = max((len(op) for op in report["operations"]), default=10)
+    print(f"{'operación':<{width}}  {'n':>6}  {'p50':>9}  {'p95':>9}  {'p99':>9}")
+    for op, s in report["operations"].items():
+        print(f"{op:<{width}}  {s['count']:>6}  {s['p50_ms']:>9.1f}  {s['p95_ms']:>9.1f}  {s['p99_ms']:>9.1f}")
+    growth = report.get("db_growth")
+    if growth:
+        print(f"🗄️ BD: +{growth['bytes'] / 1024:.1f} KiB, filas nuevas {growth['rows']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generador de carga de Tutorín")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://127.0.0.1:8000", help="URL del servidor a probar")
+    target.add_argument("--in-process", action="store_true", help="Probar la app en proceso con el LLM simulado")
+    parser.add_argument("--students", type=int, default=20, help="Alumnos concurrentes")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duración en segundos")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Segundos para arrancar a todos los alumnos")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Tiempo medio de reflexión entre turnos")
+    parser.add_argument("--max-turns", type=int, default=15, help="Turnos máximos por sesión")
+    parser.add_argument("--reading-ratio", type=float, default=0.05, help="Fracción de sesiones con /reading/setup")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout por petición (s)")
+    parser.add_argument("--db", help="Ruta del SQLite del servidor (para medir su crecimiento)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="", help="Etiqueta de la configuración probada (workers, pool...)")
+    parser.add_argument("--output", help="Guardar el informe en JSON")
+    args = parser.parse_args(argv)
+
+    print(f"🚦 [LOAD] {args.students} alumnos durante {args.duration:.0f} s "
+          f"contra {'la app en proceso' if args.in_process else args.base_url}")
+    if args.in_process:
+        # Los print() de diagnóstico de la app irían a la misma consola
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            report = asyncio.run(run_load(args))
+    else:
+        report = asyncio.run(run_load(args))
+    print_report(report)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 [LOAD] Informe guardado en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
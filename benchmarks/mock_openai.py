@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/mock_openai.py
+---------------------------------
+Servidor local que imita la API de OpenAI para pruebas de carga sin red.
+
+Endpoints:
+    POST /v1/chat/completions      → respuestas enlatadas según el prompt
+                                     (con "stream": true, por SSE palabra a palabra)
+    POST /v1/audio/transcriptions  → transcripción fija
+    GET  /mock/stats               → peticiones, errores y tipos servidos
+    POST /mock/config              → cambia latencia / errores en caliente
+
+Respuestas enlatadas (se elige por el contenido del prompt):
+    decomposition   DECOMPOSITION_PROMPT de generic_engine (JSON de pasos)
+    reading_text    text_generator (texto plano)
+    questions       question_generator ({"questions": [...]})
+    answers         answer_generator ({"answers": [...]})
+    photo / photos  photo_parser (una foto / varias fotos)
+    exercise        analyze_image (transcripción del ejercicio)
+    hint            cualquier otro caso (pista en texto plano)
+
+Latencia (--latency):
+    fixed:200                 200 ms siempre
+    uniform:100,400           uniforme entre 100 y 400 ms
+    lognormal:800,0.5         log-normal con mediana 800 ms y sigma 0.5
+
+Inyección de errores:
+    --error-rate 0.05 --error-status 500   5 % de respuestas 500 (o 429...)
+    --hang-rate 0.01 --hang-seconds 120    1 % de peticiones que no responden a tiempo
+
+Uso:
+    python -m benchmarks.mock_openai --port 8099 --latency lognormal:800,0.5 --seed 1
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=sk-mock uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stub_llm import canned_response, prompt_text
+
+# ═══════════════════════════════════════════════════════════════
+# CONFIGURACIÓN
+# ═══════════════════════════════════════════════════════════════
+
+CONFIG: Dict[str, Any] = {
+    "latency": "fixed:0",
+    "error_rate": 0.0,
+    "error_status": 500,
+    "hang_rate": 0.0,
+    "hang_seconds": 120.0,
+    "seed": None,
+}
+
+_rng = random.Random()
+_rng_lock = threading.Lock()
+_stats: Dict[str, Any] = {"requests": 0, "errors": 0, "hangs": 0, "kinds": {}}
+
+
+def configure(**options: Any) -> None:
+    """Actualiza la configuración (valida el formato de latencia)."""
+    CONFIG.update({k: v for k, v in options.items() if v is not None})
+    _parse_latency(CONFIG["latency"])
+    if options.get("seed") is not None:
+        with _rng_lock:
+            _rng.seed(options["seed"])
+
+
+def _parse_latency(spec: str):
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: _rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda: _rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Latencia no válida: {spec!r} (fixed:MS | uniform:MIN,MAX | lognormal:MEDIANA,SIGMA)")
+
+
+def _draw() -> Dict[str, float]:
+    """Sortea latencia y fallos de una petición (bajo lock para que la semilla sea reproducible)."""
+    with _rng_lock:
+        return {
+            "latency_ms": max(0.0, _parse_latency(CONFIG["latency"])()),
+            "error": _rng.random() < float(CONFIG["error_rate"]),
+            "hang": _rng.random() < float(CONFIG["hang_rate"]),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# APP
+# ═══════════════════════════════════════════════════════════════
+
+app = FastAPI(title="Mock OpenAI (Tutorín)")
+
+
+async def _simulate() -> Optional[JSONResponse]:
+    """Aplica latencia y fallos. Devuelve una respuesta de error o None."""
+    draw = _draw()
+    _stats["requests"] += 1
+    if draw["hang"]:
+        _stats["hangs"] += 1
+        await asyncio.sleep(float(CONFIG["hang_seconds"]))
+    await asyncio.sleep(draw["latency_ms"] / 1000.0)
+    if draw["error"]:
+        _stats["errors"] += 1
+        status = int(CONFIG["error_status"])
+        return JSONResponse(status_code=status, content={"error": {
+            "message": f"Error simulado ({status})", "type": "mock_error", "code": status,
+        }})
+    return None
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = await _simulate()
+    if error is not None:
+        return error
+
+    messages = body.get("messages", [])
+    kind, content = canned_response(messages)
+    _stats["kinds"][kind] = _stats["kinds"].get(kind, 0) + 1
+
+    if body.get("stream"):
+        return StreamingResponse(_stream_chunks(body, content), media_type="text/event-stream")
+
+    prompt_tokens = len(prompt_text(messages)) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+async def _stream_chunks(body: Dict[str, Any], content: str):
+    """Formato de streaming de OpenAI: un chunk por palabra y `data: [DONE]`."""
+    base = {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+    }
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        delta = {"content": word if i == 0 else " " + word}
+        if i == 0:
+            delta["role"] = "assistant"
+        chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(0)
+    chunk = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    yield f"data: {json.dumps(chunk)}\n\n"
+    if (body.get("stream_options") or {}).get("include_usage"):
+        prompt_tokens = len(prompt_text(body.get("messages", []))) // 4
+        completion_tokens = len(content) // 4
+        chunk = {**base, "choices": [], "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/audio/transcriptions")
+async def audio_transcriptions():
+    error = await _simulate()
+    if error is not None:
+        return error
+    return {"text": "veintitrés"}
+
+
+@app.get("/mock/stats")
+def stats():
+    return {"config": CONFIG, **_stats}
+
+
+@app.post("/mock/config")
+async def update_config(request: Request):
+    try:
+        configure(**(await request.json()))
+    except (ValueError, TypeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return {"config": CONFIG}
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock local de la API de OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:MIN,MAX | lognormal:MEDIANA,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    configure(latency=args.latency, error_rate=args.error_rate, error_status=args.error_status,
+              hang_rate=args.hang_rate, hang_seconds=args.hang_seconds, seed=args.seed)
+    print(f"🧪 [MOCK] OpenAI simulado en http://{args.host}:{args.port}/v1 ({args.latency})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/prompt_tokens.py
+---------------------------------
+Tamaño en tokens de los prompts que se envían a OpenAI, con un ejemplo
+representativo de cada punto de llamada, y su presupuesto (PROMPT_BUDGETS).
+tests/test_prompt_budget.py falla si algún prompt lo supera.
+
+Cuenta con tiktoken (o200k_base, la codificación de gpt-4o) si está
+instalado; si no, con una estimación por palabras que para texto en
+español queda ligeramente por encima del recuento real.
+
+"fijo" son los tokens del mensaje de sistema, el prefijo idéntico en todas
+las llamadas de un punto de llamada. OpenAI solo sirve desde su caché de
+prompts prefijos de 1024 tokens o más, así que con los tamaños actuales
+(300-700) ese prefijo no se cachea.
+
+Uso:
+    python -m benchmarks.prompt_tokens
+    python -m benchmarks.prompt_tokens --json
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-prompt-tokens")   # los módulos crean su cliente al importarse
+
+from benchmarks.corpus import READING_EXERCISE, WORD_PROBLEMS  # noqa: E402
+from benchmarks.stub_llm import prompt_text  # noqa: E402
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+# Presupuesto de tokens por punto de llamada (ejemplo completo, sin imágenes):
+# tamaño actual + ~10 %. Si un cambio lo supera, recortar o subirlo a conciencia.
+PROMPT_BUDGETS = {
+    "generic_engine.decompose": 760,
+    "generic_engine.hint": 450,
+    "analyze_image": 340,
+    "ai_reading.text_generator": 290,
+    "ai_reading.question_generator": 640,
+    "ai_reading.answer_generator": 360,
+    "ai_reading.photo_parser": 300,
+    "ai_reading.photo_parser.multi": 380,
+}
+
+
+def count_tokens(text: str) -> int:
+    """Tokens de `text` (tiktoken si está disponible, si no una estimación)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE.findall(text))
+
+
+# ═══════════════════════════════════════════════════════════════
+# EJEMPLOS POR PUNTO DE LLAMADA
+# ═══════════════════════════════════════════════════════════════
+
+def _system(prompt: str, user: str) -> List[Dict[str, Any]]:
+    return [{"role": "system", "content": prompt}, {"role": "user", "content": user}]
+
+
+def _decompose():
+    from logic.domains.matematicas import generic_engine
+    return generic_engine._decomposition_messages(next(iter(WORD_PROBLEMS)))
+
+
+def _hint():
+    from logic.domains.matematicas import generic_engine
+    problem, decomposition = next(iter(WORD_PROBLEMS.items()))
+    step = decomposition["pasos"][1]
+    return _system(generic_engine.HINT_PROMPT, generic_engine.HINT_INPUT.format(
+        problem=problem, step_description=step["descripcion"], question=step["pregunta"],
+        user_answer="7", expected_answer=step["respuesta_esperada"], error_count=1,
+        contextual_hint=step.get("pista_contextual", ""), extra_help=step.get("explicacion_adicional", ""),
+    ))
+
+
+def _analyze_image():
+    from routes import analyze_image
+    return _system(analyze_image.ANALYZE_IMAGE_PROMPT,
+                   "El alumno está en 3º-4º de Primaria (edades 8-10). ¿Qué ejercicio hay en esta imagen?")
+
+
+def _text_generator():
+    from logic.ai_reading import text_generator
+    config = text_generator.LEVEL_CONFIG["6"]
+    return _system(text_generator.TEXT_PROMPT, text_generator.TEXT_INPUT.format(
+        description=config["description"], topic="el sistema solar, planetas y exploración espacial",
+        words=config["words"], complexity=config["complexity"], sentences=config["sentences"],
+        vocabulary=config["vocabulary"],
+    ))
+
+
+def _question_generator():
+    from logic.ai_reading import question_generator
+    return _system(question_generator.QUESTIONS_PROMPT, question_generator.QUESTIONS_INPUT.format(
+        text=READING_EXERCISE["text"], level="3", complexity="preguntas claras pero que requieran cierta reflexión",
+    ))
+
+
+def _answer_generator():
+    from logic.ai_reading import answer_generator
+    questions = "\n".join(f"{i + 1}. {q['q']}" for i, q in enumerate(READING_EXERCISE["questions"]))
+    return _system(answer_generator.ANSWERS_PROMPT, answer_generator.ANSWERS_INPUT.format(
+        text=READING_EXERCISE["text"], questions=questions,
+    ))
+
+
+def _photo_parser():
+    from logic.ai_reading import photo_parser
+    return _system(photo_parser.PHOTO_PROMPT, photo_parser.PHOTO_INPUT)
+
+
+def _photo_parser_multi():
+    from logic.ai_reading import photo_parser
+    return _system(photo_parser.MULTI_PHOTO_PROMPT, photo_parser.MULTI_PHOTO_INPUT.format(photo_num=2, total_photos=3))
+
+
+EXAMPLES: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+    "generic_engine.decompose": _decompose,
+    "generic_engine.hint": _hint,
+    "analyze_image": _analyze_image,
+    "ai_reading.text_generator": _text_generator,
+    "ai_reading.question_generator": _question_generator,
+    "ai_reading.answer_generator": _answer_generator,
+    "ai_reading.photo_parser": _photo_parser,
+    "ai_reading.photo_parser.multi": _photo_parser_multi,
+}
+
+
+def measure() -> Dict[str, Dict[str, int]]:
+    """Tokens totales y del prefijo fijo de cada ejemplo, con su presupuesto."""
+    result = {}
+    for site, example in EXAMPLES.items():
+        messages = example()
+        fixed = [m for m in messages if m["role"] == "system"]
+        result[site] = {
+            "tokens": count_tokens(prompt_text(messages)),
+            "fixed": count_tokens(prompt_text(fixed)),
+            "budget": PROMPT_BUDGETS[site],
+        }
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tamaño en tokens de los prompts de OpenAI")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    result = measure()
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    method = "tiktoken o200k_base" if _ENCODING is not None else "estimación por palabras"
+    print(f"🔢 Tokens por prompt ({method})")
+    for site, r in result.items():
+        mark = "✅" if r["tokens"] <= r["budget"] else "❌"
+        print(f"{mark} {site:32} {r['tokens']:5} / {r['budget']:5}  (fijo {r['fixed']})")
+    return 0 if all(r["tokens"] <= r["budget"] for r in result.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/run_benchmarks.py
+---------------------------------
+Suite de benchmarks reproducible de Tutorín.
+
+Mide ops/seg y latencia (media, p50, p95 en ms) de:
+    nlu/<prompt>           → modules.ai_analyzer.analyze_prompt
+    engine/<motor>/step_N  → handle_step de cada motor, paso a paso
+    hint/<módulo>/<tipo>   → get_hint de cada módulo de pistas
+    solve/<turno>          → turnos completos de /solve (cliente ASGI en proceso)
+
+El LLM se sustituye por benchmarks/stub_llm.py, así que los resultados no
+dependen de la red. Los resultados se guardan en JSON para compararlos
+con una ejecución anterior.
+
+Uso:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --repeat 50 --only engine
+    python -m benchmarks.run_benchmarks --output benchmarks/baselines/base.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baselines/base.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Configuración antes de importar la app: BD temporal y clave ficticia
+_TMP_DIR = tempfile.mkdtemp(prefix="tutorin_bench_")
+os.environ.setdefault("SQLITE_PATH", os.path.join(_TMP_DIR, "bench.db"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import corpus, stub_llm  # noqa: E402
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+MAX_WALK_STEPS = 12
+
+
+# ═══════════════════════════════════════════════════════════════
+# MEDICIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    idx = max(0, int(round(p * len(sorted_values) + 0.5)) - 1)
+    return sorted_values[min(idx, len(sorted_values) - 1)]
+
+
+def _summary(samples_ms: List[float]) -> Dict[str, float]:
+    values = sorted(samples_ms)
+    mean = sum(values) / len(values)
+    return {
+        "runs": len(values),
+        "ops_per_sec": round(1000.0 / mean, 1) if mean > 0 else 0.0,
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(_percentile(values, 0.50), 4),
+        "p95_ms": round(_percentile(values, 0.95), 4),
+    }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silencia los print() de los motores durante la medición."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench(func: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Ejecuta `func` `warmup + repeat` veces y resume las `repeat` últimas."""
+    samples = []
+    with _quiet():
+        for _ in range(warmup):
+            func()
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - t0) * 1000.0)
+    return _summary(samples)
+
+
+# ═══════════════════════════════════════════════════════════════
+# GRUPOS
+# ═══════════════════════════════════════════════════════════════
+
+def bench_nlu(repeat: int) -> Dict[str, Dict]:
+    from modules.ai_analyzer import analyze_prompt
+
+    results = {}
+    for prompt in corpus.all_prompts():
+        results[f"nlu/{prompt[:40]}"] = bench(lambda: analyze_prompt(prompt), repeat)
+    return results
+
+
+def _walk_steps(handle_step: Callable, prompt: str) -> List[tuple]:
+    """
+    Recorre los pasos del ejercicio como lo haría un alumno que acierta:
+    en cada paso pregunta (respuesta vacía) y responde con expected_answer.
+    Devuelve [(step, expected_answer)].
+    """
+    steps = []
+    step = 0
+    with _quiet():
+        for _ in range(MAX_WALK_STEPS):
+            ask = handle_step(prompt, step, "", 0)
+            expected = ask.get("expected_answer") or ""
+            steps.append((step, expected))
+            result = handle_step(prompt, step, expected, 0)
+            next_step = result.get("next_step", step)
+            if result.get("status") == "done" or next_step is None or next_step <= step:
+                break
+            step = next_step
+    return steps
+
+
+def bench_engines(repeat: int) -> Dict[str, Dict]:
+    from logic.core.engine_loader import load_engine
+
+    prompts = dict(corpus.ENGINE_PROMPTS)
+    prompts["generic_engine"] = list(corpus.WORD_PROBLEMS)
+    prompts["reading_engine"] = [corpus.READING_PROMPT]
+
+    results = {}
+    for engine_name, engine_prompts in prompts.items():
+        with _quiet():
+            handle_step = load_engine(engine_name)
+        if handle_step is None:
+            print(f"⚠️ [BENCH] Motor no encontrado: {engine_name}")
+            continue
+        for i, prompt in enumerate(engine_prompts):
+            for step, expected in _walk_steps(handle_step, prompt):
+                key = f"engine/{engine_name}/{i}/step_{step}"
+                results[key + "/ask"] = bench(lambda: handle_step(prompt, step, "", 0), repeat)
+                results[key + "/answer"] = bench(lambda: handle_step(prompt, step, expected, 0), repeat)
+    return results
+
+
+def _hint_types(area: str) -> List[str]:
+    path = os.path.join(ROOT, "logic", "core", "hint_types.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for subject in data.values():
+        if area in subject:
+            return subject[area]
+    return []
+
+
+def bench_hints(repeat: int) -> Dict[str, Dict]:
+    import importlib
+
+    results = {}
+    for module_name, (area, context) in corpus.HINT_MODULES.items():
+        module = importlib.import_module(f"logic.ai_hints.{module_name}")
+        for hint_type in _hint_types(area):
+            for errors in (1, 2, 3):
+                key = f"hint/{module_name}/{hint_type}/e{errors}"
+                results[key] = bench(lambda: module.get_hint(hint_type, errors, context, ""), repeat)
+    return results
+
+
+# Turnos de /solve: (nombre, question, last_answer)
+SOLVE_TURNS = [
+    ("addition_first", "32458 + 6541", ""),
+    ("addition_wrong", "32458 + 6541", "7"),
+    ("addition_dont_know", "32458 + 6541", "no sé"),
+    ("multiplication_first", "32547 * 23", ""),
+    ("fractions_first", "5/6 + 4/8", ""),
+    ("word_problem_first", next(iter(corpus.WORD_PROBLEMS)), ""),
+    ("reading_first", corpus.READING_PROMPT, ""),
+]
+
+
+def bench_solve(repeat: int) -> Dict[str, Dict]:
+    import httpx
+
+    with _quiet():
+        from app import app
+
+    async def run() -> Dict[str, Dict]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {}
+            for name, question, answer in SOLVE_TURNS:
+                async def turn(i: int) -> None:
+                    payload = {
+                        "user_id": "bench",
+                        "exercise_id": f"bench-{name}-{i}",
+                        "question": question,
+                        "last_answer": answer,
+                    }
+                    r = await client.post("/solve/", json=payload)
+                    r.raise_for_status()
+
+                samples = []
+                with _quiet():
+                    await turn(-1)
+                    for i in range(repeat):
+                        t0 = time.perf_counter()
+                        await turn(i)
+                        samples.append((time.perf_counter() - t0) * 1000.0)
+                results[f"solve/{name}"] = _summary(samples)
+
+                # Turno correcto: responde con el expected_answer de la primera respuesta
+                if name.endswith("_first"):
+                    with _quiet():
+                        first = await client.post("/solve/", json={
+                            "user_id": "bench", "exercise_id": f"bench-{name}-probe",
+                            "question": question, "last_answer": "",
+                        })
+                    expected = first.json().get("expected_answer") or ""
+                    if expected:
+                        samples = []
+                        with _quiet():
+                            for i in range(repeat):
+                                eid = f"bench-{name}-ok-{i}"
+                                await client.post("/solve/", json={
+                                    "user_id": "bench", "exercise_id": eid,
+                                    "question": question, "last_answer": "",
+                                })
+                                t0 = time.perf_counter()
+                                await client.post("/solve/", json={
+                                    "user_id": "bench", "exercise_id": eid,
+                                    "question": question, "last_answer": expected,
+                                })
+                                samples.append((time.perf_counter() - t0) * 1000.0)
+                        results[f"solve/{name[:-len('_first')]}_correct"] = _summary(samples)
+            return results
+
+    return asyncio.run(run())
+
+
+GROUPS = {
+    "nlu": bench_nlu,
+    "engine": bench_engines,
+    "hint": bench_hints,
+    "solve": bench_solve,
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESULTADOS Y COMPARACIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta_ms: float = 0.05) -> List[str]:
+    """
+    Devuelve las claves cuya p50 empeora más de `threshold` (fracción) respecto a la base.
+    Las diferencias menores que `min_delta_ms` se consideran ruido.
+    """
+    regressions = []
+    for key, stats in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or base["p50_ms"] <= 0:
+            continue
+        ratio = stats["p50_ms"] / base["p50_ms"]
+        if ratio > 1.0 + threshold and stats["p50_ms"] - base["p50_ms"] >= min_delta_ms:
+            regressions.append(f"{key}: p50 {base['p50_ms']:.3f} → {stats['p50_ms']:.3f} ms (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de Tutorín")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones por caso")
+    parser.add_argument("--only", action="append", choices=sorted(GROUPS), help="Grupo a ejecutar (repetible)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latencia simulada del LLM")
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Empeoramiento de p50 tolerado (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Diferencia mínima de p50 para contar como regresión")
+    args = parser.parse_args(argv)
+
+    stub_llm.install(latency_ms=args.llm_latency_ms)
+
+    results: Dict[str, Dict] = {}
+    for group in args.only or list(GROUPS):
+        print(f"⏱️ [BENCH] {group}...")
+        results.update(GROUPS[group](args.repeat))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "llm_latency_ms": args.llm_latency_ms,
+        },
+        "results": results,
+    }
+
+    width = max((len(k) for k in results), default=10)
+    print(f"{'caso':<{width}}  {'ops/s':>10}  {'mean':>9}  {'p50':>9}  {'p95':>9}")
+    for key, s in results.items():
+        print(f"{key:<{width}}  {s['ops_per_sec']:>10.1f}  {s['mean_ms']:>9.3f}  {s['p50_ms']:>9.3f}  {s['p95_ms']:>9.3f}")
+
+    output = args.output or os.path.join(
+        BASELINES_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 [BENCH] Resultados guardados en {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"❌ [BENCH] {len(regressions)} regresiones (> {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ [BENCH] Sin regresiones respecto a la base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/stub_llm.py
+---------------------------------
+Cliente OpenAI simulado para los benchmarks.
+
+Imita `client.chat.completions.create()` lo justo para que los motores
+funcionen sin red. `canned_response()` elige la respuesta según el formato
+del prompt (descomposición, generadores de lectura, fotos, pistas...) y la
+comparte el servidor benchmarks/mock_openai.py.
+
+`latency_ms` añade un retardo artificial para simular la API real.
+`install()` sustituye los clientes de todos los módulos que llaman a OpenAI.
+"""
+
+import importlib
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.corpus import READING_EXERCISE, WORD_PROBLEMS, _decomposition
+
+STUB_HINT = "Piensa en qué operación necesitas y revisa los números del enunciado."
+
+# módulo → (atributo del cliente, atributo que habilita la IA o None)
+_CLIENT_ATTRS = {
+    "logic.domains.matematicas.generic_engine": ("client", "AI_AVAILABLE"),
+    "logic.ai_hints.ai_router": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_decimals": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_division": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_fractions": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_geometry": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_measures": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_multiplication": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_percentages": ("_client", "_USE_AI"),
+    "logic.ai_hints.hints_statistics": ("_client", "_USE_AI"),
+    "logic.ai_reading.answer_generator": ("client", None),
+    "logic.ai_reading.photo_parser": ("client", None),
+    "logic.ai_reading.question_generator": ("client", None),
+    "logic.ai_reading.text_generator": ("client", None),
+    "routes.analyze_image": ("client", None),
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESPUESTAS ENLATADAS
+# ═══════════════════════════════════════════════════════════════
+
+def prompt_text(messages: List[Dict[str, Any]]) -> str:
+    """Concatena el texto de todos los mensajes (incluidos los multimodales)."""
+    parts = []
+    for m in messages:
+        content = m.get("content", "")
+        if isinstance(content, list):
+            parts.extend(c.get("text", "") for c in content if isinstance(c, dict))
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def _has_image(messages: List[Dict[str, Any]]) -> bool:
+    return any(
+        isinstance(m.get("content"), list)
+        and any(isinstance(c, dict) and c.get("type") == "image_url" for c in m["content"])
+        for m in messages
+    )
+
+
+def _generic_decomposition(prompt: str) -> Dict[str, Any]:
+    """Descomposición en una suma con los dos primeros números del problema."""
+    problem = prompt.split("PROBLEMA:", 1)[-1].split("Descompón", 1)[0]
+    numbers = [int(n) for n in re.findall(r"\d+", problem)][:2] or [2, 3]
+    if len(numbers) == 1:
+        numbers.append(1)
+    total = str(sum(numbers))
+    return _decomposition(
+        [f"Dato: {n}" for n in numbers], "el resultado", "cuanto es el total",
+        [("suma", numbers, f"¿Cuánto es {numbers[0]} + {numbers[1]}?", total)], total,
+    )
+
+
+def canned_response(messages: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """Devuelve (tipo, contenido) para los mensajes recibidos."""
+    prompt = prompt_text(messages)
+
+    if "PROBLEMA:" in prompt and "pasos" in prompt:
+        for problem, decomposition in WORD_PROBLEMS.items():
+            if problem in prompt:
+                return "decomposition", json.dumps(decomposition, ensure_ascii=False)
+        return "decomposition", json.dumps(_generic_decomposition(prompt), ensure_ascii=False)
+
+    if _has_image(messages):
+        if "FOTO" in prompt:
+            return "photos", json.dumps({
+                "text": READING_EXERCISE["text"],
+                "questions": [{"q": q["q"], "type": q["type"]} for q in READING_EXERCISE["questions"]],
+            }, ensure_ascii=False)
+        if "TEXTO PRINCIPAL" in prompt:
+            return "photo", json.dumps({
+                "text": READING_EXERCISE["text"],
+                "questions": [q["q"] for q in READING_EXERCISE["questions"]],
+            }, ensure_ascii=False)
+        return "exercise", "3/4 + 1/2"
+
+    if '"answers"' in prompt:
+        block = prompt.split("PREGUNTAS:", 1)[-1].split("Tu tarea", 1)[0]
+        count = len(re.findall(r"^\s*\d+\.", block, flags=re.M)) or 1
+        answers = [q["answer"] for q in READING_EXERCISE["questions"]]
+        return "answers", json.dumps({"answers": [answers[i % len(answers)] for i in range(count)]},
+                                     ensure_ascii=False)
+
+    if '"questions"' in prompt:
+        return "questions", json.dumps({"questions": [
+            {"type": q["type"], "q": q["q"], "answer": q["answer"]} for q in READING_EXERCISE["questions"]
+        ]}, ensure_ascii=False)
+
+    if "textos educativos" in prompt:
+        match = re.search(r"aproximadamente (\d+) palabras", prompt)
+        target = int(match.group(1)) if match else 150
+        words = READING_EXERCISE["text"].split()
+        return "reading_text", " ".join(words[i % len(words)] for i in range(target))
+
+    return "hint", STUB_HINT
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLIENTE SIMULADO
+# ═══════════════════════════════════════════════════════════════
+
+class _Completions:
+    def __init__(self, owner: "StubOpenAI"):
+        self._owner = owner
+
+    def create(self, **kwargs):
+        owner = self._owner
+        owner.calls += 1
+        if owner.latency_ms:
+            time.sleep(owner.latency_ms / 1000.0)
+
+        messages = kwargs.get("messages", [])
+        prompt = prompt_text(messages)
+        _kind, content = canned_response(messages)
+
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(content) // 4,
+            total_tokens=(len(prompt) + len(content)) // 4,
+        )
+        if kwargs.get("stream"):
+            include_usage = (kwargs.get("stream_options") or {}).get("include_usage")
+            return _stream_chunks(content, usage if include_usage else None)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=usage,
+            model=kwargs.get("model", "stub"),
+        )
+
+
+def _stream_chunks(content: str, usage=None):
+    """Respuesta con stream=True: un fragmento por palabra (y el uso al final, si se pidió)."""
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        delta = SimpleNamespace(content=word if i == 0 else " " + word)
+        yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+    yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=None),
+                                                   finish_reason="stop")])
+    if usage is not None:
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+class StubOpenAI:
+    """Sustituto mínimo de `openai.OpenAI` (solo chat.completions.create)."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+
+def install(latency_ms: float = 0.0) -> StubOpenAI:
+    """Instala el cliente simulado en todos los módulos que usan OpenAI."""
+    stub = StubOpenAI(latency_ms)
+    for module_name, (client_attr, flag_attr) in _CLIENT_ATTRS.items():
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            print(f"⚠️ [BENCH] No se pudo importar {module_name}: {e}")
+            continue
+        setattr(module, client_attr, stub)
+        if flag_attr:
+            setattr(module, flag_attr, True)
+    return stub
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/template_hit_rate.py
+---------------------------------
+Tasa de aciertos de las plantillas de problemas (problem_templates) sobre un
+corpus de enunciados, procesados en orden como llegarían a generic_engine:
+
+- acierto: la estructura ya tenía plantilla → descomposición en local
+- fallo:   se "descompone" (respuesta enlatada de stub_llm) y se intenta
+           guardar como plantilla
+
+Fuentes del corpus (en este orden):
+    --file problemas.txt   un enunciado por línea
+    --db tutorin.db        preguntas de la tabla history (por defecto SQLITE_PATH)
+    corpus sintético       variantes de benchmarks/corpus.WORD_PROBLEMS si no hay historial
+
+Uso:
+    python -m benchmarks.template_hit_rate --db tutorin.db
+    python -m benchmarks.template_hit_rate --file problemas.txt --json
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, List
+
+# Las plantillas se guardan en una BD temporal, no en la de producción
+_SOURCE_DB = os.getenv("SQLITE_PATH", "tutorin.db")
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="tutorin_tpl_"), "templates.db")
+
+from benchmarks.corpus import WORD_PROBLEMS  # noqa: E402
+from benchmarks.stub_llm import canned_response  # noqa: E402
+from logic.domains.matematicas import generic_engine, problem_templates  # noqa: E402
+
+_NAMES = ["Ana", "Pablo", "Lucía", "Hugo", "Sara", "Mateo", "Julia", "Leo"]
+
+
+def _history_questions(path: str) -> List[str]:
+    if not os.path.exists(path):
+        return []
+    with sqlite3.connect(path) as con:
+        try:
+            rows = con.execute("SELECT question FROM history ORDER BY id").fetchall()
+        except sqlite3.Error:
+            return []
+    return [r[0] for r in rows if r[0]]
+
+
+def _synthetic_corpus(variants: int, seed: int) -> List[str]:
+    """Variantes de los problemas del corpus con otros números y nombres."""
+    rng = random.Random(seed)
+    problems = []
+    for problem in WORD_PROBLEMS:
+        parsed = problem_templates.parse_problem(problem)
+        for _ in range(variants):
+            text = problem
+            for token in parsed.tokens:
+                text = text.replace(token, str(rng.randint(2, 40) * (10 if len(token) > 2 else 1)), 1)
+            for name in parsed.names:
+                text = text.replace(name, rng.choice(_NAMES))
+            problems.append(text)
+    rng.shuffle(problems)
+    return problems
+
+
+def _is_word_problem(question: str) -> bool:
+    """Preguntas que irían a generic_engine: texto con datos numéricos."""
+    question = question.strip()
+    return (
+        not question.startswith(("reading:", "{"))
+        and len(question.split()) >= 6
+        and bool(problem_templates.parse_problem(question).numbers)
+    )
+
+
+def measure(problems: List[str]) -> Dict[str, float]:
+    hits = stored = unusable = 0
+    for problem in problems:
+        if problem_templates.lookup(problem):
+            hits += 1
+            continue
+        _kind, content = canned_response(generic_engine._decomposition_messages(problem))
+        if problem_templates.remember(problem, json.loads(content)):
+            stored += 1
+        else:
+            unusable += 1
+    total = len(problems)
+    return {
+        "problems": total,
+        "hits": hits,
+        "misses": total - hits,
+        "templates_stored": stored,
+        "not_templatable": unusable,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tasa de aciertos de las plantillas de problemas")
+    parser.add_argument("--file", help="Fichero con un enunciado por línea")
+    parser.add_argument("--db", default=_SOURCE_DB, help="BD SQLite con la tabla history")
+    parser.add_argument("--variants", type=int, default=10, help="Variantes por problema del corpus sintético")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            problems, source = [line.strip() for line in f if line.strip()], args.file
+    else:
+        problems, source = _history_questions(args.db), f"historial de {args.db}"
+    problems = [p for p in problems if _is_word_problem(p)]
+    if not problems:
+        problems = _synthetic_corpus(args.variants, args.seed)
+        source = f"corpus sintético ({args.variants} variantes por problema)"
+
+    result = {"source": source, **measure(problems)}
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"📚 {result['source']}: {result['problems']} enunciados")
+        print(f"♻️ Aciertos: {result['hits']} ({result['hit_rate'] * 100:.1f} %)")
+        print(f"🧩 Plantillas nuevas: {result['templates_stored']} · no parametrizables: {result['not_templatable']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
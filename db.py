@@ -6,16 +6,27 @@ Gestión de base de datos para Tutorín (SQLite)
 """
 
 import os
+import json
 import sqlite3
 import logging
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
+from functools import wraps
 from typing import Optional, Tuple, Dict, Any, List
 
+from logic.core import metrics
+from logic.core.timing import span
+
 logger = logging.getLogger("tutorin.db")
 
 # Ruta de la base de datos SQLite
 DB_PATH = os.getenv("SQLITE_PATH", "tutorin.db")
 
+# Ejercicios de lectura parseados que se mantienen en memoria
+READING_CACHE_SIZE = int(os.getenv("READING_CACHE_SIZE", "512"))
+
 # -------------------------------------------------------
 # CONEXIÓN
 # -------------------------------------------------------
@@ -33,6 +44,20 @@ def _conn():
     finally:
         con.close()
 
+def _db_op(func):
+    """Mide la función como etapa "db" y registra su latencia por operación."""
+    operation = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            with span("db"):
+                return func(*args, **kwargs)
+        finally:
+            metrics.DB_LATENCY.observe(time.perf_counter() - t0, operation)
+    return wrapper
+
 # -------------------------------------------------------
 # INICIALIZACIÓN DE TABLAS
 # -------------------------------------------------------
@@ -66,6 +91,91 @@ def _init():
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             );
         """)
+
+        # Tabla de ejercicios de lectura
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS reading_exercises (
+                exercise_id TEXT PRIMARY KEY,
+                exercise_data TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+        # Preguntas ya generadas por texto de lectura (logic/ai_reading/text_dedup.py)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS reading_texts (
+                text_key TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                questions TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS reading_text_bands (
+                band TEXT NOT NULL,
+                text_key TEXT NOT NULL,
+                PRIMARY KEY (band, text_key)
+            );
+        """)
+
+        # Textos de los audios servidos por GET /speak/{audio_id}.mp3
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS audio_clips (
+                audio_id TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+        # Tabla de trabajos asíncronos de /reading/* (modo ?async=true)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS reading_jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                owner TEXT,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress INTEGER NOT NULL DEFAULT 0,
+                exercise_id TEXT,
+                result TEXT,
+                error TEXT,
+                error_status INTEGER,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        # Bases creadas antes de registrar el proceso dueño de cada trabajo
+        job_columns = {row[1] for row in cur.execute("PRAGMA table_info(reading_jobs)")}
+        if "owner" not in job_columns:
+            cur.execute("ALTER TABLE reading_jobs ADD COLUMN owner TEXT")
+
+        # Descomposiciones de generic_engine parametrizadas
+        # (logic/domains/matematicas/problem_templates.py)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS problem_templates (
+                template_key TEXT PRIMARY KEY,
+                template TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+        # Llamadas a OpenAI en curso y sus resultados, compartidos entre workers
+        # (logic/core/llm_coalesce.py)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS llm_locks (
+                request_key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS llm_results (
+                request_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
         
         con.commit()
         logger.info("✅ Tablas SQLite inicializadas correctamente")
@@ -81,6 +191,7 @@ except Exception as e:
 # FUNCIONES DE ACCESO
 # -------------------------------------------------------
 
+@_db_op
 def get_progress(exercise_id: str) -> Tuple[int, int, str]:
     """Obtiene el progreso de un ejercicio"""
     with _conn() as con:
@@ -104,6 +215,7 @@ def get_progress(exercise_id: str) -> Tuple[int, int, str]:
             return step, err, ctx
 
 
+@_db_op
 def upsert_progress(exercise_id: str, step: int, error_count: int, context: str, user_id: Optional[str] = None) -> None:
     """Actualiza o inserta el progreso de un ejercicio"""
     with _conn() as con:
@@ -126,6 +238,7 @@ def upsert_progress(exercise_id: str, step: int, error_count: int, context: str,
             )
 
 
+@_db_op
 def save_history(user_id: Optional[str], exercise_id: str, question: str, last_answer: Optional[str], response: str, step: int, error_count: int) -> None:
     """Guarda un evento en el historial"""
     with _conn() as con:
@@ -136,6 +249,7 @@ def save_history(user_id: Optional[str], exercise_id: str, question: str, last_a
         )
 
 
+@_db_op
 def list_history(user_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
     """Lista el historial de interacciones"""
     with _conn() as con:
@@ -156,6 +270,7 @@ def list_history(user_id: Optional[str] = None, limit: int = 50) -> List[Dict[st
         return [dict(zip(cols, row)) for row in cur.fetchall()]
 
 
+@_db_op
 def reset_progress(exercise_id: str) -> None:
     """Resetea el progreso de un ejercicio"""
     with _conn() as con:
@@ -164,6 +279,7 @@ def reset_progress(exercise_id: str) -> None:
         logger.info(f"🔄 Progreso reseteado para ejercicio: {exercise_id}")
 
 
+@_db_op
 def reset_all() -> None:
     """Borra TODA la base de datos (usar con cuidado)"""
     with _conn() as con:
@@ -177,6 +293,35 @@ def reset_all() -> None:
 # FUNCIONES PARA EJERCICIOS DE LECTURA
 # -------------------------------------------------------
 
+# Caché LRU de ejercicios ya parseados (exercise_id → dict).
+# Los ejercicios no cambian tras guardarse; save_reading_exercise invalida la entrada.
+_reading_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_reading_cache_lock = threading.Lock()
+
+
+def _reading_cache_get(exercise_id: str) -> Optional[Dict[str, Any]]:
+    with _reading_cache_lock:
+        exercise = _reading_cache.get(exercise_id)
+        if exercise is not None:
+            _reading_cache.move_to_end(exercise_id)
+        return exercise
+
+
+def _reading_cache_put(exercise_id: str, exercise: Dict[str, Any]) -> None:
+    with _reading_cache_lock:
+        _reading_cache[exercise_id] = exercise
+        _reading_cache.move_to_end(exercise_id)
+        while len(_reading_cache) > READING_CACHE_SIZE:
+            _reading_cache.popitem(last=False)
+
+
+def clear_reading_cache() -> None:
+    """Vacía la caché de ejercicios de lectura (tests y mantenimiento)."""
+    with _reading_cache_lock:
+        _reading_cache.clear()
+
+
+@_db_op
 def save_reading_exercise(exercise_id: str, exercise: Dict[str, Any]) -> None:
     """
     Guarda un ejercicio de lectura en la base de datos.
@@ -185,34 +330,29 @@ def save_reading_exercise(exercise_id: str, exercise: Dict[str, Any]) -> None:
         exercise_id: ID único del ejercicio
         exercise: Diccionario con el ejercicio (formato reading_engine)
     """
+    exercise_json = json.dumps(exercise, ensure_ascii=False)
+
     with _conn() as con:
         cur = con.cursor()
 
-        # Crear tabla si no existe
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS reading_exercises (
-                exercise_id TEXT PRIMARY KEY,
-                exercise_data TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-
-        # Convertir exercise a JSON
-        import json
-        exercise_json = json.dumps(exercise, ensure_ascii=False)
-
         # Insertar o reemplazar
         cur.execute(
             "INSERT OR REPLACE INTO reading_exercises(exercise_id, exercise_data) VALUES (?,?)",
             (exercise_id, exercise_json)
         )
 
-        logger.info(f"💾 Ejercicio de lectura guardado: {exercise_id}")
+    # Invalidar la versión en caché (si se sobrescribe un ejercicio existente)
+    with _reading_cache_lock:
+        _reading_cache.pop(exercise_id, None)
+
+    logger.info(f"💾 Ejercicio de lectura guardado: {exercise_id}")
 
 
 def get_reading_exercise(exercise_id: str) -> Optional[Dict[str, Any]]:
     """
-    Obtiene un ejercicio de lectura de la base de datos.
+    Obtiene un ejercicio de lectura (caché en memoria → base de datos).
+
+    El diccionario devuelto se comparte entre peticiones: no debe modificarse.
 
     Args:
         exercise_id: ID del ejercicio
@@ -220,32 +360,246 @@ def get_reading_exercise(exercise_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Diccionario con el ejercicio o None si no existe
     """
-    with _conn() as con:
-        cur = con.cursor()
+    exercise = _reading_cache_get(exercise_id)
+    if exercise is not None:
+        metrics.CACHE_REQUESTS.inc("reading_exercises", "hit")
+        return exercise
+
+    metrics.CACHE_REQUESTS.inc("reading_exercises", "miss")
+    exercise = _fetch_reading_exercise(exercise_id)
+    if exercise is not None:
+        _reading_cache_put(exercise_id, exercise)
+    return exercise
 
-        # Crear tabla si no existe
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS reading_exercises (
-                exercise_id TEXT PRIMARY KEY,
-                exercise_data TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
 
+@_db_op
+def _fetch_reading_exercise(exercise_id: str) -> Optional[Dict[str, Any]]:
+    """Lee y parsea un ejercicio de lectura desde SQLite."""
+    with _conn() as con:
+        cur = con.cursor()
         cur.execute(
             "SELECT exercise_data FROM reading_exercises WHERE exercise_id = ?",
             (exercise_id,)
         )
-
         row = cur.fetchone()
 
-        if not row:
-            logger.warning(f"⚠️ Ejercicio no encontrado: {exercise_id}")
-            return None
+    if not row:
+        logger.warning(f"⚠️ Ejercicio no encontrado: {exercise_id}")
+        return None
+
+    exercise = json.loads(row[0])
+    logger.info(f"📖 Ejercicio de lectura recuperado: {exercise_id}")
+    return exercise
+
+
+# -------------------------------------------------------
+# TEXTOS DE LECTURA YA PROCESADOS (DEDUPLICACIÓN)
+# -------------------------------------------------------
+
+@_db_op
+def save_reading_text(text_key: str, signature: List[int], bands: List[str],
+                      questions: List[Dict[str, Any]]) -> None:
+    """Guarda las preguntas generadas para un texto junto a su firma MinHash y bandas LSH."""
+    with _conn() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO reading_texts(text_key, signature, questions) VALUES (?,?,?)",
+            (text_key, json.dumps(signature), json.dumps(questions, ensure_ascii=False))
+        )
+        con.executemany(
+            "INSERT OR IGNORE INTO reading_text_bands(band, text_key) VALUES (?,?)",
+            [(band, text_key) for band in bands]
+        )
+
+
+@_db_op
+def get_reading_text(text_key: str) -> Optional[List[Dict[str, Any]]]:
+    """Preguntas guardadas para una huella exacta, o None."""
+    with _conn() as con:
+        row = con.execute("SELECT questions FROM reading_texts WHERE text_key = ?", (text_key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+@_db_op
+def get_reading_text_candidates(bands: List[str]) -> List[Dict[str, Any]]:
+    """Textos que comparten alguna banda LSH: [{"text_key", "signature", "questions"}]."""
+    if not bands:
+        return []
+    placeholders = ",".join("?" * len(bands))
+    with _conn() as con:
+        rows = con.execute(
+            f"SELECT t.text_key, t.signature, t.questions FROM reading_texts t "
+            f"WHERE t.text_key IN (SELECT DISTINCT text_key FROM reading_text_bands WHERE band IN ({placeholders}))",
+            bands
+        ).fetchall()
+    return [
+        {"text_key": key, "signature": json.loads(signature), "questions": json.loads(questions)}
+        for key, signature, questions in rows
+    ]
+
+
+# -------------------------------------------------------
+# PLANTILLAS DE PROBLEMAS (generic_engine)
+# -------------------------------------------------------
+
+@_db_op
+def save_problem_template(template_key: str, template: Dict[str, Any]) -> None:
+    with _conn() as con:
+        con.execute(
+            "INSERT OR REPLACE INTO problem_templates(template_key, template) VALUES (?,?)",
+            (template_key, json.dumps(template, ensure_ascii=False))
+        )
+
+
+@_db_op
+def get_problem_template(template_key: str) -> Optional[Dict[str, Any]]:
+    """Plantilla guardada para la estructura del enunciado, o None."""
+    with _conn() as con:
+        row = con.execute(
+            "SELECT template FROM problem_templates WHERE template_key = ?", (template_key,)
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+# -------------------------------------------------------
+# AUDIOS (TEXTO → /speak/{audio_id}.mp3)
+# -------------------------------------------------------
+
+@_db_op
+def save_audio_clip(audio_id: str, text: str, lang: str) -> None:
+    """Registra el texto de un audio (el id es una huella del contenido: idempotente)."""
+    with _conn() as con:
+        con.execute(
+            "INSERT OR IGNORE INTO audio_clips(audio_id, text, lang) VALUES (?,?,?)",
+            (audio_id, text, lang)
+        )
+
+
+@_db_op
+def get_audio_clip(audio_id: str) -> Optional[Dict[str, str]]:
+    """Texto e idioma de un audio registrado, o None."""
+    with _conn() as con:
+        row = con.execute("SELECT text, lang FROM audio_clips WHERE audio_id = ?", (audio_id,)).fetchone()
+    return {"text": row[0], "lang": row[1]} if row else None
 
-        # Parsear JSON
-        import json
-        exercise = json.loads(row[0])
 
-        logger.info(f"📖 Ejercicio de lectura recuperado: {exercise_id}")
-        return exercise
\ No newline at end of file
+# -------------------------------------------------------
+# TRABAJOS ASÍNCRONOS DE LECTURA
+# -------------------------------------------------------
+
+_JOB_FIELDS = ("status", "stage", "progress", "exercise_id", "result", "error", "error_status")
+
+
+@_db_op
+def create_reading_job(job_id: str, kind: str, owner: Optional[str] = None) -> None:
+    """Registra un trabajo nuevo en estado "queued", ejecutado por el proceso `owner`."""
+    with _conn() as con:
+        con.execute(
+            "INSERT INTO reading_jobs(job_id, kind, owner, status, progress) VALUES (?,?,?,?,0)",
+            (job_id, kind, owner, "queued")
+        )
+
+
+@_db_op
+def update_reading_job(job_id: str, **fields: Any) -> None:
+    """Actualiza estado, etapa, progreso, resultado o error de un trabajo."""
+    fields = {k: v for k, v in fields.items() if k in _JOB_FIELDS}
+    if not fields:
+        return
+    if "result" in fields and fields["result"] is not None:
+        fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+    assignments = ", ".join(f"{k} = ?" for k in fields)
+    with _conn() as con:
+        con.execute(
+            f"UPDATE reading_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+            (*fields.values(), job_id)
+        )
+
+
+@_db_op
+def get_reading_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Devuelve el trabajo (con `result` ya parseado) o None si no existe."""
+    with _conn() as con:
+        con.row_factory = sqlite3.Row
+        row = con.execute("SELECT * FROM reading_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    if job.get("result"):
+        job["result"] = json.loads(job["result"])
+    return job
+
+
+@_db_op
+def fail_unfinished_reading_jobs(reason: str, owner: Optional[str], stale_seconds: float,
+                                 job_id: Optional[str] = None) -> int:
+    """
+    Marca como error los trabajos que quedaron a medias (p. ej. tras un
+    reinicio): los de `owner` y los de cualquier proceso sin cambios desde
+    hace más de `stale_seconds`. Con `job_id`, solo ese trabajo.
+    """
+    query = (
+        "UPDATE reading_jobs SET status = 'error', error = ?, error_status = 503, "
+        "updated_at = CURRENT_TIMESTAMP WHERE status IN ('queued', 'running') "
+        "AND (owner = ? OR updated_at < datetime('now', ?))"
+    )
+    params: List[Any] = [reason, owner, f"-{int(stale_seconds)} seconds"]
+    if job_id is not None:
+        query += " AND job_id = ?"
+        params.append(job_id)
+    with _conn() as con:
+        return con.execute(query, params).rowcount
+
+
+# -------------------------------------------------------
+# LLAMADAS A OPENAI COMPARTIDAS ENTRE WORKERS
+# -------------------------------------------------------
+
+@_db_op
+def acquire_llm_lock(request_key: str, owner: str, ttl_seconds: float) -> bool:
+    """Reserva la llamada `request_key` para `owner`. False si otro la tiene en curso."""
+    now = time.time()
+    with _conn() as con:
+        con.execute("DELETE FROM llm_locks WHERE request_key = ? AND expires_at < ?", (request_key, now))
+        cur = con.execute(
+            "INSERT OR IGNORE INTO llm_locks(request_key, owner, expires_at) VALUES (?,?,?)",
+            (request_key, owner, now + ttl_seconds)
+        )
+        return cur.rowcount == 1
+
+
+@_db_op
+def release_llm_lock(request_key: str, owner: str) -> None:
+    with _conn() as con:
+        con.execute("DELETE FROM llm_locks WHERE request_key = ? AND owner = ?", (request_key, owner))
+
+
+@_db_op
+def llm_lock_held(request_key: str) -> bool:
+    """¿Hay una llamada en curso (no caducada) para `request_key`?"""
+    with _conn() as con:
+        row = con.execute(
+            "SELECT 1 FROM llm_locks WHERE request_key = ? AND expires_at >= ?", (request_key, time.time())
+        ).fetchone()
+    return row is not None
+
+
+@_db_op
+def save_llm_result(request_key: str, payload: Dict[str, Any], ttl_seconds: float) -> None:
+    """Publica el resultado de una llamada para los workers que la esperan."""
+    now = time.time()
+    with _conn() as con:
+        con.execute("DELETE FROM llm_results WHERE expires_at < ?", (now,))
+        con.execute(
+            "INSERT OR REPLACE INTO llm_results(request_key, payload, expires_at) VALUES (?,?,?)",
+            (request_key, json.dumps(payload, ensure_ascii=False), now + ttl_seconds)
+        )
+
+
+@_db_op
+def get_llm_result(request_key: str) -> Optional[Dict[str, Any]]:
+    with _conn() as con:
+        row = con.execute(
+            "SELECT payload FROM llm_results WHERE request_key = ? AND expires_at >= ?",
+            (request_key, time.time())
+        ).fetchone()
+    return json.loads(row[0]) if row else None
@@ -13,6 +13,10 @@ from importlib import import_module
 
 # === Importar validador de hint_types ===
 from logic.core.hint_validator import is_valid_hint
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
+from logic.core import metrics
+from logic.core.timing import timed
 
 # === Importar funciones públicas de pistas ===
 # ✅ CORREGIDO: Nombres correctos en inglés
@@ -85,8 +89,7 @@ except ImportError:
 
 # === IA opcional ===
 try:
-    from openai import OpenAI
-    _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    _client = get_client()
     _USE_AI = bool(os.getenv("OPENAI_API_KEY"))
 except Exception:
     _client = None
@@ -120,8 +123,9 @@ def _generate_ai_hint(prompt: str, step: str, error_count: int, context: str = "
             "a avanzar en su razonamiento sin resolverle todo."
         )
         user_msg = f"Consigna: {prompt}\nPaso: {step}\nErrores: {error_count}\nContexto: {context}"
-        chat = _client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        chat = chat_completion(
+            _client, "ai_router",
+            model=choose_model("hint"),
             messages=[
                 {"role": "system", "content": sys_msg},
                 {"role": "user", "content": user_msg},
@@ -135,6 +139,7 @@ def _generate_ai_hint(prompt: str, step: str, error_count: int, context: str = "
 
 
 # === Generador principal de pistas ===
+@timed("hint")
 def generate_hint_with_ai(
     topic: str,
     step: str,
@@ -164,84 +169,84 @@ def generate_hint_with_ai(
     if t in ("suma", "addition") and get_addition_hint:
         actual_step = step or "add_col"
         hint = get_addition_hint(actual_step, e, ctx, answer)
-        _validate_hint_type("suma", actual_step)
+        _record_hint("suma", actual_step)
         return hint
 
     # --- Resta --- ✅ ACEPTA TEMA EN ESPAÑOL O INGLÉS
     if t in ("resta", "subtraction") and get_subtraction_hint:
         actual_step = step or "sub_col"
         hint = get_subtraction_hint(actual_step, e, ctx, answer)
-        _validate_hint_type("resta", actual_step)
+        _record_hint("resta", actual_step)
         return hint
 
     # --- Multiplicación --- ✅ ACEPTA TEMA EN ESPAÑOL O INGLÉS
     if t in ("multiplicacion", "multiplication") and get_multiplication_hint:
         actual_step = step or "mult_parcial"
         hint = get_multiplication_hint(actual_step, e, ctx, answer)
-        _validate_hint_type("multiplicacion", actual_step)
+        _record_hint("multiplicacion", actual_step)
         return hint
 
     # --- División --- ✅ ACEPTA TEMA EN ESPAÑOL O INGLÉS
     if t in ("division",) and get_division_hint:
         actual_step = step or "div_qdigit"
         hint = get_division_hint(actual_step, e, ctx, answer)
-        _validate_hint_type("division", actual_step)
+        _record_hint("division", actual_step)
         return hint
 
     # --- Fracciones --- ✅ ACEPTA TEMA EN ESPAÑOL O INGLÉS
     if t in ("fracciones", "fractions"):
         ctx = _ensure_frac_marker(ctx)
         if step == "frac_inicio" and _frac_inicio_hint:
-            _validate_hint_type("fracciones", step)
+            _record_hint("fracciones", step)
             return _frac_inicio_hint(ctx, e, c)
         if step == "frac_mcm" and _frac_mcm_hint:
-            _validate_hint_type("fracciones", step)
+            _record_hint("fracciones", step)
             return _frac_mcm_hint(ctx, e, c)
         if step == "frac_equiv" and _frac_equiv_hint:
-            _validate_hint_type("fracciones", step)
+            _record_hint("fracciones", step)
             return _frac_equiv_hint(ctx, e, c)
         if step == "frac_operacion" and _frac_operacion_hint:
-            _validate_hint_type("fracciones", step)
+            _record_hint("fracciones", step)
             return _frac_operacion_hint(ctx, e, c)
         if step == "frac_simplificar" and _frac_simplificar_hint:
-            _validate_hint_type("fracciones", step)
+            _record_hint("fracciones", step)
             return _frac_simplificar_hint(ctx, e, c)
 
     # --- Decimales --- ✅ CORREGIDO: Ahora pasa los 4 parámetros
     if t in ("decimales", "decimals") and get_decimals_hint:
         hint = get_decimals_hint(step, e, ctx, answer)
-        _validate_hint_type("decimales", step)
+        _record_hint("decimales", step)
         return hint
 
     # --- Geometría --- ✅ CORREGIDO: Ahora pasa los 4 parámetros
     if t in ("geometria", "geometry") and get_geometry_hint:
         hint = get_geometry_hint(step, e, ctx, answer)
-        _validate_hint_type("geometria", step)
+        _record_hint("geometria", step)
         return hint
 
     # --- Medidas --- ✅ CORREGIDO: Ahora pasa los 4 parámetros
     if t in ("medidas", "measures") and get_measures_hint:
         hint = get_measures_hint(step, e, ctx, answer)
-        _validate_hint_type("medidas", step)
+        _record_hint("medidas", step)
         return hint
 
     # --- Porcentajes --- ✅ CORREGIDO: Ahora pasa los 4 parámetros
     if t in ("porcentajes", "percentages") and get_percentages_hint:
         hint = get_percentages_hint(step, e, ctx, answer)
-        _validate_hint_type("porcentajes", step)
+        _record_hint("porcentajes", step)
         return hint
 
     # --- Estadística --- ✅ CORREGIDO: Ahora pasa los 4 parámetros
     if t in ("estadistica", "probabilidad", "statistics", "probability"):
         if get_statistics_hint:
             hint = get_statistics_hint(step, e, ctx, answer)
-            _validate_hint_type("estadistica", step)
+            _record_hint("estadistica", step)
             return hint
 
     # --- Lectura / Reading --- ✅ NUEVO: Soporte para comprensión lectora
     if t in ("lectura", "reading", "comprension", "comprehension") and get_reading_hint:
         hint = get_reading_hint(step, e, ctx, answer)
-        _validate_hint_type("lectura", step)
+        _record_hint("lectura", step)
         return hint
 
     # --- Carga dinámica genérica ---
@@ -250,7 +255,7 @@ def generate_hint_with_ai(
         hints_module = import_module(f"logic.ai_hints.hints_{t}")
         if hasattr(hints_module, "get_hint"):
             hint = hints_module.get_hint(step, e, ctx, answer)
-            _validate_hint_type(t, step)
+            _record_hint(t, step)
             return hint
     except ModuleNotFoundError:
         pass
@@ -259,10 +264,21 @@ def generate_hint_with_ai(
 
     # --- Último recurso: IA ---
     hint = _generate_ai_hint(topic, step, e, ctx)
-    _validate_hint_type("general", "ai_generated")
+    _record_hint("general", "ai_generated")
     return hint
 
 
+# === REGISTRO DE PISTAS DEVUELTAS ===
+def _record_hint(topic: str, hint_type: str) -> None:
+    """
+    Se llama justo antes de devolver cada pista: valida su hint_type
+    y la cuenta en métricas según su origen (módulo interno o IA de respaldo).
+    """
+    source = "ai_fallback" if hint_type == "ai_generated" else "module"
+    metrics.HINTS.inc(topic, source)
+    _validate_hint_type(topic, hint_type)
+
+
 # === VALIDACIÓN SILENCIOSA DE hint_types ===
 def _validate_hint_type(topic: str, hint_type: str) -> None:
     """
@@ -7,6 +7,8 @@ Compatible con division_engine.py
 from .hints_utils import _extract_pre_block, _question
 import re
 from typing import Optional
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 # ────────── Pistas por subpaso ──────────
 def _div_grupo_hint(context: str, err: int, cycle: str) -> str:
@@ -133,9 +135,8 @@ def _div_bajar_hint(context: str, err: int, cycle: str) -> str:
 
 # ────────── Integración con OpenAI ──────────
 try:
-    from openai import OpenAI
     import os
-    _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    _client = get_client()
     _USE_AI = bool(os.getenv("OPENAI_API_KEY"))
 except Exception:
     _client = None
@@ -152,8 +153,9 @@ def _ai_hint(step: str, context: str, answer: str, err: int) -> Optional[str]:
     if not _USE_AI or not _client or err < 2:
         return None
     try:
-        res = _client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        res = chat_completion(
+            _client, "hints_division",
+            model=choose_model("hint"),
             messages=[
                 {"role": "system", "content": "Eres un profesor de Primaria empático y paciente."},
                 {"role": "user", "content": PROMPT.format(step=step, context=context, answer=answer, err=err)},
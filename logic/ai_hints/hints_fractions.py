@@ -10,6 +10,8 @@ from .hints_utils import _extract_pre_block, _lcm, _question
 import re
 import math
 from typing import Optional, Tuple
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 # ────────── Utilidades ──────────
 def _parse_two_fractions(ctx: str):
@@ -264,9 +266,8 @@ def _frac_simplificar_hint(context: str, err: int, cycle: str) -> str:
 
 # ────────── Integración con OpenAI ──────────
 try:
-    from openai import OpenAI
     import os
-    _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    _client = get_client()
     _USE_AI = bool(os.getenv("OPENAI_API_KEY"))
 except Exception:
     _client = None
@@ -284,8 +285,9 @@ def _ai_hint(step: str, context: str, answer: str, err: int) -> Optional[str]:
         return None
     
     try:
-        res = _client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        res = chat_completion(
+            _client, "hints_fractions",
+            model=choose_model("hint"),
             messages=[
                 {"role": "system", "content": "Eres un profesor de Primaria empático y paciente."},
                 {"role": "user", "content": PROMPT.format(step=step, context=context, answer=answer, err=err)},
@@ -9,14 +9,15 @@ Pistas progresivas para geometría.
 """
 from typing import Optional
 import os
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 # ══════════════════════════════════════════════════════════════
 # INTEGRACIÓN CON OPENAI
 # ══════════════════════════════════════════════════════════════
 
 try:
-    from openai import OpenAI
-    _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    _client = get_client()
     _USE_AI = bool(os.getenv("OPENAI_API_KEY"))
 except Exception:
     _client = None
@@ -77,8 +78,9 @@ def _ai_hint(hint_type: str, context: str, answer: str, err: int) -> Optional[st
     prompt = prompt_template.format(context=context, answer=answer, err=err)
     
     try:
-        res = _client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        res = chat_completion(
+            _client, "hints_geometry",
+            model=choose_model("hint"),
             messages=[
                 {"role": "system", "content": "Eres Tutorín, profesor de Primaria empático y claro. Hablas con naturalidad a niños de 8-12 años."},
                 {"role": "user", "content": prompt}
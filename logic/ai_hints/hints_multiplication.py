@@ -6,6 +6,8 @@ Incluye detección especial para llevada final.
 """
 import re
 from typing import Optional
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 # ────────── Utilidades ──────────
 def _extract_multiplication_from_context(context: str) -> Optional[tuple]:
@@ -207,9 +209,8 @@ def _mult_suma_hint(context: str, err: int, cycle: str) -> str:
 
 # ────────── Integración con OpenAI ──────────
 try:
-    from openai import OpenAI
     import os
-    _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    _client = get_client()
     _USE_AI = bool(os.getenv("OPENAI_API_KEY"))
 except Exception:
     _client = None
@@ -226,8 +227,9 @@ def _ai_hint(step: str, context: str, answer: str, err: int) -> Optional[str]:
     if not _USE_AI or not _client or err < 3:
         return None
     try:
-        res = _client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        res = chat_completion(
+            _client, "hints_multiplication",
+            model=choose_model("hint"),
             messages=[
                 {"role": "system", "content": "Eres un profesor de Primaria empático, claro y paciente."},
                 {"role": "user", "content": PROMPT.format(step=step, context=context, answer=answer, err=err)},
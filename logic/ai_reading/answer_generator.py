@@ -10,12 +10,41 @@ import os
 import json
 import logging
 from typing import List, Dict, Any, Optional
-from openai import OpenAI, OpenAIError
+from fastapi.concurrency import run_in_threadpool
+from openai import OpenAIError
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 logger = logging.getLogger("tutorin.answer_generator")
 
 # Cliente OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client()
+
+
+# Instrucciones fijas (mensaje de sistema, prefijo común a todas las llamadas)
+ANSWERS_PROMPT = """Eres Tutorín, un profesor virtual de Primaria experto en comprensión lectora. Respondes en formato JSON.
+
+Genera la respuesta esperada de cada pregunta que se te envíe basándote ÚNICAMENTE en el texto que la acompaña:
+1. Respuestas concisas (1-2 oraciones máximo)
+2. Lenguaje apropiado para estudiantes de Primaria
+3. Solo con información del texto
+4. Vocabulario: definiciones simples
+5. Inferencia: la conclusión lógica
+
+Devuelve SOLO un JSON con este formato exacto, una respuesta por pregunta y en el mismo orden:
+{
+  "answers": [
+    "respuesta a pregunta 1",
+    "respuesta a pregunta 2",
+    ...
+  ]
+}"""
+
+ANSWERS_INPUT = """TEXTO:
+{text}
+
+PREGUNTAS:
+{questions}"""
 
 
 async def generate_answers_for_questions(
@@ -44,43 +73,18 @@ async def generate_answers_for_questions(
         f"{i+1}. {q['q']}" for i, q in enumerate(questions)
     ])
 
-    prompt = f"""Eres Tutorín, un profesor virtual de Primaria experto en comprensión lectora.
-
-TEXTO:
-{text}
-
-PREGUNTAS:
-{questions_list}
-
-Tu tarea es generar respuestas esperadas para cada pregunta basándote ÚNICAMENTE en el texto proporcionado.
-
-INSTRUCCIONES:
-1. Las respuestas deben ser concisas (1-2 oraciones máximo)
-2. Usar lenguaje apropiado para estudiantes de Primaria
-3. Basarse SOLO en la información del texto
-4. Para preguntas de vocabulario, dar definiciones simples
-5. Para preguntas de inferencia, proporcionar la conclusión lógica
-
-Devuelve un JSON con este formato exacto:
-{{
-  "answers": [
-    "respuesta a pregunta 1",
-    "respuesta a pregunta 2",
-    ...
-  ]
-}}
-
-IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional."""
+    prompt = ANSWERS_INPUT.format(text=text, questions=questions_list)
 
     try:
         logger.info(f"🤖 Generando respuestas para {len(questions)} preguntas...")
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = await run_in_threadpool(
+            chat_completion, client, "ai_reading.answer_generator",
+            model=choose_model("questions"),
             messages=[
                 {
                     "role": "system",
-                    "content": "Eres un profesor experto en comprensión lectora. Respondes en formato JSON."
+                    "content": ANSWERS_PROMPT
                 },
                 {
                     "role": "user",
@@ -7,15 +7,99 @@ Usa GPT-4 Vision para extraer texto y preguntas de imágenes.
 """
 
 import os
+import copy
 import json
+import base64
+import binascii
 import logging
 from typing import Dict, Any, List
-from openai import OpenAI, OpenAIError
+from fastapi.concurrency import run_in_threadpool
+from openai import OpenAIError
+from logic.core import image_cache
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 logger = logging.getLogger("tutorin.photo_parser")
 
 # Cliente OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client()
+
+# Espacio de nombres en image_cache para las transcripciones de una sola foto
+PHOTO_CACHE_NAMESPACE = "reading_photo"
+
+
+# Instrucciones fijas en el mensaje de sistema (prefijo común a todas las
+# llamadas); en el mensaje del usuario solo va lo que cambia y la imagen
+PHOTO_PROMPT = """Eres Tutorín, un profesor virtual experto en analizar ejercicios de lectura en libros de texto. Respondes en formato JSON.
+
+Extrae de la imagen:
+1. El TEXTO PRINCIPAL de lectura (si hay)
+2. Las PREGUNTAS de comprensión lectora (si hay)
+
+INSTRUCCIONES:
+- Transcribe el texto tal como aparece, respetando la ortografía y puntuación
+- Identifica todas las preguntas (pueden estar numeradas, con letras, con viñetas, etc.)
+- NO inventes ni agregues nada que no esté en la imagen
+- NO respondas las preguntas, solo extráelas
+
+Devuelve SOLO un JSON con este formato EXACTO:
+{
+  "text": "el texto principal de lectura (o cadena vacía si no hay)",
+  "questions": [
+    "pregunta 1",
+    "pregunta 2",
+    ...
+  ]
+}
+
+Si la imagen NO contiene texto de lectura, pon "text": "". Si NO hay preguntas, pon "questions": []."""
+
+PHOTO_INPUT = "Extrae el texto y las preguntas de esta imagen."
+
+MULTI_PHOTO_PROMPT = """Eres Tutorín, un profesor virtual experto en extraer texto e información de fotos de libros de texto de primaria (ESPAÑA). Respondes en formato JSON.
+
+Cada foto es una parte de un mismo ejercicio de lectura:
+- Si contiene TEXTO NARRATIVO/EXPOSITIVO para leer → extráelo completo
+- Si contiene PREGUNTAS de comprensión → extráelas todas
+- Si solo tiene parte del texto, está bien, las otras fotos tendrán el resto
+- Si es la última foto, probablemente tiene las preguntas
+
+FORMATO JSON:
+{
+  "text": "texto extraído aquí (o null si no hay texto relevante)",
+  "questions": [
+    {"q": "¿pregunta?", "type": "detail"},
+    {"q": "¿otra pregunta?", "type": "main_idea"}
+  ]
+}
+
+TIPOS de preguntas:
+- "detail": información explícita
+- "main_idea": idea principal
+- "vocabulary": significado de palabras
+- "inference": deducir algo no explícito
+- "comprehension": comprensión general
+
+Si NO hay preguntas en la foto, deja array vacío: "questions": []
+Si NO hay texto relevante, pon: "text": null"""
+
+MULTI_PHOTO_INPUT = "Esta es la FOTO {photo_num} de {total_photos} fotos totales."
+
+
+def _data_url(image_base64: str) -> str:
+    """URL data: para la API (las imágenes preprocesadas ya traen su tipo MIME)."""
+    if image_base64.startswith("data:"):
+        return image_base64
+    return f"data:image/jpeg;base64,{image_base64}"
+
+
+def _image_key(image_base64: str):
+    """Huella de la imagen para image_cache (None si el base64 no es válido)."""
+    try:
+        raw = base64.b64decode(image_base64.split(",", 1)[-1], validate=False)
+        return image_cache.fingerprint(raw)
+    except (binascii.Error, ValueError):
+        return None
 
 
 async def parse_reading_from_photo(image_base64: str) -> Dict[str, Any]:
@@ -23,7 +107,8 @@ async def parse_reading_from_photo(image_base64: str) -> Dict[str, Any]:
     Extrae texto y preguntas de una foto de ejercicio de lectura.
 
     Args:
-        image_base64: Imagen en formato base64 (sin el prefijo data:image/...)
+        image_base64: Imagen en base64, o URL data: con su tipo MIME
+            (p. ej. PreparedImage.data_url() de logic.core.image_prep)
 
     Returns:
         Diccionario con formato:
@@ -40,56 +125,36 @@ async def parse_reading_from_photo(image_base64: str) -> Dict[str, Any]:
     Raises:
         OpenAIError: Si hay error en la API de OpenAI
     """
-    prompt = """Eres Tutorín, un profesor virtual experto en analizar ejercicios de lectura en libros de texto.
-
-Tu tarea es extraer:
-1. El TEXTO PRINCIPAL de lectura (si hay)
-2. Las PREGUNTAS de comprensión lectora (si hay)
-
-INSTRUCCIONES:
-- Transcribe el texto tal como aparece, respetando la ortografía y puntuación
-- Identifica todas las preguntas (pueden estar numeradas, con letras, con viñetas, etc.)
-- Si NO hay texto de lectura claro, indica que no se encontró
-- Si NO hay preguntas, deja la lista vacía
-- NO inventes ni agregues nada que no esté en la imagen
-- NO respondas las preguntas, solo extráelas
-
-Devuelve un JSON con este formato EXACTO:
-{
-  "text": "el texto principal de lectura (o cadena vacía si no hay)",
-  "questions": [
-    "pregunta 1",
-    "pregunta 2",
-    ...
-  ]
-}
-
-IMPORTANTE:
-- Si la imagen NO contiene texto de lectura, pon "text": ""
-- Si NO hay preguntas, pon "questions": []
-- Devuelve SOLO el JSON, sin texto adicional"""
+    # Las fotos de una página ya transcrita (misma imagen o casi idéntica y
+    # confirmada por su miniatura) reutilizan su resultado
+    image_key = await run_in_threadpool(_image_key, image_base64)
+    if image_key is not None:
+        cached = image_cache.lookup(PHOTO_CACHE_NAMESPACE, image_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
 
     try:
         logger.info("📸 Analizando foto de ejercicio de lectura...")
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = await run_in_threadpool(
+            chat_completion, client, "ai_reading.photo_parser",
+            model=choose_model("vision"),
             messages=[
                 {
                     "role": "system",
-                    "content": "Eres un profesor experto en extraer texto e información de imágenes. Respondes en formato JSON."
+                    "content": PHOTO_PROMPT
                 },
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": prompt
+                            "text": PHOTO_INPUT
                         },
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
+                                "url": _data_url(image_base64)
                             }
                         }
                     ]
@@ -169,12 +234,15 @@ IMPORTANTE:
 
         logger.info(f"✅ {success_message}")
 
-        return {
+        result = {
             "text": text,
             "questions": questions,
             "success": True,
             "message": success_message
         }
+        if image_key is not None:
+            image_cache.store(PHOTO_CACHE_NAMESPACE, image_key, copy.deepcopy(result))
+        return result
 
     except json.JSONDecodeError as e:
         logger.error(f"❌ Error parseando JSON de GPT-4 Vision: {e}")
@@ -220,43 +288,16 @@ async def parse_multiple_reading_photos(images_base64: List[str]) -> Dict[str, A
         photo_num = i + 1
         total_photos = len(images_base64)
 
-        prompt = f"""Analiza esta foto de un libro de texto de primaria (ESPAÑA).
-
-Esta es la FOTO {photo_num} de {total_photos} fotos totales.
-
-INSTRUCCIONES:
-- Si esta foto contiene TEXTO NARRATIVO/EXPOSITIVO para leer → extraelo completo
-- Si esta foto contiene PREGUNTAS de comprensión → extraelas todas
-- Si solo tiene parte del texto, está bien, las otras fotos tendrán el resto
-- Si es la última foto, probablemente tiene las preguntas
-
-FORMATO JSON:
-{{
-  "text": "texto extraído aquí (o null si no hay texto relevante)",
-  "questions": [
-    {{"q": "¿pregunta?", "type": "detail"}},
-    {{"q": "¿otra pregunta?", "type": "main_idea"}}
-  ]
-}}
-
-TIPOS de preguntas:
-- "detail": información explícita
-- "main_idea": idea principal
-- "vocabulary": significado de palabras
-- "inference": deducir algo no explícito
-- "comprehension": comprensión general
-
-Si NO hay preguntas en esta foto, deja array vacío: "questions": []
-Si NO hay texto relevante, pon: "text": null
-"""
+        prompt = MULTI_PHOTO_INPUT.format(photo_num=photo_num, total_photos=total_photos)
 
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
+            response = await run_in_threadpool(
+                chat_completion, client, "ai_reading.photo_parser.multi",
+                model=choose_model("vision"),
                 messages=[
                     {
                         "role": "system",
-                        "content": "Eres un profesor experto en extraer texto e información de imágenes. Respondes en formato JSON."
+                        "content": MULTI_PHOTO_PROMPT
                     },
                     {
                         "role": "user",
@@ -265,7 +306,7 @@ Si NO hay texto relevante, pon: "text": null
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}",
+                                    "url": _data_url(image_base64),
                                     "detail": "high"
                                 }
                             }
@@ -319,16 +360,20 @@ Si NO hay texto relevante, pon: "text": null
     logger.info(f"✅ Texto combinado: {len(combined_text)} caracteres")
     logger.info(f"✅ Preguntas encontradas: {len(all_questions)}")
 
-    # Si NO hay preguntas en las fotos, generarlas automáticamente
-    if not all_questions:
-        logger.info("🤖 No hay preguntas en las fotos, generando automáticamente...")
-        from logic.ai_reading.question_generator import generate_questions_with_gpt4
-        all_questions = await generate_questions_with_gpt4(combined_text, "3")
-    else:
+    async def _complete_questions():
+        # Si NO hay preguntas en las fotos, generarlas automáticamente
+        if not all_questions:
+            logger.info("🤖 No hay preguntas en las fotos, generando automáticamente...")
+            from logic.ai_reading.question_generator import generate_questions_with_gpt4
+            return await generate_questions_with_gpt4(combined_text, "3")
         # Hay preguntas pero sin respuestas → generarlas
         logger.info("🤖 Generando respuestas para las preguntas encontradas...")
         from logic.ai_reading.answer_generator import generate_answers_for_questions
-        all_questions = await generate_answers_for_questions(combined_text, all_questions)
+        return await generate_answers_for_questions(combined_text, all_questions)
+
+    # Reutilizar lo generado para la misma página si ya se había subido
+    from logic.ai_reading.text_dedup import reuse_or_generate
+    all_questions = await reuse_or_generate(combined_text, all_questions, "3", _complete_questions)
 
     return {
         "text": combined_text,
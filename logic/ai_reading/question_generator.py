@@ -10,12 +10,48 @@ import os
 import json
 import logging
 from typing import List, Dict, Any
-from openai import OpenAI, OpenAIError
+from fastapi.concurrency import run_in_threadpool
+from openai import OpenAIError
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 logger = logging.getLogger("tutorin.question_generator")
 
 # Cliente OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client()
+
+
+# Instrucciones fijas (mensaje de sistema, prefijo común a todas las llamadas)
+QUESTIONS_PROMPT = """Eres Tutorín, un profesor virtual experto en comprensión lectora para Primaria. Respondes en formato JSON.
+
+Genera EXACTAMENTE 4 preguntas de comprensión lectora sobre el texto que se te envíe, una de cada tipo:
+
+1. DETALLE (detail): información específica que está explícitamente en el texto (¿Cuándo?, ¿Dónde?, ¿Quién?, ¿Cuántos?, ¿Cómo se llama?)
+2. IDEA PRINCIPAL (main_idea): el tema central del texto (¿De qué trata?, ¿Cuál es la idea principal?)
+3. VOCABULARIO (vocabulary): el significado de una palabra del texto (¿Qué significa?, ¿Qué quiere decir?)
+4. INFERENCIA (inference): deducir o concluir algo no explícito (¿Por qué?, ¿Qué crees que...?)
+
+REQUISITOS:
+- Nivel educativo y complejidad: los indicados con el texto
+- Respuestas: concisas (1-2 oraciones), basadas SOLO en el texto
+- Lenguaje: español de España, apropiado para la edad
+- Las preguntas deben terminar con "?"
+
+Devuelve SOLO un JSON con este formato EXACTO:
+{
+  "questions": [
+    {"type": "detail", "q": "pregunta de detalle", "answer": "respuesta"},
+    {"type": "main_idea", "q": "pregunta de idea principal", "answer": "respuesta"},
+    {"type": "vocabulary", "q": "pregunta de vocabulario", "answer": "respuesta"},
+    {"type": "inference", "q": "pregunta de inferencia", "answer": "respuesta"}
+  ]
+}"""
+
+QUESTIONS_INPUT = """Nivel educativo: {level}º de Primaria
+Complejidad: {complexity}
+
+TEXTO:
+{text}"""
 
 
 async def generate_questions_with_gpt4(
@@ -53,53 +89,18 @@ async def generate_questions_with_gpt4(
 
     complexity_hint = level_hints.get(level, level_hints["3"])
 
-    prompt = f"""Eres Tutorín, un profesor virtual experto en comprensión lectora para Primaria.
-
-TEXTO:
-{text}
-
-Tu tarea es generar EXACTAMENTE 4 preguntas de comprensión lectora sobre este texto, una de cada tipo:
-
-1. DETALLE (detail): Pregunta sobre información específica que está explícitamente en el texto
-   - Usa palabras como: ¿Cuándo?, ¿Dónde?, ¿Quién?, ¿Cuántos?, ¿Cómo se llama?
-
-2. IDEA PRINCIPAL (main_idea): Pregunta sobre el tema central del texto
-   - Usa palabras como: ¿De qué trata?, ¿Cuál es la idea principal?, ¿Qué tema?
-
-3. VOCABULARIO (vocabulary): Pregunta sobre el significado de una palabra del texto
-   - Usa palabras como: ¿Qué significa?, ¿Qué quiere decir?
-
-4. INFERENCIA (inference): Pregunta que requiere deducir o concluir algo no explícito
-   - Usa palabras como: ¿Por qué?, ¿Qué crees que?, ¿Por qué razón?
-
-REQUISITOS:
-- Nivel educativo: {level}º de Primaria
-- Complejidad: {complexity_hint}
-- Respuestas: concisas (1-2 oraciones), basadas SOLO en el texto
-- Lenguaje: español de España, apropiado para la edad
-- Formato: las preguntas deben terminar con "?"
-
-Devuelve un JSON con este formato EXACTO:
-{{
-  "questions": [
-    {{"type": "detail", "q": "pregunta de detalle", "answer": "respuesta"}},
-    {{"type": "main_idea", "q": "pregunta de idea principal", "answer": "respuesta"}},
-    {{"type": "vocabulary", "q": "pregunta de vocabulario", "answer": "respuesta"}},
-    {{"type": "inference", "q": "pregunta de inferencia", "answer": "respuesta"}}
-  ]
-}}
-
-IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional."""
+    prompt = QUESTIONS_INPUT.format(text=text, level=level, complexity=complexity_hint)
 
     try:
         logger.info(f"🤖 Generando 4 preguntas para nivel {level}...")
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = await run_in_threadpool(
+            chat_completion, client, "ai_reading.question_generator",
+            model=choose_model("questions"),
             messages=[
                 {
                     "role": "system",
-                    "content": "Eres un profesor experto en crear preguntas de comprensión lectora. Respondes en formato JSON."
+                    "content": QUESTIONS_PROMPT
                 },
                 {
                     "role": "user",
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+reading_jobs.py
+--------------------------------------------------
+Modo asíncrono ("trabajos") para los endpoints largos de /reading/*.
+
+Con `?async=true`, /reading/setup, /generate, /from-photo y /from-photos
+no esperan a que terminen las llamadas a GPT-4:
+  1. Se registra el trabajo en la tabla reading_jobs y se encola.
+  2. El endpoint responde 202 con el job_id.
+  3. Un pool acotado de hilos ejecuta el pipeline e informa de la etapa
+     (extract, generate_text, generate_questions, generate_answers, save).
+  4. El cliente consulta GET /reading/jobs/{id} o se suscribe por SSE a
+     GET /reading/jobs/{id}/events.
+
+Así una ráfaga de fotos no agota los workers HTTP: como mucho hay
+READING_JOB_WORKERS pipelines en marcha y READING_JOB_QUEUE_MAX en espera.
+
+Cada trabajo guarda el proceso que lo ejecuta (owner). Al arrancar solo se
+dan por perdidos los trabajos a medias de este mismo proceso o los que no
+avanzan desde hace READING_JOB_STALE_SECONDS; los de otros workers vivos
+siguen su curso. get_job() aplica la misma regla de caducidad.
+
+Configuración:
+    READING_JOB_WORKERS         hilos que ejecutan trabajos (2)
+    READING_JOB_QUEUE_MAX       trabajos en espera antes de responder 503 (50)
+    READING_JOB_STALE_SECONDS   sin cambios durante este tiempo → perdido (900)
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import db
+from logic.core import metrics
+
+logger = logging.getLogger("tutorin.reading_jobs")
+
+JOB_WORKERS = int(os.getenv("READING_JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("READING_JOB_QUEUE_MAX", "50"))
+JOB_STALE_SECONDS = float(os.getenv("READING_JOB_STALE_SECONDS", "900"))
+
+_OWNER = f"{socket.gethostname()}-pid-{os.getpid()}"
+
+# Etapas de cada tipo de trabajo, en orden (para calcular el progreso)
+JOB_STAGES: Dict[str, List[str]] = {
+    "setup": ["extract", "generate_questions", "generate_answers", "save"],
+    "generate": ["generate_text", "generate_questions", "save"],
+    "from-photo": ["extract", "generate_questions", "generate_answers", "save"],
+    "from-photos": ["extract", "save"],
+}
+
+TERMINAL_STATUSES = ("done", "error")
+STALE_REASON = "Trabajo interrumpido por un reinicio del servidor"
+
+# Un pipeline recibe `progress(stage)` y devuelve el cuerpo de la respuesta
+Progress = Callable[[str], None]
+Pipeline = Callable[[Progress], Awaitable[Dict[str, Any]]]
+
+
+class QueueFullError(Exception):
+    """No caben más trabajos en la cola."""
+
+
+def no_progress(stage: str) -> None:
+    """Callback vacío para el modo síncrono."""
+
+
+# ═══════════════════════════════════════════════════════════════
+# COLA Y WORKERS
+# ═══════════════════════════════════════════════════════════════
+
+_queue: "queue.Queue" = queue.Queue(maxsize=JOB_QUEUE_MAX)
+_threads: List[threading.Thread] = []
+_threads_lock = threading.Lock()
+
+
+def _ensure_workers() -> None:
+    if _threads:
+        return
+    with _threads_lock:
+        if _threads:
+            return
+        for i in range(max(1, JOB_WORKERS)):
+            t = threading.Thread(target=_worker, name=f"reading-job-{i}", daemon=True)
+            t.start()
+            _threads.append(t)
+        logger.info(f"🧵 Trabajos de lectura: {len(_threads)} worker(s), cola máx. {JOB_QUEUE_MAX}")
+
+
+def submit(kind: str, pipeline: Pipeline) -> str:
+    """
+    Registra y encola un trabajo. Devuelve su job_id.
+    Lanza QueueFullError si la cola está llena.
+    """
+    job_id = str(uuid.uuid4())
+    db.create_reading_job(job_id, kind, _OWNER)
+    try:
+        _queue.put_nowait((job_id, kind, pipeline))
+    except queue.Full:
+        db.update_reading_job(job_id, status="error", error="Cola de trabajos llena", error_status=503)
+        metrics.READING_JOBS.inc(kind, "rejected")
+        raise QueueFullError(job_id)
+    metrics.READING_JOBS.inc(kind, "queued")
+    metrics.READING_JOB_QUEUE.set(_queue.qsize())
+    _ensure_workers()
+    return job_id
+
+
+def _worker() -> None:
+    while True:
+        job_id, kind, pipeline = _queue.get()
+        metrics.READING_JOB_QUEUE.set(_queue.qsize())
+        try:
+            _run(job_id, kind, pipeline)
+        finally:
+            _queue.task_done()
+
+
+def _run(job_id: str, kind: str, pipeline: Pipeline) -> None:
+    stages = JOB_STAGES.get(kind, [])
+
+    def progress(stage: str) -> None:
+        pct = int(100 * stages.index(stage) / len(stages)) if stage in stages else None
+        fields = {"stage": stage}
+        if pct is not None:
+            fields["progress"] = pct
+        db.update_reading_job(job_id, **fields)
+
+    db.update_reading_job(job_id, status="running")
+    try:
+        result = asyncio.run(pipeline(progress))
+    except Exception as e:
+        # HTTPException (validación) conserva su código; el resto es un 500
+        status = getattr(e, "status_code", 500)
+        detail = getattr(e, "detail", None) or str(e)
+        logger.error(f"❌ Trabajo {job_id} ({kind}) falló: {detail}")
+        db.update_reading_job(job_id, status="error", error=str(detail), error_status=status)
+        metrics.READING_JOBS.inc(kind, "error")
+        return
+
+    db.update_reading_job(
+        job_id, status="done", stage="done", progress=100,
+        exercise_id=result.get("exercise_id"), result=result,
+    )
+    metrics.READING_JOBS.inc(kind, "done")
+    logger.info(f"✅ Trabajo {job_id} ({kind}) terminado: {result.get('exercise_id')}")
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    job = db.get_reading_job(job_id)
+    if job and job["status"] not in TERMINAL_STATUSES and job.get("owner") != _OWNER and _is_stale(job):
+        # Trabajo de otro proceso que lleva demasiado sin avanzar: se da por perdido
+        if db.fail_unfinished_reading_jobs(STALE_REASON, None, JOB_STALE_SECONDS, job_id):
+            job = db.get_reading_job(job_id)
+    return job
+
+
+def _is_stale(job: Dict[str, Any]) -> bool:
+    try:
+        updated = datetime.strptime(job["updated_at"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (datetime.now(timezone.utc) - updated).total_seconds() > JOB_STALE_SECONDS
+
+
+def recover_unfinished() -> None:
+    """
+    Al arrancar, los trabajos "queued"/"running" que ya no tienen quien los
+    termine se marcan como error para que el cliente reintente: los de este
+    mismo proceso (p. ej. un contenedor reiniciado con el mismo hostname y
+    pid) y los de cualquiera que no avancen desde hace JOB_STALE_SECONDS.
+    Los trabajos en curso de otros workers no se tocan.
+    """
+    count = db.fail_unfinished_reading_jobs(STALE_REASON, _OWNER, JOB_STALE_SECONDS)
+    if count:
+        logger.warning(f"⚠️ {count} trabajo(s) de lectura interrumpidos marcados como error")
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+reading_pool.py
+--------------------------------------------------
+Reserva de ejercicios de lectura pregenerados para /reading/generate.
+
+Generar un ejercicio encadena dos llamadas a GPT-4 (texto + preguntas) y
+suele tardar 10-20 s. Como el catálogo get_available_topics() ×
+get_available_levels() es pequeño y fijo, unos hilos productores en segundo
+plano mantienen un stock de ejercicios listos por (tema, nivel):
+
+- `take_exercise()` sirve un ejercicio del stock al instante (o None si no hay).
+- Política de marca de agua baja: cuando el stock de una clave (contando los
+  que se están generando) baja de READING_POOL_LOW_WATERMARK, se rellena
+  hasta READING_POOL_TARGET.
+
+El stock vive en memoria de cada proceso: al arrancar, cada worker llena
+todas las claves (≈ 2 llamadas a GPT-4 por ejercicio × claves × objetivo) y
+lo pierde al reiniciarse. Por eso está desactivada por defecto; conviene
+activarla solo en un único proceso de larga duración.
+
+Configuración (variables de entorno):
+    READING_POOL_ENABLED         "0" (por defecto) / "1"; requiere OPENAI_API_KEY
+    READING_POOL_TARGET          ejercicios por (tema, nivel)         (2)
+    READING_POOL_LOW_WATERMARK   umbral que dispara el relleno        (1)
+    READING_POOL_WORKERS         hilos productores                    (1)
+    READING_POOL_RETRY_SECONDS   espera tras un error de generación   (30)
+
+Métricas: tutorin_reading_pool_depth{topic,level},
+tutorin_reading_pool_generated_total{outcome} y
+tutorin_cache_requests_total{cache="reading_pool"}.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from logic.core import metrics
+
+logger = logging.getLogger("tutorin.reading_pool")
+
+POOL_ENABLED = os.getenv("READING_POOL_ENABLED", "0") == "1"
+POOL_TARGET = int(os.getenv("READING_POOL_TARGET", "2"))
+POOL_LOW_WATERMARK = int(os.getenv("READING_POOL_LOW_WATERMARK", "1"))
+POOL_WORKERS = int(os.getenv("READING_POOL_WORKERS", "1"))
+POOL_RETRY_SECONDS = float(os.getenv("READING_POOL_RETRY_SECONDS", "30"))
+
+Key = Tuple[str, str]  # (tema, nivel)
+
+
+def _key(topic: str, level: str) -> Key:
+    return ((topic or "").strip().lower(), str(level or "").strip())
+
+
+async def generate_exercise(topic: str, level: str) -> Dict[str, Any]:
+    """
+    Genera un ejercicio completo (texto + preguntas) con GPT-4.
+    Lanza ValueError si el resultado no es válido.
+    """
+    from logic.ai_reading.text_generator import generate_text_with_gpt4
+    from logic.ai_reading.question_generator import generate_questions_with_gpt4, validate_generated_questions
+
+    text = await generate_text_with_gpt4(topic, level)
+    if not text or len(text.split()) < 50:
+        raise ValueError("El texto generado es demasiado corto")
+
+    questions = await generate_questions_with_gpt4(text, level)
+    if not validate_generated_questions(questions):
+        raise ValueError("Las preguntas generadas no son válidas")
+
+    return {"text": text, "questions": questions}
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESERVA
+# ═══════════════════════════════════════════════════════════════
+
+class ReadingPool:
+    """Stock de ejercicios por (tema, nivel) rellenado por hilos productores."""
+
+    def __init__(self, keys: List[Key], target: int = POOL_TARGET,
+                 low_watermark: int = POOL_LOW_WATERMARK, workers: int = POOL_WORKERS,
+                 retry_seconds: float = POOL_RETRY_SECONDS):
+        self.target = max(1, target)
+        self.low_watermark = max(1, min(low_watermark, self.target))
+        self.workers = max(1, workers)
+        self.retry_seconds = retry_seconds
+        self._stock: Dict[Key, Deque[Dict[str, Any]]] = {k: deque() for k in keys}
+        self._inflight: Dict[Key, int] = {k: 0 for k in keys}
+        self._refilling: Set[Key] = set(keys)  # al arrancar, todo está bajo la marca
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        for k in keys:
+            self._publish(k)
+
+    # ── consumo ────────────────────────────────────────────────
+
+    def take(self, topic: str, level: str) -> Optional[Dict[str, Any]]:
+        """Saca un ejercicio del stock (None si la clave no existe o está vacía)."""
+        key = _key(topic, level)
+        with self._cond:
+            stock = self._stock.get(key)
+            exercise = stock.popleft() if stock else None
+            if stock is not None and len(stock) + self._inflight[key] < self.low_watermark:
+                self._refilling.add(key)
+                self._cond.notify()
+        if stock is not None:
+            self._publish(key)
+        metrics.CACHE_REQUESTS.inc("reading_pool", "hit" if exercise else "miss")
+        return exercise
+
+    def depth(self) -> Dict[str, int]:
+        with self._cond:
+            return {f"{t}/{l}": len(s) for (t, l), s in self._stock.items()}
+
+    # ── producción ─────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"reading-pool-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(f"🏭 Reserva de lecturas: {len(self._stock)} claves, objetivo {self.target}, "
+                    f"marca baja {self.low_watermark}, {self.workers} productor(es)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+    def _next_key(self) -> Optional[Key]:
+        """Clave en relleno con menos stock (bloquea hasta que haya trabajo o se pare)."""
+        with self._cond:
+            while not self._stop.is_set():
+                pending = [
+                    k for k in self._refilling
+                    if len(self._stock[k]) + self._inflight[k] < self.target
+                ]
+                if pending:
+                    key = min(pending, key=lambda k: len(self._stock[k]) + self._inflight[k])
+                    self._inflight[key] += 1
+                    return key
+                self._cond.wait()
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            key = self._next_key()
+            if key is None:
+                return
+            topic, level = key
+            try:
+                exercise = asyncio.run(generate_exercise(topic, level))
+            except Exception as e:
+                logger.warning(f"⚠️ Reserva de lecturas: fallo generando {topic}/{level}: {e}")
+                metrics.READING_POOL_GENERATED.inc("error")
+                with self._cond:
+                    self._inflight[key] -= 1
+                self._stop.wait(self.retry_seconds)
+                continue
+
+            metrics.READING_POOL_GENERATED.inc("ok")
+            with self._cond:
+                self._inflight[key] -= 1
+                self._stock[key].append(exercise)
+                if len(self._stock[key]) + self._inflight[key] >= self.target:
+                    self._refilling.discard(key)
+            self._publish(key)
+
+    def _publish(self, key: Key) -> None:
+        metrics.READING_POOL_DEPTH.set(len(self._stock[key]), key[0], key[1])
+
+
+# ═══════════════════════════════════════════════════════════════
+# INSTANCIA DEL PROCESO
+# ═══════════════════════════════════════════════════════════════
+
+_pool: Optional[ReadingPool] = None
+
+
+def _catalog_keys() -> List[Key]:
+    from logic.ai_reading.text_generator import get_available_topics, get_available_levels
+    return [_key(t["id"], l["id"]) for t in get_available_topics() for l in get_available_levels()]
+
+
+def start_pool() -> Optional[ReadingPool]:
+    """Arranca los productores (al iniciar la app) si la reserva está habilitada."""
+    global _pool
+    if not POOL_ENABLED or not os.getenv("OPENAI_API_KEY"):
+        logger.info("ℹ️ Reserva de lecturas desactivada")
+        return None
+    if _pool is None:
+        _pool = ReadingPool(_catalog_keys())
+    _pool.start()
+    return _pool
+
+
+def stop_pool() -> None:
+    if _pool is not None:
+        _pool.stop()
+
+
+def take_exercise(topic: str, level: str) -> Optional[Dict[str, Any]]:
+    """Ejercicio pregenerado para (tema, nivel), o None si no hay reserva o está vacía."""
+    if _pool is None:
+        return None
+    return _pool.take(topic, level)
+
+
+def pool_status() -> Dict[str, Any]:
+    if _pool is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "target": _pool.target,
+        "low_watermark": _pool.low_watermark,
+        "depth": _pool.depth(),
+    }
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+text_dedup.py
+--------------------------------------------------
+Reutilización de preguntas/respuestas ya generadas para textos repetidos.
+
+En un mismo colegio se sube muchas veces la misma página del libro. Antes de
+llamar a GPT-4 para generar preguntas o respuestas se busca el texto en un
+almacén direccionado por contenido (tablas reading_texts / reading_text_bands):
+
+1. Coincidencia exacta: huella SHA-256 del texto normalizado (minúsculas,
+   sin tildes ni puntuación, espacios colapsados).
+2. Casi-duplicado: firma MinHash de los 5-gramas de caracteres del texto
+   normalizado, indexada por bandas (LSH). Los candidatos que comparten
+   alguna banda se comparan por la similitud de Jaccard estimada, de modo
+   que el ruido del OCR de una foto sigue encontrando el texto original.
+
+La búsqueda se hace dentro de un "ámbito": el nivel si las preguntas se
+generan automáticamente, o el número de preguntas si las aporta el usuario.
+En este último caso la huella exacta incluye las preguntas y un
+casi-duplicado solo vale si además cada pregunta coincide con la guardada
+(similitud de secuencia ≥ READING_DEDUP_QUESTION_THRESHOLD), de modo que
+las preguntas leídas por OCR siguen encontrando el texto pero un mismo texto
+con preguntas distintas nunca reutiliza respuestas ajenas.
+
+Solo se guardan (y se reutilizan) resultados válidos: por defecto, que todas
+las preguntas tengan respuesta; el llamador puede pasar su propio validador.
+
+Configuración:
+    READING_DEDUP_ENABLED               "1" (por defecto) / "0"
+    READING_DEDUP_THRESHOLD             similitud mínima del texto (0.85)
+    READING_DEDUP_QUESTION_THRESHOLD    similitud mínima de cada pregunta (0.95)
+"""
+
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+import zlib
+from difflib import SequenceMatcher
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import db
+from logic.core import metrics
+
+logger = logging.getLogger("tutorin.text_dedup")
+
+DEDUP_ENABLED = os.getenv("READING_DEDUP_ENABLED", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("READING_DEDUP_THRESHOLD", "0.85"))
+QUESTION_THRESHOLD = float(os.getenv("READING_DEDUP_QUESTION_THRESHOLD", "0.95"))
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Permutaciones h(x) = (a·x + b) mod P, fijas para que las firmas guardadas
+# sigan siendo comparables entre reinicios
+_PRIME = (1 << 61) - 1
+_PERMUTATIONS: List[Tuple[int, int]] = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % (_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _PRIME,
+    )
+    for i in range(NUM_PERM)
+]
+
+_NON_WORD = re.compile(r"[^a-z0-9ñ]+")
+
+
+# ═══════════════════════════════════════════════════════════════
+# HUELLAS
+# ═══════════════════════════════════════════════════════════════
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes ni puntuación y con los espacios colapsados."""
+    text = (text or "").lower().replace("ñ", "\0")
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    text = text.replace("\0", "ñ")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def minhash(normalized: str) -> List[int]:
+    """Firma MinHash (NUM_PERM valores) de los 5-gramas de caracteres."""
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Similitud de Jaccard estimada a partir de dos firmas."""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _band_keys(scope: str, signature: List[int]) -> List[str]:
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+        keys.append(f"{scope}:{band}:{digest}")
+    return keys
+
+
+def _scope(questions: Optional[List[Dict[str, Any]]], level: Optional[str]) -> str:
+    """Ámbito de reutilización: el número de preguntas del usuario o el nivel si se generan."""
+    if questions:
+        return f"q{len(questions)}"
+    return f"auto-{str(level or '').strip()}"
+
+
+def _question_texts(questions: Optional[List[Dict[str, Any]]]) -> List[str]:
+    return [normalize_text(q.get("q", "")) for q in questions or []]
+
+
+def _text_key(scope: str, normalized: str, questions: Optional[List[Dict[str, Any]]]) -> str:
+    """Huella exacta: el texto y, si las aporta el usuario, sus preguntas."""
+    joined = "\n".join([normalized] + _question_texts(questions))
+    return f"{scope}:{fingerprint(joined)}"
+
+
+def _same_questions(questions: Optional[List[Dict[str, Any]]], stored: List[Dict[str, Any]]) -> bool:
+    """¿Las preguntas del usuario son (salvo ruido de OCR) las de un resultado guardado?"""
+    if not questions:
+        return True
+    wanted, found = _question_texts(questions), _question_texts(stored)
+    return len(wanted) == len(found) and all(
+        a == b or SequenceMatcher(None, a, b).ratio() >= QUESTION_THRESHOLD
+        for a, b in zip(wanted, found)
+    )
+
+
+def has_answers(questions: List[Dict[str, Any]]) -> bool:
+    """Validador por defecto: hay preguntas y todas tienen una respuesta no vacía."""
+    return bool(questions) and all(str(q.get("answer") or "").strip() for q in questions)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BÚSQUEDA Y REGISTRO
+# ═══════════════════════════════════════════════════════════════
+
+def find(text: str, questions: Optional[List[Dict[str, Any]]] = None,
+         level: Optional[str] = None,
+         validate: Callable[[List[Dict[str, Any]]], bool] = has_answers) -> Optional[List[Dict[str, Any]]]:
+    """
+    Preguntas (con respuestas) generadas antes para este texto, o None.
+
+    Args:
+        text: Texto de lectura
+        questions: Preguntas aportadas por el usuario (sin respuestas) o None
+        level: Nivel usado si las preguntas se generan automáticamente
+        validate: Solo se devuelven resultados que lo cumplan
+    """
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+    scope = _scope(questions, level)
+
+    stored = db.get_reading_text(_text_key(scope, normalized, questions))
+    if stored is not None and validate(stored):
+        metrics.READING_DEDUP.inc("exact")
+        logger.info("♻️ Texto de lectura repetido: se reutilizan sus preguntas")
+        return stored
+
+    signature = minhash(normalized)
+    best, best_score = None, 0.0
+    for candidate in db.get_reading_text_candidates(_band_keys(scope, signature)):
+        if not _same_questions(questions, candidate["questions"]) or not validate(candidate["questions"]):
+            continue
+        score = similarity(signature, candidate["signature"])
+        if score > best_score:
+            best, best_score = candidate, score
+    if best is not None and best_score >= DEDUP_THRESHOLD:
+        metrics.READING_DEDUP.inc("near")
+        logger.info(f"♻️ Texto de lectura casi idéntico (similitud {best_score:.2f}): se reutilizan sus preguntas")
+        return best["questions"]
+
+    metrics.READING_DEDUP.inc("miss")
+    return None
+
+
+def remember(text: str, questions: Optional[List[Dict[str, Any]]], level: Optional[str],
+             result: List[Dict[str, Any]]) -> None:
+    """Guarda las preguntas generadas para reutilizarlas con el mismo texto."""
+    normalized = normalize_text(text)
+    if not normalized or not result:
+        return
+    scope = _scope(questions, level)
+    signature = minhash(normalized)
+    db.save_reading_text(
+        _text_key(scope, normalized, questions), signature, _band_keys(scope, signature), result
+    )
+
+
+async def reuse_or_generate(
+    text: str,
+    questions: Optional[List[Dict[str, Any]]],
+    level: Optional[str],
+    generate: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    validate: Callable[[List[Dict[str, Any]]], bool] = has_answers,
+) -> List[Dict[str, Any]]:
+    """
+    Devuelve las preguntas ya generadas para el texto o, si no las hay,
+    ejecuta `generate()` (las llamadas a GPT-4) y guarda el resultado si
+    `validate` lo da por bueno (un resultado incompleto no se reutiliza).
+    """
+    if not DEDUP_ENABLED:
+        return await generate()
+
+    try:
+        stored = find(text, questions, level, validate)
+    except Exception as e:
+        logger.warning(f"⚠️ Error buscando texto repetido: {e}")
+        stored = None
+    if stored is not None:
+        metrics.CACHE_REQUESTS.inc("reading_texts", "hit")
+        return stored
+
+    metrics.CACHE_REQUESTS.inc("reading_texts", "miss")
+    result = await generate()
+    if not validate(result):
+        logger.warning("⚠️ Preguntas generadas no válidas: no se guardan para reutilizar")
+        return result
+    try:
+        remember(text, questions, level, result)
+    except Exception as e:
+        logger.warning(f"⚠️ Error guardando texto para reutilizar: {e}")
+    return result
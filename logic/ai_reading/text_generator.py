@@ -9,12 +9,15 @@ Usa GPT-4 para generar textos adaptados al currículo LOMLOE de España.
 import os
 import logging
 from typing import Optional
-from openai import OpenAI, OpenAIError
+from fastapi.concurrency import run_in_threadpool
+from openai import OpenAIError
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 logger = logging.getLogger("tutorin.text_generator")
 
 # Cliente OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client()
 
 # Configuración por nivel (1º a 6º de Primaria)
 LEVEL_CONFIG = {
@@ -63,6 +66,26 @@ LEVEL_CONFIG = {
 }
 
 
+# Instrucciones fijas (mensaje de sistema, prefijo común a todas las llamadas)
+TEXT_PROMPT = """Eres Tutorín, un profesor virtual que crea textos educativos para estudiantes de Primaria en España (currículo LOMLOE).
+
+Escribe un texto de lectura con el nivel, tema, longitud, complejidad, oraciones y vocabulario que se te indiquen:
+- Estructura: 2-3 párrafos bien organizados
+- Lenguaje: español de España (no usar americanismos)
+- Tono: educativo pero ameno e interesante, con datos que capten la atención
+- Contenido: información verídica y apropiada para la edad
+- Estilo narrativo claro y directo
+- NO incluyas título ni preguntas, NO uses markdown ni asteriscos
+- Escribe SOLO el texto de lectura, sin prólogo ni introducción"""
+
+TEXT_INPUT = """NIVEL: {description}
+TEMA: {topic}
+Longitud: aproximadamente {words} palabras
+Complejidad: {complexity}
+Oraciones: {sentences}
+Vocabulario: {vocabulary}"""
+
+
 async def generate_text_with_gpt4(
     topic: str,
     level: str = "3"
@@ -100,41 +123,21 @@ async def generate_text_with_gpt4(
 
     enhanced_topic = topic_enhancements.get(topic.lower(), topic)
 
-    prompt = f"""Eres Tutorín, un profesor virtual que crea textos educativos para estudiantes de Primaria en España (currículo LOMLOE).
-
-NIVEL: {config['description']}
-
-TEMA: {enhanced_topic}
-
-REQUISITOS:
-1. Longitud: aproximadamente {config['words']} palabras
-2. Estructura: 2-3 párrafos bien organizados
-3. Complejidad: {config['complexity']}
-4. Oraciones: {config['sentences']}
-5. Vocabulario: {config['vocabulary']}
-6. Lenguaje: español de España (no usar americanismos)
-7. Tono: educativo pero ameno e interesante
-8. Contenido: información verídica y apropiada para la edad
-
-IMPORTANTE:
-- Escribe un texto informativo y educativo
-- Incluye datos interesantes que capten la atención
-- Usa un estilo narrativo claro y directo
-- NO incluyas título ni preguntas en el texto
-- NO uses formato markdown ni asteriscos
-- Escribe SOLO el texto de lectura, sin prólogo ni introducción
-
-Genera el texto ahora:"""
+    prompt = TEXT_INPUT.format(
+        description=config["description"], topic=enhanced_topic, words=config["words"],
+        complexity=config["complexity"], sentences=config["sentences"], vocabulary=config["vocabulary"],
+    )
 
     try:
         logger.info(f"🤖 Generando texto sobre '{topic}' para nivel {level}...")
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = await run_in_threadpool(
+            chat_completion, client, "ai_reading.text_generator",
+            model=choose_model("reading_text"),
             messages=[
                 {
                     "role": "system",
-                    "content": "Eres un profesor experto en crear textos educativos para Primaria."
+                    "content": TEXT_PROMPT
                 },
                 {
                     "role": "user",
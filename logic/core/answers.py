@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+answers.py
+--------------------------------------------------
+Normalización y comparación de respuestas del alumno, compartida por
+/solve y los motores.
+
+Antes cada motor (y /solve) tenía su propio `_canon` con varias llamadas
+encadenadas a str.replace. Aquí la canonización es una sola pasada con
+str.translate y los analizadores usan expresiones compiladas al importar.
+La respuesta esperada se analiza una vez y queda en caché (lru_cache).
+
+Tipos de respuesta (ANSWER_TYPES):
+    text      texto canónico: sin espacios ni acentos, coma = punto (por defecto)
+    integer   número entero ("24", "24,0")
+    decimal   número con coma o punto, con tolerancia relativa REL_TOLERANCE
+    fraction  "a/b" con el mismo numerador y denominador (la forma importa:
+              simplificar es un paso del ejercicio)
+    ratio     fracción o decimal con el mismo valor ("5/10" = "1/2" = "0,5")
+    pair      dos o más números: "6 y 8", "6; 8"
+    unit      número con unidad opcional ("3000 m", "3000 metros", "3000")
+    percent   número con o sin "%" / "por ciento"
+    formula   expresión: "x", "×" y "·" equivalen a "*"; paréntesis opcionales
+    words     palabras clave de comprensión (ver keyword_match)
+
+`matches()` acepta siempre lo que ya coincide como texto canónico; si la
+respuesta o la esperada no se pueden leer con su tipo, no coinciden.
+
+Los motores declaran el tipo a nivel de módulo, por hint_type:
+    ANSWER_TYPES = {"frac_mcm": "integer", "frac_equiv": "pair"}
+    ANSWER_TYPE = "decimal"          # resto de pasos (por defecto "text")
+o directamente con el campo "answer_type" de su salida.
+
+Configuración:
+    ANSWER_CACHE_SIZE    respuestas esperadas analizadas en caché (1024)
+"""
+
+import math
+import os
+import re
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set
+
+REL_TOLERANCE = 0.005
+CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+
+ANSWER_TYPES = (
+    "text", "integer", "decimal", "fraction", "ratio", "pair",
+    "unit", "percent", "formula", "words",
+)
+
+_ACCENTS = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n"}
+
+# Una sola pasada (después de lower): fuera espacios y acentos, coma decimal → punto
+_CANON = str.maketrans({**_ACCENTS, " ": None, "\t": None, "\n": None, "\r": None, "\u00a0": None, ",": "."})
+_FORMULA = str.maketrans({"×": "*", "·": "*", "x": "*", "(": None, ")": None})
+_PAIR = str.maketrans({**_ACCENTS, ",": "."})
+# Texto para palabras clave: sin acentos ni signos de puntuación
+_WORDS = str.maketrans({**_ACCENTS, **{c: None for c in "¿?¡!.,;:"}})
+
+_NUMBER = r"[+-]?(?:\d+(?:\.\d+)?|\.\d+)"
+_NUMBER_RE = re.compile(_NUMBER)
+_FRACTION_RE = re.compile(r"([+-]?\d+)/(\d+)")
+_PERCENT_RE = re.compile(rf"({_NUMBER})(?:%|porciento)?")
+_UNIT_RE = re.compile(rf"({_NUMBER})([a-z]+[23²³]?)?")
+_PAIR_SPLIT = re.compile(r"\s*(?:(?<![a-z])[ye](?![a-z])|[;&])\s*|\s+")
+
+_UNIT_NAMES = {
+    "km": "kilometro", "m": "metro", "cm": "centimetro", "mm": "milimetro",
+    "kg": "kilogramo", "g": "gramo", "mg": "miligramo",
+    "l": "litro", "ml": "mililitro", "cl": "centilitro", "dl": "decilitro",
+}
+UNIT_ALIASES: Dict[str, str] = {"kilo": "kg", "kilos": "kg", "litros": "l"}
+for _symbol, _name in _UNIT_NAMES.items():
+    UNIT_ALIASES.setdefault(_name, _symbol)
+    UNIT_ALIASES.setdefault(_name + "s", _symbol)
+
+_STOPWORDS = frozenset(["de", "el", "la", "los", "las", "un", "una", "que", "del", "al"])
+_ROOT_LEN = 4
+_MIN_PIECE = 3
+
+
+# ═══════════════════════════════════════════════════════════════
+# CANONIZACIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def canon(text: Any) -> str:
+    """Texto canónico: minúsculas, sin espacios ni acentos y coma decimal como punto."""
+    return str(text or "").lower().translate(_CANON)
+
+
+def canon_formula(text: Any) -> str:
+    """Como canon() y además "x"/"×"/"·" → "*" y sin paréntesis."""
+    return canon(text).translate(_FORMULA)
+
+
+def normalize(text: Any) -> str:
+    """Texto para comparar palabras: minúsculas, sin acentos ni puntuación."""
+    return str(text).lower().strip().translate(_WORDS)
+
+
+def keywords(text: Any) -> List[str]:
+    """Palabras significativas (>2 letras, sin artículos ni preposiciones)."""
+    return [w for w in normalize(text).split() if len(w) > 2 and w not in _STOPWORDS]
+
+
+def to_number(text: Any, percent: bool = False) -> float:
+    """float() tolerante con la coma decimal y los espacios (y "%" si percent)."""
+    value = canon(text)
+    if percent:
+        value = value.rstrip("%")
+    return float(value)
+
+
+# ═══════════════════════════════════════════════════════════════
+# ANALIZADORES POR TIPO
+# ═══════════════════════════════════════════════════════════════
+
+def _number(text: Any) -> Optional[float]:
+    value = canon(text)
+    return float(value) if _NUMBER_RE.fullmatch(value) else None
+
+
+def _integer(text: Any) -> Optional[int]:
+    value = _number(text)
+    return int(value) if value is not None and value.is_integer() else None
+
+
+def _fraction(text: Any):
+    value = canon(text)
+    m = _FRACTION_RE.fullmatch(value)
+    if m:
+        return (int(m.group(1)), int(m.group(2))) if int(m.group(2)) else None
+    number = _integer(value)
+    return (number, 1) if number is not None else None
+
+
+def _ratio(text: Any) -> Optional[float]:
+    m = _FRACTION_RE.fullmatch(canon(text))
+    if m:
+        return float(Fraction(int(m.group(1)), int(m.group(2)))) if int(m.group(2)) else None
+    return _number(text)
+
+
+def _pair(text: Any):
+    parts = [p for p in _PAIR_SPLIT.split(str(text or "").lower().strip().translate(_PAIR)) if p]
+    values = [_number(p) for p in parts]
+    return tuple(values) if len(values) >= 2 and None not in values else None
+
+
+def _unit(text: Any):
+    m = _UNIT_RE.fullmatch(canon(text))
+    if not m:
+        return None
+    unit = m.group(2)
+    return float(m.group(1)), UNIT_ALIASES.get(unit, unit) if unit else None
+
+
+def _percent(text: Any) -> Optional[float]:
+    m = _PERCENT_RE.fullmatch(canon(text))
+    return float(m.group(1)) if m else None
+
+
+_PARSERS = {
+    "integer": _integer,
+    "decimal": _number,
+    "fraction": _fraction,
+    "ratio": _ratio,
+    "pair": _pair,
+    "unit": _unit,
+    "percent": _percent,
+}
+
+
+def parse(text: Any, kind: str):
+    """Valor de `text` según su tipo de respuesta, o None si no se puede leer."""
+    parser = _PARSERS.get(kind)
+    return parser(text) if parser else canon(text)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _expected(text: str, kind: str):
+    return parse(text, kind)
+
+
+def _close(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=REL_TOLERANCE, abs_tol=1e-9)
+
+
+def _same(kind: str, user, expected) -> bool:
+    if kind in ("decimal", "ratio", "percent"):
+        return _close(user, expected)
+    if kind == "pair":
+        return len(user) == len(expected) and all(_close(u, e) for u, e in zip(user, expected))
+    if kind == "unit":
+        (value, unit), (expected_value, expected_unit) = user, expected
+        return _close(value, expected_value) and (not unit or not expected_unit or unit == expected_unit)
+    return user == expected
+
+
+def matches(user: Any, expected: Any, kind: str = "text") -> bool:
+    """¿La respuesta del alumno equivale a la esperada según su tipo?"""
+    if canon(user) == canon(expected):
+        return True
+    if kind == "words":
+        return keyword_match(user, expected)
+    if kind == "formula":
+        return canon_formula(user) == canon_formula(expected)
+    if kind not in _PARSERS:
+        return False
+    value, expected_value = parse(user, kind), _expected(str(expected), kind)
+    return value is not None and expected_value is not None and _same(kind, value, expected_value)
+
+
+def declared_type(engine_module: Any, hint_type: Optional[str]) -> str:
+    """Tipo de respuesta que declara un motor para un hint_type ("text" si no declara)."""
+    types = getattr(engine_module, "ANSWER_TYPES", {})
+    return types.get(hint_type) or getattr(engine_module, "ANSWER_TYPE", "text")
+
+
+# ═══════════════════════════════════════════════════════════════
+# PALABRAS CLAVE (pasos de comprensión)
+# ═══════════════════════════════════════════════════════════════
+# Las palabras clave de la respuesta esperada se indexan una vez en tres
+# tablas hash, de modo que cada palabra del alumno se resuelve con unas
+# pocas búsquedas. Dos palabras clave (≥3 letras) son similares si:
+#   - la del alumno es un trozo de la esperada (o igual)  → "pieces"
+#   - comparten las 4 primeras letras                     → "roots"
+#   - la esperada es un trozo de la del alumno            → "words"
+
+def _pieces(word: str) -> Set[str]:
+    """Subcadenas de al menos _MIN_PIECE letras"""
+    n = len(word)
+    return {word[i:j] for i in range(n) for j in range(i + _MIN_PIECE, n + 1)}
+
+
+class KeywordIndex:
+    """Respuesta esperada preprocesada para keyword_match()"""
+    __slots__ = ("normalized", "size", "words", "pieces", "roots")
+
+    def __init__(self, expected: str):
+        self.normalized = normalize(expected)
+        found = keywords(expected)
+        self.size = len(found)
+        self.words: Dict[str, List[int]] = {}
+        self.pieces: Dict[str, List[int]] = {}
+        self.roots: Dict[str, List[int]] = {}
+        for i, word in enumerate(found):
+            self.words.setdefault(word, []).append(i)
+            for piece in _pieces(word):
+                self.pieces.setdefault(piece, []).append(i)
+            if len(word) >= _ROOT_LEN:
+                self.roots.setdefault(word[:_ROOT_LEN], []).append(i)
+
+    def matches(self, user_keywords: List[str]) -> int:
+        """Palabras clave esperadas con alguna palabra similar del alumno"""
+        found = set()
+        for word in user_keywords:
+            found.update(self.pieces.get(word, ()))
+            if len(word) >= _ROOT_LEN:
+                found.update(self.roots.get(word[:_ROOT_LEN], ()))
+            for piece in _pieces(word):
+                found.update(self.words.get(piece, ()))
+            if len(found) == self.size:
+                break
+        return len(found)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def keyword_index(expected: str) -> KeywordIndex:
+    """Índice (en caché) de una respuesta esperada."""
+    return KeywordIndex(expected)
+
+
+def keyword_match(user: Any, expected: Any) -> bool:
+    """
+    Coincidencia flexible por palabras clave: al menos la mitad de las
+    esperadas (o una, si hay 1-2). Si la esperada no tiene palabras clave
+    vale cualquier respuesta no vacía.
+    """
+    index = keyword_index(str(expected))
+    user_normalized = normalize(user)
+    if user_normalized == index.normalized:
+        return True
+    if not index.size:
+        return bool(str(user).strip())
+    found = index.matches([w for w in user_normalized.split() if len(w) > 2 and w not in _STOPWORDS])
+    return found / index.size >= 0.5 or (index.size <= 2 and found >= 1)
@@ -9,6 +9,7 @@ están registrados en hint_types.json mediante hint_validator.py.
 """
 
 from typing import Any, Dict
+from .answers import ANSWER_TYPES
 from .hint_validator import is_valid_hint
 
 # -------------------------------------------------------
@@ -24,6 +25,10 @@ ENGINE_OUTPUT_SCHEMA: Dict[str, Any] = {
     "next_step": int           # Número del siguiente paso (0 o superior)
 }
 
+# Campos opcionales
+#   "answer_type": cómo compara /solve la respuesta (uno de answers.ANSWER_TYPES);
+#                  si falta se usa el que declara el módulo del motor
+
 
 # -------------------------------------------------------
 # 🧩 FUNCIÓN DE VALIDACIÓN
@@ -58,6 +63,11 @@ def validate_output(data: Dict[str, Any], engine_name: str = "unknown") -> bool:
                 print(f"[ENGINE_SCHEMA] ⚠️ {engine_name}: '{key}' tiene tipo {type(val).__name__}, esperado {expected_type.__name__}.")
                 valid = False
 
+    answer_type = data.get("answer_type")
+    if answer_type is not None and answer_type not in ANSWER_TYPES:
+        print(f"[ENGINE_SCHEMA] ⚠️ {engine_name}: answer_type desconocido '{answer_type}'.")
+        valid = False
+
     # 2️⃣ Validar hint_type (solo si los campos existen)
     topic = data.get("topic", "")
     hint = data.get("hint_type", "")
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+image_cache.py
+--------------------------------------------------
+Caché de transcripciones de imágenes por huella perceptual confirmada.
+
+Cuando toda una clase fotografía la misma ficha, cada foto es distinta byte a
+byte (encuadre, luz, compresión) pero casi idéntica a la vista. Antes de
+llamar a GPT-4 Vision se calcula la huella de la imagen preparada
+(logic.core.image_prep) y se busca una transcripción previa:
+
+1. Coincidencia exacta: SHA-256 de los bytes.
+2. Candidatos perceptuales: dHash de N×N bits (escala de grises reducida a
+   (N+1)×N y comparación de píxeles vecinos) buscado en un BK-tree a
+   distancia de Hamming ≤ IMAGE_CACHE_MAX_DISTANCE.
+3. Confirmación: el dHash solo resume la maqueta de la página y dos fichas
+   con la misma maqueta y ejercicios distintos quedan muy cerca. Un
+   candidato solo se reutiliza si además su miniatura en grises
+   (THUMB_SIZE×THUMB_SIZE, contraste normalizado) no difiere en ningún
+   bloque de BLOCK_SIZE×BLOCK_SIZE píxeles más de IMAGE_CACHE_MAX_BLOCK_DIFF
+   niveles de gris de media: el grano o la recompresión se reparten por toda
+   la imagen, un ejercicio distinto se concentra en unos pocos bloques.
+
+- Espacios de nombres: cada punto de llamada (y sus parámetros, p. ej. el
+  ciclo en /analyze/image) tiene su propia caché.
+- Las entradas caducan tras IMAGE_CACHE_TTL_SECONDS; el árbol se reconstruye
+  cuando acumula demasiadas entradas caducadas.
+- Sin Pillow no hay huella perceptual: solo coinciden imágenes idénticas.
+
+Configuración:
+    IMAGE_CACHE_ENABLED          "1" (por defecto) / "0"
+    IMAGE_CACHE_TTL_SECONDS      vida de una entrada (86400)
+    IMAGE_CACHE_SIZE             entradas máximas por espacio de nombres (1000)
+    IMAGE_HASH_SIZE              lado del dHash; 32 → 1024 bits (32)
+    IMAGE_CACHE_MAX_DISTANCE     distancia de Hamming máxima (64 de 1024 bits)
+    IMAGE_CACHE_MAX_BLOCK_DIFF   diferencia media máxima por bloque de la miniatura (10)
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from logic.core import metrics
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("tutorin.image_cache")
+
+CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "1") == "1"
+CACHE_TTL_SECONDS = float(os.getenv("IMAGE_CACHE_TTL_SECONDS", "86400"))
+CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "1000"))
+HASH_SIZE = int(os.getenv("IMAGE_HASH_SIZE", "32"))
+MAX_DISTANCE = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "64"))
+MAX_BLOCK_DIFF = float(os.getenv("IMAGE_CACHE_MAX_BLOCK_DIFF", "10"))
+THUMB_SIZE = 64
+BLOCK_SIZE = 8
+
+
+class Fingerprint(NamedTuple):
+    """Huella de una imagen: hash exacto y, con Pillow, dHash y miniatura."""
+    sha256: str
+    dhash: Optional[int] = None
+    thumbnail: Optional[bytes] = None
+
+
+# ═══════════════════════════════════════════════════════════════
+# HUELLAS
+# ═══════════════════════════════════════════════════════════════
+
+def _dhash(gray: Any, size: int) -> int:
+    pixels = list(gray.resize((size + 1, size)).getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def fingerprint(image_bytes: bytes) -> Fingerprint:
+    """Huella de la imagen (solo SHA-256 si no hay Pillow o no se puede leer)."""
+    sha = hashlib.sha256(image_bytes).hexdigest()
+    if Image is None:
+        return Fingerprint(sha)
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            gray = img.convert("L")
+        thumbnail = ImageOps.autocontrast(gray).resize((THUMB_SIZE, THUMB_SIZE)).tobytes()
+        return Fingerprint(sha, _dhash(gray, HASH_SIZE), thumbnail)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo calcular el hash de la imagen: {e}")
+        return Fingerprint(sha)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def block_difference(a: bytes, b: bytes) -> float:
+    """Mayor diferencia media de gris entre bloques homólogos de dos miniaturas."""
+    worst = 0.0
+    area = BLOCK_SIZE * BLOCK_SIZE
+    for top in range(0, THUMB_SIZE, BLOCK_SIZE):
+        for left in range(0, THUMB_SIZE, BLOCK_SIZE):
+            total = 0
+            for row in range(top, top + BLOCK_SIZE):
+                start = row * THUMB_SIZE + left
+                total += sum(abs(x - y) for x, y in zip(a[start:start + BLOCK_SIZE], b[start:start + BLOCK_SIZE]))
+            worst = max(worst, total / area)
+    return worst
+
+
+def same_image(a: Fingerprint, b: Fingerprint) -> bool:
+    """¿Misma imagen (bytes idénticos, o dHash cercano y miniatura confirmada)?"""
+    if a.sha256 == b.sha256:
+        return True
+    if a.dhash is None or b.dhash is None or not a.thumbnail or not b.thumbnail:
+        return False
+    return (hamming(a.dhash, b.dhash) <= MAX_DISTANCE
+            and block_difference(a.thumbnail, b.thumbnail) <= MAX_BLOCK_DIFF)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BK-TREE
+# ═══════════════════════════════════════════════════════════════
+
+class BKTree:
+    """Árbol métrico para buscar hashes a distancia de Hamming acotada."""
+
+    __slots__ = ("_root", "size")
+
+    def __init__(self) -> None:
+        self._root: Optional[Tuple[int, Dict[int, Any]]] = None
+        self.size = 0
+
+    def add(self, value: int) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = (value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                self.size -= 1
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, {})
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """[(distancia, hash)] de los hashes a distancia ≤ max_distance, de menor a mayor."""
+        found = []
+        pending = [self._root] if self._root is not None else []
+        while pending:
+            node_value, children = pending.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                found.append((distance, node_value))
+            for d in range(distance - max_distance, distance + max_distance + 1):
+                child = children.get(d)
+                if child is not None:
+                    pending.append(child)
+        found.sort()
+        return found
+
+
+# ═══════════════════════════════════════════════════════════════
+# CACHÉ
+# ═══════════════════════════════════════════════════════════════
+
+class ImageCache:
+    """Transcripciones por huella de imagen con TTL y tamaño máximo."""
+
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        # sha256 → (caduca, huella, valor)
+        self._entries: Dict[str, Tuple[float, Fingerprint, Any]] = {}
+        self._by_hash: Dict[int, str] = {}    # dHash → sha256 de la última entrada con ese dHash
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+
+    def get(self, key: Fingerprint) -> Optional[Any]:
+        """Valor guardado para la misma imagen (exacta o confirmada), o None."""
+        now = time.time()
+        with self._lock:
+            candidates = [key.sha256]
+            if key.dhash is not None:
+                candidates += [self._by_hash[h] for _, h in self._tree.search(key.dhash, MAX_DISTANCE)
+                               if h in self._by_hash]
+            for sha in candidates:
+                entry = self._entries.get(sha)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    self._delete(sha)
+                    continue
+                if same_image(key, entry[1]):
+                    return entry[2]
+            self._maybe_rebuild()
+        return None
+
+    def put(self, key: Fingerprint, value: Any) -> None:
+        with self._lock:
+            if key.sha256 not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key.sha256] = (time.time() + self.ttl_seconds, key, value)
+            if key.dhash is not None:
+                self._by_hash[key.dhash] = key.sha256
+                self._tree.add(key.dhash)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _delete(self, sha: str) -> None:
+        _, key, _ = self._entries.pop(sha)
+        if key.dhash is not None and self._by_hash.get(key.dhash) == sha:
+            del self._by_hash[key.dhash]
+
+    def _evict(self) -> None:
+        """Quita las entradas caducadas o, si no hay, la que caduca antes."""
+        now = time.time()
+        expired = [k for k, (expires, _, _) in self._entries.items() if expires < now]
+        for k in expired or [min(self._entries, key=lambda k: self._entries[k][0])]:
+            self._delete(k)
+        self._maybe_rebuild()
+
+    def _maybe_rebuild(self) -> None:
+        # El BK-tree no admite borrados: se reconstruye cuando sobra la mitad
+        if self._tree.size > 2 * len(self._by_hash) + 16:
+            self._tree = BKTree()
+            for h in self._by_hash:
+                self._tree.add(h)
+
+
+_caches: Dict[str, ImageCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache(namespace: str) -> ImageCache:
+    cache = _caches.get(namespace)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(namespace, ImageCache())
+    return cache
+
+
+def lookup(namespace: str, key: Fingerprint) -> Optional[Any]:
+    """Transcripción guardada para la huella `key` en el espacio de nombres, o None."""
+    if not CACHE_ENABLED:
+        return None
+    value = _cache(namespace).get(key)
+    metrics.CACHE_REQUESTS.inc("image_transcriptions", "hit" if value is not None else "miss")
+    if value is not None:
+        logger.info(f"♻️ Imagen ya transcrita ({namespace}): se reutiliza el resultado")
+    return value
+
+
+def store(namespace: str, key: Fingerprint, value: Any) -> None:
+    if CACHE_ENABLED:
+        _cache(namespace).put(key, value)
+
+
+def clear() -> None:
+    """Vacía todas las cachés (tests y mantenimiento)."""
+    with _caches_lock:
+        _caches.clear()
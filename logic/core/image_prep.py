@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+image_prep.py
+--------------------------------------------------
+Preprocesado de fotos antes de enviarlas a GPT-4 Vision.
+
+Una foto de móvil ocupa 4-12 MB y el modelo la reescala igualmente, así que
+enviarla tal cual solo añade tiempo de subida y tokens. `prepare_image()`:
+
+1. decodifica la foto (los JPEG ya a escala reducida, con draft()) desde
+   bytes o desde el fichero temporal de la subida, y la endereza según su
+   EXIF (auto-orientación),
+2. la reduce para que su lado mayor no supere IMAGE_MAX_DIMENSION,
+3. la pasa a escala de grises si apenas tiene color (fichas impresas),
+4. la recodifica como JPEG con IMAGE_JPEG_QUALITY,
+
+y conserva la original si el resultado no es más pequeño. El tipo MIME
+devuelto es siempre el real (antes todo se etiquetaba como image/jpeg).
+
+Métricas: tutorin_image_prep_bytes_total{site,kind=original|sent} y
+tutorin_image_prep_duration_seconds{site}; la etapa "image_prep" aparece en
+Server-Timing y la latencia de la llamada Vision sigue en
+tutorin_llm_call_duration_seconds{site}.
+
+Configuración:
+    IMAGE_PREP_ENABLED          "1" (por defecto) / "0"
+    IMAGE_MAX_DIMENSION         lado mayor en píxeles (1600)
+    IMAGE_JPEG_QUALITY          calidad JPEG de salida (80)
+    IMAGE_GRAYSCALE_MAX_CHROMA  croma media por debajo de la cual se pasa a grises (10)
+
+Sin Pillow las imágenes se envían sin cambios (con su tipo MIME detectado).
+"""
+
+import base64
+import io
+import logging
+import os
+import time
+from typing import BinaryIO, NamedTuple, Optional, Union
+
+from logic.core import metrics, uploads
+from logic.core.timing import span
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger("tutorin.image_prep")
+
+PREP_ENABLED = os.getenv("IMAGE_PREP_ENABLED", "1") == "1"
+MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "80"))
+GRAYSCALE_MAX_CHROMA = float(os.getenv("IMAGE_GRAYSCALE_MAX_CHROMA", "10"))
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+
+class PreparedImage(NamedTuple):
+    """Imagen lista para la API: bytes, tipo MIME real y tamaño original."""
+    data: bytes
+    mime: str
+    original_size: int
+
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+    def data_url(self) -> str:
+        return f"data:{self.mime};base64,{self.base64()}"
+
+
+def sniff_mime(image_bytes: bytes, default: str = "image/jpeg") -> str:
+    """Tipo MIME según la firma de los primeros bytes."""
+    for signature, mime in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+def _is_grayish(img) -> bool:
+    """¿La imagen apenas tiene color? (croma media de una miniatura)."""
+    small = img.convert("RGB").resize((64, 64))
+    pixels = list(small.getdata())
+    chroma = sum(max(p) - min(p) for p in pixels) / len(pixels)
+    return chroma <= GRAYSCALE_MAX_CHROMA
+
+
+def _reencode(source: BinaryIO) -> Optional[bytes]:
+    with Image.open(source) as img:
+        # Los JPEG se decodifican directamente a 1/2, 1/4 u 1/8 si sobra resolución
+        img.draft("RGB", (MAX_DIMENSION, MAX_DIMENSION))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            # Transparencias sobre fondo blanco (PNG de capturas)
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            rgba = img.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+        img.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+        if img.mode != "L" and _is_grayish(img):
+            img = img.convert("L")
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        return buf.getvalue()
+
+
+def _original(source: BinaryIO, size: int) -> PreparedImage:
+    source.seek(0)
+    data = source.read()
+    return PreparedImage(data, sniff_mime(data), size)
+
+
+def prepare_image(image: Union[bytes, BinaryIO], site: str) -> PreparedImage:
+    """
+    Reduce y recodifica la foto para GPT-4 Vision.
+
+    Args:
+        image: Bytes de la imagen o fichero rebobinado (p. ej. uploads.spool_upload())
+        site: Punto de llamada (para métricas y logs), p. ej. "analyze_image"
+    """
+    source = io.BytesIO(image) if isinstance(image, (bytes, bytearray)) else image
+    source.seek(0, io.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    if not PREP_ENABLED or Image is None:
+        return _original(source, size)
+
+    t0 = time.perf_counter()
+    try:
+        with span("image_prep"):
+            data = _reencode(source)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo preprocesar la imagen ({site}): {e}")
+        data = None
+    elapsed = time.perf_counter() - t0
+    metrics.IMAGE_PREP_LATENCY.observe(elapsed, site)
+
+    if data is not None and len(data) < size:
+        prepared = PreparedImage(data, "image/jpeg", size)
+    else:
+        prepared = _original(source, size)
+
+    metrics.IMAGE_PREP_BYTES.inc(site, "original", amount=size)
+    metrics.IMAGE_PREP_BYTES.inc(site, "sent", amount=len(prepared.data))
+    logger.info(
+        f"🗜️ Imagen ({site}): {size / 1024:.0f} KB → {len(prepared.data) / 1024:.0f} KB "
+        f"en {elapsed * 1000:.0f} ms"
+    )
+    return prepared
+
+
+def prepare_base64(image_base64: str, site: str) -> PreparedImage:
+    """Igual que prepare_image() para una imagen en base64 (con o sin prefijo data:)."""
+    with uploads.decode_base64(image_base64) as source:
+        return prepare_image(source, site)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+llm_coalesce.py
+--------------------------------------------------
+Agrupación ("single-flight") de llamadas idénticas a OpenAI en curso.
+
+Cuando una clase entera envía a la vez el problema proyectado en la pizarra,
+cada alumno disparaba la misma descomposición con gpt-4o-mini. Ahora
+`chat_completion()` pasa por `single_flight()`:
+
+1. Clave canónica: SHA-256 de los parámetros de la llamada (modelo,
+   mensajes, temperatura...) serializados con las claves ordenadas.
+2. En el proceso: si ya hay una llamada con la misma clave en curso, el
+   hilo espera a que termine y comparte su resultado (o su excepción).
+3. Entre workers: el primero reserva la clave en la tabla llm_locks; los
+   demás esperan a que publique la respuesta en llm_results (o a que la
+   reserva desaparezca/caduque, y entonces llaman ellos).
+
+Solo se agrupan llamadas simultáneas: los resultados compartidos caducan
+enseguida (LLM_COALESCE_RESULT_TTL), no es una caché.
+
+No se agrupan las llamadas de generación que deben dar resultados distintos
+aunque los parámetros coincidan (UNCOALESCED_SITES: textos del pool de
+lectura, preguntas para un mismo tema y nivel...).
+
+La coordinación entre workers cuesta tres escrituras en SQLite por llamada
+(reserva, resultado, liberación) y solo ahorra algo con varios workers: se
+activa con LLM_COALESCE_SHARED=1.
+
+Métrica: tutorin_llm_coalesced_total{site,scope=local|shared}, llamadas
+ahorradas.
+
+Configuración:
+    LLM_COALESCE_ENABLED        "1" (por defecto) / "0"
+    LLM_COALESCE_SHARED         "0" (por defecto) / "1": coordinación entre workers vía SQLite
+    LLM_COALESCE_WAIT_SECONDS   espera máxima por una llamada ajena (90)
+    LLM_COALESCE_LOCK_TTL       caducidad de una reserva de un worker caído (90)
+    LLM_COALESCE_RESULT_TTL     vida de un resultado publicado (10)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+
+import db
+from logic.core import metrics
+
+logger = logging.getLogger("tutorin.llm_coalesce")
+
+COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "1") == "1"
+SHARED_ENABLED = os.getenv("LLM_COALESCE_SHARED", "0") == "1"
+WAIT_SECONDS = float(os.getenv("LLM_COALESCE_WAIT_SECONDS", "90"))
+LOCK_TTL_SECONDS = float(os.getenv("LLM_COALESCE_LOCK_TTL", "90"))
+RESULT_TTL_SECONDS = float(os.getenv("LLM_COALESCE_RESULT_TTL", "10"))
+POLL_SECONDS = 0.05
+
+# Único entre contenedores que comparten el volumen de SQLite (todos pueden ser pid 1)
+_OWNER = f"{socket.gethostname()}-pid-{os.getpid()}"
+
+# Puntos de llamada (prefijos) que generan contenido nuevo en cada llamada
+UNCOALESCED_SITES = ("ai_reading.text_generator", "ai_reading.question_generator")
+
+
+def request_key(params: Dict[str, Any]) -> str:
+    """Clave canónica de una llamada: mismos parámetros → misma clave."""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESPUESTAS COMPARTIDAS ENTRE WORKERS
+# ═══════════════════════════════════════════════════════════════
+
+def _to_payload(response: Any) -> Dict[str, Any]:
+    choice = response.choices[0]
+    return {
+        "content": choice.message.content,
+        "finish_reason": getattr(choice, "finish_reason", None),
+        "model": getattr(response, "model", ""),
+    }
+
+
+def _from_payload(payload: Dict[str, Any]) -> Any:
+    """Respuesta equivalente a la del SDK (sin `usage`: los tokens ya los contó el otro worker)."""
+    message = SimpleNamespace(role="assistant", content=payload.get("content"))
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, message=message, finish_reason=payload.get("finish_reason"))],
+        usage=None,
+        model=payload.get("model", ""),
+    )
+
+
+def _shared_call(site: str, key: str, call: Callable[[], Any]) -> Any:
+    """Ejecuta `call()` salvo que otro worker ya esté haciendo la misma llamada."""
+    try:
+        acquired = db.acquire_llm_lock(key, _OWNER, LOCK_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"⚠️ Tabla de llamadas en curso no disponible: {e}")
+        return call()
+
+    if acquired:
+        try:
+            response = call()
+            try:
+                db.save_llm_result(key, _to_payload(response), RESULT_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo publicar el resultado de {site}: {e}")
+            return response
+        finally:
+            try:
+                db.release_llm_lock(key, _OWNER)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo liberar la llamada de {site}: {e}")
+
+    # Otro worker tiene la misma llamada en curso: esperar su resultado
+    deadline = time.monotonic() + WAIT_SECONDS
+    try:
+        while time.monotonic() < deadline:
+            payload = db.get_llm_result(key)
+            if payload is not None:
+                metrics.LLM_COALESCED.inc(site, "shared")
+                logger.info(f"🔗 {site}: respuesta compartida por otro worker")
+                return _from_payload(payload)
+            if not db.llm_lock_held(key):
+                break   # terminó sin publicar (error) o caducó
+            time.sleep(POLL_SECONDS)
+    except Exception as e:
+        logger.warning(f"⚠️ Error esperando la llamada de otro worker ({site}): {e}")
+    return call()
+
+
+# ═══════════════════════════════════════════════════════════════
+# SINGLE-FLIGHT EN EL PROCESO
+# ═══════════════════════════════════════════════════════════════
+
+class _Flight:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(site: str, key: str, call: Callable[[], Any]) -> Any:
+    """
+    Devuelve `call()`, compartiendo el resultado con las llamadas simultáneas
+    de misma `key` (en este proceso y, si LLM_COALESCE_SHARED, en otros workers).
+    """
+    if not COALESCE_ENABLED or site.startswith(UNCOALESCED_SITES):
+        return call()
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        if flight.done.wait(WAIT_SECONDS):
+            metrics.LLM_COALESCED.inc(site, "local")
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+        return call()
+
+    try:
+        flight.response = _shared_call(site, key, call) if SHARED_ENABLED else call()
+        return flight.response
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
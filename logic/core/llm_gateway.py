@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+llm_gateway.py
+--------------------------------------------------
+Punto único de paso para las llamadas a la API de OpenAI.
+
+Todos los módulos (generic_engine, ai_router, hints_*, ai_reading/*,
+analyze_image) llaman a `chat_completion()` en lugar de usar
+`client.chat.completions.create()` directamente, de modo que la
+instrumentación se aplica en un solo sitio:
+
+- etapa "openai" en el desglose de latencias (timing)
+- llamadas, latencia y tokens por punto de llamada (metrics): totales de
+  prompt / completion / cached (prefijo servido desde la caché de prompts
+  del proveedor, solo a partir de 1024 tokens) y distribución de tokens por
+  llamada
+
+`site` identifica el punto de llamada (p. ej. "generic_engine.decompose").
+
+Streaming de pistas: dentro de `stream_tokens(sink)` las llamadas de los
+puntos de pista (STREAMED_SITES) se piden con `stream=True` y cada fragmento
+de texto se pasa a `sink` según llega (lo usa POST /solve/stream para
+enviarlo por SSE). `chat_completion()` sigue devolviendo un objeto con
+`choices[0].message.content` completo, así que los llamadores no cambian.
+
+Las llamadas idénticas simultáneas (p. ej. toda una clase con el mismo
+problema) se agrupan en una sola: ver logic/core/llm_coalesce.py.
+
+Timeouts por punto de llamada, límite de concurrencia, reintentos con
+espera exponencial, circuit breaker y peticiones "hedged": ver
+logic/core/llm_resilience.py. Con el breaker abierto `chat_completion()`
+lanza `llm_resilience.LLMUnavailable` al instante y el llamador usa su alternativa.
+
+El modelo lo elige cada llamador con `model_router.choose_model(tarea)`;
+`_call()` le devuelve la latencia y el uso de tokens de cada petición.
+
+Los clientes se crean con `get_client()`, que lee la configuración del entorno:
+    OPENAI_API_KEY       clave de la API
+    OPENAI_BASE_URL      URL base alternativa (p. ej. el mock local de
+                         benchmarks/mock_openai.py: http://127.0.0.1:8099/v1)
+    OPENAI_TIMEOUT       timeout por petición en segundos si el punto de llamada
+                         no tiene uno propio (60 por defecto)
+    OPENAI_MAX_RETRIES   reintentos del SDK (0 por defecto: los hace llm_resilience)
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator, Optional
+
+from logic.core import llm_coalesce, llm_resilience, metrics, model_router
+from logic.core.timing import span
+
+
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+
+# Puntos de llamada (prefijos) cuyas respuestas se pueden emitir por tokens
+STREAMED_SITES = ("ai_router", "hints_", "generic_engine.hint")
+
+TokenSink = Callable[[str], None]
+_token_sink: contextvars.ContextVar[Optional[TokenSink]] = contextvars.ContextVar(
+    "llm_token_sink", default=None
+)
+
+
+def get_client() -> Any:
+    """
+    Devuelve el cliente OpenAI compartido por todo el proceso.
+    Lanza la excepción del SDK si no hay OPENAI_API_KEY (igual que `OpenAI()`).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    timeout=float(os.getenv("OPENAI_TIMEOUT", "60")),
+                    max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "0")),
+                )
+    return _client
+
+
+def chat_completion(client: Any, site: str, **kwargs) -> Any:
+    """
+    Ejecuta `client.chat.completions.create(**kwargs)` midiendo la etapa "openai".
+
+    Args:
+        client: Cliente OpenAI ya inicializado
+        site: Nombre del punto de llamada (para métricas y logs)
+        **kwargs: Parámetros de la API (model, messages, temperature...)
+    """
+    sink = _token_sink.get()
+    with span("openai"):
+        if sink is not None and site.startswith(STREAMED_SITES):
+            # Los fragmentos ya emitidos no se pueden retirar: sin reintentos ni hedging
+            return llm_resilience.guarded(
+                site, lambda timeout: _call(client, site, sink, timeout, **kwargs), repeatable=False
+            )
+        return llm_coalesce.single_flight(
+            site, llm_coalesce.request_key(kwargs),
+            lambda: llm_resilience.guarded(site, lambda timeout: _call(client, site, None, timeout, **kwargs)),
+        )
+
+
+def _call(client: Any, site: str, sink: Optional[TokenSink], timeout: float, **kwargs) -> Any:
+    """Una petición a la API, con métricas de llamadas, latencia y tokens."""
+    model = kwargs.get("model", "")
+    t0 = time.perf_counter()
+    outcome = "error"
+    response = None
+    try:
+        if sink is not None:
+            response = _stream_completion(client, site, sink, t0, timeout=timeout, **kwargs)
+        else:
+            response = client.chat.completions.create(timeout=timeout, **kwargs)
+        outcome = "ok"
+        _record_usage(site, response)
+        return response
+    finally:
+        elapsed = time.perf_counter() - t0
+        metrics.LLM_CALLS.inc(site, model, outcome)
+        metrics.LLM_LATENCY.observe(elapsed, site)
+        model_router.observe(site, model, elapsed, getattr(response, "usage", None))
+
+
+def _record_usage(site: str, response: Any) -> None:
+    """Anota los tokens de `response.usage` (si la API los devuelve)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    tokens = {
+        "prompt": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion": getattr(usage, "completion_tokens", 0) or 0,
+        "cached": getattr(details, "cached_tokens", 0) or 0,
+    }
+    for kind, amount in tokens.items():
+        metrics.LLM_TOKENS.inc(site, kind, amount=amount)
+        metrics.LLM_CALL_TOKENS.observe(amount, site, kind)
+
+
+# ═══════════════════════════════════════════════════════════════
+# STREAMING DE TOKENS
+# ═══════════════════════════════════════════════════════════════
+
+@contextmanager
+def stream_tokens(sink: TokenSink) -> Iterator[None]:
+    """
+    Mientras dura el bloque, las llamadas de STREAMED_SITES hechas en este
+    contexto pasan cada fragmento de texto a `sink(texto)` según llega.
+    """
+    token = _token_sink.set(sink)
+    try:
+        yield
+    finally:
+        _token_sink.reset(token)
+
+
+def _stream_completion(client: Any, site: str, sink: TokenSink, t0: float, **kwargs) -> Any:
+    """Llamada con stream=True; devuelve una respuesta equivalente a la no-streaming."""
+    parts = []
+    finish_reason = None
+    usage = None
+    first = True
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage    # llega en el último fragmento
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        delta = getattr(choice.delta, "content", None)
+        if delta:
+            if first:
+                first = False
+                metrics.LLM_FIRST_TOKEN.observe(time.perf_counter() - t0, site)
+            parts.append(delta)
+            try:
+                sink(delta)
+            except Exception:
+                pass  # un cliente desconectado no debe romper la pista
+        finish_reason = choice.finish_reason or finish_reason
+
+    message = SimpleNamespace(role="assistant", content="".join(parts))
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+        usage=usage,
+        model=kwargs.get("model", ""),
+    )
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+llm_resilience.py
+--------------------------------------------------
+Protección frente a un OpenAI lento o caído para todas las llamadas que
+pasan por `llm_gateway.chat_completion()`.
+
+Sin esto, una API lenta dejaba a cada worker esperando hasta 60 s por
+petición (más los reintentos del SDK). Ahora cada intento de llamada pasa por
+`guarded()`:
+
+1. Timeout por punto de llamada: las pistas se esperan unos segundos, la
+   lectura de fotos bastante más (SITE_TIMEOUTS, prefijo más largo).
+2. Concurrencia limitada: como mucho LLM_MAX_CONCURRENCY peticiones en
+   curso por proceso; si no queda hueco en LLM_QUEUE_TIMEOUT segundos se
+   rechaza la llamada.
+3. Reintentos con espera exponencial (y jitter) solo para errores
+   transitorios: timeout, conexión, 429 y 5xx. Los reintentos del SDK se
+   desactivan (OPENAI_MAX_RETRIES=0) para no multiplicarlos.
+4. Circuit breaker: con una tasa de errores o de llamadas lentas alta en la
+   ventana reciente se "abre" y las llamadas fallan al instante con
+   `LLMUnavailable` durante LLM_BREAKER_COOLDOWN segundos. Los llamadores ya
+   capturan las excepciones y usan su alternativa determinista (la
+   pista_contextual del paso en generic_engine, las pistas de los módulos
+   hints_*...). Pasado ese tiempo se deja pasar una llamada de prueba: si va
+   bien se cierra, si no vuelve a abrirse. "Lenta" es relativo al timeout
+   de cada punto de llamada (LLM_BREAKER_SLOW_FRACTION): una lectura de foto
+   de 20 s es normal, una pista de 20 s no, y una ráfaga de llamadas de
+   visión o generación no abre el breaker para las pistas.
+5. Peticiones "hedged" (opcional, LLM_HEDGE_ENABLED=1): en los puntos de
+   llamada cortos e idempotentes (LLM_HEDGE_SITES) se lanza una segunda
+   petición idéntica si la primera no ha respondido en LLM_HEDGE_DELAY
+   segundos y se usa la que llegue antes. Solo si hay hueco de concurrencia
+   y el breaker está cerrado.
+
+Métricas:
+    tutorin_llm_rejected_total{site,reason=open|saturated}
+    tutorin_llm_retries_total{site}
+    tutorin_llm_hedged_total{site,winner=primary|hedge}
+    tutorin_llm_breaker_state   0 cerrado · 1 probando · 2 abierto
+
+Configuración:
+    LLM_TIMEOUTS                 "sitio=segundos,..." sobre SITE_TIMEOUTS (p. ej. "hints_=5")
+    LLM_MAX_CONCURRENCY          peticiones simultáneas por proceso (16)
+    LLM_QUEUE_TIMEOUT            espera máxima por un hueco (5)
+    LLM_MAX_RETRIES              reintentos de errores transitorios (2)
+    LLM_BACKOFF_BASE             espera del primer reintento en segundos (0.5), se duplica
+    LLM_BACKOFF_MAX              espera máxima entre reintentos (4)
+    LLM_BREAKER_ENABLED          "1" (por defecto) / "0"
+    LLM_BREAKER_WINDOW           segundos de la ventana de observación (60)
+    LLM_BREAKER_MIN_CALLS        llamadas mínimas en la ventana para decidir (10)
+    LLM_BREAKER_ERROR_RATE       fracción de errores que abre el breaker (0.5)
+    LLM_BREAKER_SLOW_FRACTION    fracción del timeout del sitio a partir de la cual una llamada es lenta (0.75)
+    LLM_BREAKER_SLOW_RATE        fracción de llamadas lentas que abre el breaker (0.5)
+    LLM_BREAKER_COOLDOWN         segundos abierto antes de probar de nuevo (30)
+    LLM_HEDGE_ENABLED            "0" (por defecto) / "1"
+    LLM_HEDGE_SITES              prefijos con hedging ("ai_router,hints_,generic_engine.hint")
+    LLM_HEDGE_DELAY              segundos antes de lanzar la segunda petición (2)
+"""
+
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Deque, Dict, Tuple
+
+from logic.core import metrics
+
+logger = logging.getLogger("tutorin.llm_resilience")
+
+DEFAULT_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+
+# Timeout por intento según el punto de llamada (se aplica el prefijo más largo)
+SITE_TIMEOUTS: Dict[str, float] = {
+    "ai_router": 10.0,
+    "hints_": 10.0,
+    "generic_engine.hint": 10.0,
+    "generic_engine.prefetch": 20.0,
+    "generic_engine.decompose": 25.0,
+    "ai_reading.": 30.0,
+    "ai_reading.photo_parser": 45.0,
+    "analyze_image": 45.0,
+}
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "4"))
+
+BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "1") == "1"
+BREAKER_WINDOW = float(os.getenv("LLM_BREAKER_WINDOW", "60"))
+BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_FRACTION = float(os.getenv("LLM_BREAKER_SLOW_FRACTION", "0.75"))
+BREAKER_SLOW_RATE = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+HEDGE_SITES = tuple(s.strip() for s in os.getenv(
+    "LLM_HEDGE_SITES", "ai_router,hints_,generic_engine.hint").split(",") if s.strip())
+HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2"))
+
+Attempt = Callable[[float], Any]
+
+
+class LLMUnavailable(RuntimeError):
+    """La llamada no se hace: breaker abierto o sin hueco de concurrencia."""
+
+
+def _parse_timeouts(spec: str) -> Dict[str, float]:
+    timeouts: Dict[str, float] = {}
+    for item in spec.split(","):
+        site, _, seconds = item.partition("=")
+        try:
+            timeouts[site.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return timeouts
+
+
+SITE_TIMEOUTS.update(_parse_timeouts(os.getenv("LLM_TIMEOUTS", "")))
+
+
+def timeout_for(site: str) -> float:
+    """Timeout por intento del punto de llamada (prefijo más largo, o OPENAI_TIMEOUT)."""
+    best, timeout = -1, DEFAULT_TIMEOUT
+    for prefix, seconds in SITE_TIMEOUTS.items():
+        if site.startswith(prefix) and len(prefix) > best:
+            best, timeout = len(prefix), seconds
+    return timeout
+
+
+def is_transient(error: BaseException) -> bool:
+    """Errores que merece la pena reintentar y que cuentan para el breaker."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError,
+                              openai.RateLimitError, openai.InternalServerError))
+
+
+# ═══════════════════════════════════════════════════════════════
+# CIRCUIT BREAKER
+# ═══════════════════════════════════════════════════════════════
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Breaker por tasa de errores y de llamadas lentas en una ventana de tiempo."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()   # (instante, error, lenta)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= BREAKER_COOLDOWN:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """True si la llamada puede hacerse (en semiabierto, solo una de prueba)."""
+        if not BREAKER_ENABLED:
+            return True
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < BREAKER_COOLDOWN:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, failed: bool, seconds: float, timeout: float = DEFAULT_TIMEOUT) -> None:
+        """Anota el resultado de un intento que tenía `timeout` segundos."""
+        if not BREAKER_ENABLED:
+            return
+        slow = seconds >= BREAKER_SLOW_FRACTION * timeout
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._calls.clear()
+                    self._set_state(CLOSED)
+                    logger.info("✅ OpenAI responde de nuevo: circuit breaker cerrado")
+                return
+            if self._state == OPEN:
+                return      # respuesta tardía de una llamada anterior a la apertura
+
+            self._calls.append((now, failed, slow))
+            while self._calls and now - self._calls[0][0] > BREAKER_WINDOW:
+                self._calls.popleft()
+            total = len(self._calls)
+            if total < BREAKER_MIN_CALLS:
+                return
+            errors = sum(1 for _, f, _ in self._calls if f)
+            slows = sum(1 for _, _, s in self._calls if s)
+            if errors / total >= BREAKER_ERROR_RATE or slows / total >= BREAKER_SLOW_RATE:
+                self._open(now)
+
+    def cancel_probe(self) -> None:
+        """La llamada de prueba no llegó a hacerse: se deja pasar otra."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._probing = False
+        self._calls.clear()
+        self._set_state(OPEN)
+        logger.warning(f"⚠️ OpenAI con errores o lento: circuit breaker abierto {BREAKER_COOLDOWN:.0f} s")
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        metrics.LLM_BREAKER_STATE.set(_STATE_VALUE[state])
+
+
+breaker = CircuitBreaker()
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=2 * MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+
+
+# ═══════════════════════════════════════════════════════════════
+# LLAMADA PROTEGIDA
+# ═══════════════════════════════════════════════════════════════
+
+def guarded(site: str, attempt: Attempt, repeatable: bool = True) -> Any:
+    """
+    Ejecuta `attempt(timeout)` con breaker, límite de concurrencia, reintentos
+    y (si procede) hedging. Lanza `LLMUnavailable` si no se llega a llamar, o
+    la excepción del último intento.
+
+    Args:
+        site: Punto de llamada (timeouts, hedging y métricas)
+        attempt: Hace una petición con el timeout dado y devuelve la respuesta
+        repeatable: False si la petición no se puede repetir ni duplicar (streaming)
+    """
+    if not breaker.allow():
+        metrics.LLM_REJECTED.inc(site, "open")
+        raise LLMUnavailable("OpenAI no disponible (circuit breaker abierto)")
+
+    timeout = timeout_for(site)
+    hedge = repeatable and HEDGE_ENABLED and site.startswith(HEDGE_SITES)
+    retries = MAX_RETRIES if repeatable else 0
+    for n in range(retries + 1):
+        try:
+            if hedge:
+                return _hedged(site, attempt, timeout)
+            return _attempt(site, attempt, timeout)
+        except LLMUnavailable:
+            raise
+        except Exception as e:
+            if n == retries or not is_transient(e) or breaker.state != CLOSED:
+                raise
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n) * random.uniform(0.5, 1.0)
+            logger.info(f"🔁 {site}: {type(e).__name__}, reintento {n + 1} en {delay:.2f} s")
+            metrics.LLM_RETRIES.inc(site)
+            time.sleep(delay)
+
+
+def in_flight() -> int:
+    """Peticiones a OpenAI en curso en este proceso."""
+    return _in_flight
+
+
+def _track(delta: int) -> None:
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+
+def _attempt(site: str, attempt: Attempt, timeout: float, slot_held: bool = False) -> Any:
+    """Un intento: ocupa un hueco de concurrencia y anota el resultado en el breaker."""
+    if not slot_held and not _slots.acquire(timeout=QUEUE_TIMEOUT):
+        breaker.cancel_probe()
+        metrics.LLM_REJECTED.inc(site, "saturated")
+        raise LLMUnavailable(f"Demasiadas llamadas a OpenAI en curso ({MAX_CONCURRENCY})")
+    t0 = time.perf_counter()
+    failed = False
+    _track(1)
+    try:
+        return attempt(timeout)
+    except Exception as e:
+        failed = is_transient(e)
+        raise
+    finally:
+        _track(-1)
+        _slots.release()
+        breaker.record(failed, time.perf_counter() - t0, timeout)
+
+
+def _hedged(site: str, attempt: Attempt, timeout: float) -> Any:
+    """Intento con una segunda petición si la primera tarda más de HEDGE_DELAY."""
+    primary = _hedge_pool.submit(contextvars.copy_context().run, _attempt, site, attempt, timeout)
+    try:
+        return primary.result(timeout=HEDGE_DELAY)
+    except FutureTimeout:
+        pass
+    if breaker.state != CLOSED or not _slots.acquire(blocking=False):
+        return primary.result()
+
+    hedge = _hedge_pool.submit(contextvars.copy_context().run, _attempt, site, attempt, timeout, True)
+    done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+    first = primary if primary in done else hedge
+    if first.exception() is None:
+        metrics.LLM_HEDGED.inc(site, "primary" if first is primary else "hedge")
+        return first.result()
+    other = hedge if first is primary else primary
+    result = other.result()
+    metrics.LLM_HEDGED.inc(site, "primary" if other is primary else "hedge")
+    return result
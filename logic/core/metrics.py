@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py
+--------------------------------------------------
+Métricas estilo Prometheus para Tutorín (contadores, histogramas y gauges).
+
+Diseño pensado para no penalizar el camino caliente:
+- Cada hilo escribe en su propio "shard" (un dict privado del hilo),
+  así que incrementar un contador no necesita ningún lock.
+- Al hacer scrape (`render()`) se suman todos los shards.
+
+Uso:
+    from logic.core import metrics
+    metrics.SOLVE_TURNS.inc("addition_engine", "ask")
+    metrics.LLM_LATENCY.observe(0.82, "generic_engine.decompose")
+
+El endpoint GET /metrics devuelve `render()` en formato de texto 0.0.4.
+"""
+
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Buckets por defecto (segundos): de 1 ms a 30 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY: List["_Metric"] = []
+
+
+# ═══════════════════════════════════════════════════════════════
+# BASE: SHARDS POR HILO
+# ═══════════════════════════════════════════════════════════════
+
+class _Metric:
+    """Métrica con etiquetas cuyos valores se reparten en shards por hilo."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], object]] = []
+        self._shards_lock = threading.Lock()  # solo se usa al crear un shard nuevo
+        _REGISTRY.append(self)
+
+    def _shard(self) -> Dict[Tuple[str, ...], object]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[Dict[Tuple[str, ...], object]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict(shard) se copia de una vez bajo el GIL
+        return [dict(shard) for shard in shards]
+
+    def _labels(self, values: Sequence[str]) -> str:
+        if not self.labelnames:
+            return ""
+        pairs = ",".join(
+            f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)
+        )
+        return "{" + pairs + "}"
+
+    def reset(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _key(labelvalues: Sequence[object]) -> Tuple[str, ...]:
+    return tuple("" if v is None else str(v) for v in labelvalues)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONTADOR
+# ═══════════════════════════════════════════════════════════════
+
+class Counter(_Metric):
+    """Contador monótono con etiquetas."""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues: object, amount: float = 1) -> None:
+        shard = self._shard()
+        key = _key(labelvalues)
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """Suma de todos los shards por combinación de etiquetas."""
+        total: Dict[Tuple[str, ...], float] = {}
+        for shard in self._snapshot():
+            for key, value in shard.items():
+                total[key] = total.get(key, 0) + value
+        return total
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._labels(key)} {_fmt(value)}"
+            for key, value in sorted(self.values().items())
+        ]
+
+
+# ═══════════════════════════════════════════════════════════════
+# HISTOGRAMA
+# ═══════════════════════════════════════════════════════════════
+
+class Histogram(_Metric):
+    """Histograma acumulativo (buckets + suma + cuenta) con etiquetas."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: object) -> None:
+        shard = self._shard()
+        key = _key(labelvalues)
+        entry = shard.get(key)
+        if entry is None:
+            # [conteo por bucket..., conteo +Inf, suma]
+            entry = [0] * (len(self.buckets) + 1) + [0.0]
+            shard[key] = entry
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[i] += 1
+                break
+        else:
+            entry[len(self.buckets)] += 1
+        entry[-1] += value
+
+    def values(self) -> Dict[Tuple[str, ...], List[float]]:
+        total: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._snapshot():
+            for key, entry in shard.items():
+                acc = total.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+                for i, v in enumerate(list(entry)):
+                    acc[i] += v
+        return total
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, entry in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _fmt(bound)
+                labels = self._labels(key)
+                labels = (labels[:-1] + f',le="{le}"}}') if labels else f'{{le="{le}"}}'
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_fmt(entry[-1])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+# ═══════════════════════════════════════════════════════════════
+# GAUGE
+# ═══════════════════════════════════════════════════════════════
+
+class Gauge(_Metric):
+    """
+    Valor instantáneo con etiquetas (profundidad de una cola, tamaño de una caché...).
+    A diferencia de contadores e histogramas, un gauge no se puede repartir
+    en shards: cada `set()` sobrescribe el valor global (asignación atómica bajo el GIL).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labelvalues: object) -> None:
+        self._values[_key(labelvalues)] = value
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        return dict(self._values)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{self._labels(key)} {_fmt(value)}"
+            for key, value in sorted(self.values().items())
+        ]
+
+    def reset(self) -> None:
+        self._values.clear()
+
+
+def _fmt(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXPOSICIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def render() -> str:
+    """Devuelve todas las métricas registradas en formato de texto Prometheus."""
+    out: List[str] = []
+    for metric in _REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.render())
+    return "\n".join(out) + "\n"
+
+
+def reset_all() -> None:
+    """Pone a cero todas las métricas (tests y benchmarks)."""
+    for metric in _REGISTRY:
+        metric.reset()
+
+
+# ═══════════════════════════════════════════════════════════════
+# MÉTRICAS DE TUTORÍN
+# ═══════════════════════════════════════════════════════════════
+
+HTTP_REQUESTS = Counter(
+    "tutorin_http_requests_total", "Peticiones HTTP por ruta, método y código", ("route", "method", "status"))
+HTTP_LATENCY = Histogram(
+    "tutorin_http_request_duration_seconds", "Duración de las peticiones HTTP por ruta", ("route",))
+
+SOLVE_TURNS = Counter(
+    "tutorin_solve_turns_total", "Turnos de /solve por motor y estado devuelto", ("engine", "status"))
+STAGE_LATENCY = Histogram(
+    "tutorin_stage_duration_seconds", "Duración por etapa (nlu, engine, hint, openai, db) y motor", ("stage", "engine"))
+
+HINTS = Counter(
+    "tutorin_hints_total", "Pistas generadas por tema y origen (module | ai_fallback)", ("topic", "source"))
+
+LLM_CALLS = Counter(
+    "tutorin_llm_calls_total", "Llamadas a OpenAI por punto de llamada, modelo y resultado", ("site", "model", "outcome"))
+LLM_LATENCY = Histogram(
+    "tutorin_llm_call_duration_seconds", "Latencia de las llamadas a OpenAI por punto de llamada", ("site",))
+LLM_FIRST_TOKEN = Histogram(
+    "tutorin_llm_first_token_seconds", "Tiempo hasta el primer token en llamadas con streaming", ("site",))
+LLM_COALESCED = Counter(
+    "tutorin_llm_coalesced_total", "Llamadas a OpenAI ahorradas al compartir una idéntica en curso (local | shared)",
+    ("site", "scope"))
+LLM_REJECTED = Counter(
+    "tutorin_llm_rejected_total", "Llamadas a OpenAI no realizadas por motivo (open | saturated)", ("site", "reason"))
+LLM_RETRIES = Counter(
+    "tutorin_llm_retries_total", "Reintentos de llamadas a OpenAI tras un error transitorio", ("site",))
+LLM_HEDGED = Counter(
+    "tutorin_llm_hedged_total", "Llamadas con segunda petición (hedging) por petición ganadora (primary | hedge)",
+    ("site", "winner"))
+LLM_BREAKER_STATE = Gauge(
+    "tutorin_llm_breaker_state", "Circuit breaker de OpenAI: 0 cerrado, 1 probando, 2 abierto")
+LLM_TOKENS = Counter(
+    "tutorin_llm_tokens_total", "Tokens consumidos por punto de llamada y tipo (prompt | completion | cached)",
+    ("site", "kind"))
+LLM_CALL_TOKENS = Histogram(
+    "tutorin_llm_call_tokens", "Tokens por llamada a OpenAI por punto de llamada y tipo", ("site", "kind"),
+    buckets=(16, 64, 128, 256, 512, 1024, 2048, 4096, 8192))
+LLM_MODEL_CHOICES = Counter(
+    "tutorin_llm_model_choices_total", "Modelo elegido por tarea y motivo (preferred | latency | load)",
+    ("task", "model", "reason"))
+LLM_COST = Counter(
+    "tutorin_llm_cost_usd_total", "Coste estimado de OpenAI en USD por tarea y modelo", ("task", "model"))
+
+LOCAL_SOLVER = Counter(
+    "tutorin_local_solver_total", "Problemas de texto intentados sin IA por resultado (solved | low_confidence | unsupported)",
+    ("result",))
+
+CACHE_REQUESTS = Counter(
+    "tutorin_cache_requests_total", "Consultas a cachés internas por caché y resultado (hit | miss)", ("cache", "result"))
+
+IMAGE_PREP_BYTES = Counter(
+    "tutorin_image_prep_bytes_total", "Bytes de imagen recibidos y enviados a Vision por punto de llamada", ("site", "kind"))
+IMAGE_PREP_LATENCY = Histogram(
+    "tutorin_image_prep_duration_seconds", "Duración del preprocesado de imágenes por punto de llamada", ("site",))
+
+READING_POOL_DEPTH = Gauge(
+    "tutorin_reading_pool_depth", "Ejercicios de lectura pregenerados disponibles por tema y nivel", ("topic", "level"))
+READING_POOL_GENERATED = Counter(
+    "tutorin_reading_pool_generated_total", "Ejercicios generados en segundo plano por resultado (ok | error)", ("outcome",))
+
+READING_DEDUP = Counter(
+    "tutorin_reading_dedup_total", "Búsquedas de textos de lectura ya procesados (exact | near | miss)", ("match",))
+
+READING_JOBS = Counter(
+    "tutorin_reading_jobs_total", "Trabajos asíncronos de /reading por tipo y evento (queued | done | error | rejected)", ("kind", "event"))
+READING_JOB_QUEUE = Gauge(
+    "tutorin_reading_job_queue_depth", "Trabajos de /reading en espera de un worker")
+
+DB_LATENCY = Histogram(
+    "tutorin_db_operation_duration_seconds", "Latencia de las operaciones SQLite por función", ("operation",))
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+model_router.py
+--------------------------------------------------
+Elección del modelo de OpenAI por clase de tarea.
+
+Antes cada punto de llamada fijaba su modelo (gpt-4o-mini en generic_engine,
+gpt-4o en ai_reading y analyze_image, OPENAI_MODEL en las pistas). Ahora piden
+`choose_model(tarea)` y la política decide con tres datos:
+
+1. Niveles de calidad: lista de modelos por tarea, del preferido al de
+   reserva (MODEL_TIERS, configurable con LLM_MODELS_<TAREA>).
+2. Latencia observada: p95 de las últimas llamadas de cada (tarea, modelo),
+   que anota `llm_gateway` con `observe()`. Si el preferido supera el
+   objetivo de la tarea (P95_TARGETS) se baja al siguiente nivel; si ninguno
+   lo cumple, se usa el de menor p95 (y a igualdad, el más barato).
+3. Coste por token (MODEL_COSTS): desempate y coste estimado por tarea.
+
+Con carga alta (llamadas en curso ≥ LLM_ROUTER_LOAD_THRESHOLD del límite de
+concurrencia de llm_resilience) se usa directamente el nivel más barato.
+Un modelo sin datos suficientes (LLM_ROUTER_MIN_SAMPLES) se considera válido.
+Las latencias caducan a los LLM_ROUTER_MAX_AGE segundos, así que tras bajar de
+nivel el preferido vuelve cuando sus llamadas lentas salen de la ventana;
+mientras tanto se le envía 1 de cada LLM_ROUTER_PROBE_EVERY llamadas para
+renovar su p95.
+
+Tareas: decompose, hint, reading_text, questions, vision.
+
+Métricas:
+    tutorin_llm_model_choices_total{task,model,reason=preferred|latency|load}
+    tutorin_llm_cost_usd_total{task,model}   coste estimado según `usage`
+Resumen legible: `usage_report()` (GET /metrics/models).
+
+Configuración:
+    LLM_ROUTING_ENABLED          "1" (por defecto) / "0": siempre el modelo preferido
+    LLM_MODELS_<TAREA>           modelos por orden de preferencia, p. ej.
+                                 LLM_MODELS_READING_TEXT="gpt-4o,gpt-4o-mini"
+    LLM_P95_TARGET_<TAREA>       objetivo de p95 en segundos
+    LLM_ROUTER_WINDOW            llamadas recientes por modelo para el p95 (50)
+    LLM_ROUTER_MAX_AGE           segundos que cuenta una latencia para el p95 (300)
+    LLM_ROUTER_MIN_SAMPLES       llamadas mínimas para fiarse del p95 (10)
+    LLM_ROUTER_LOAD_THRESHOLD    fracción de LLM_MAX_CONCURRENCY que activa la bajada (0.75)
+    LLM_ROUTER_PROBE_EVERY       cada cuántas llamadas se prueba el preferido tras bajar (20)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from logic.core import llm_resilience, metrics
+
+logger = logging.getLogger("tutorin.model_router")
+
+ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "1") == "1"
+WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "50"))
+MAX_AGE = float(os.getenv("LLM_ROUTER_MAX_AGE", "300"))
+MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "10"))
+LOAD_THRESHOLD = float(os.getenv("LLM_ROUTER_LOAD_THRESHOLD", "0.75"))
+PROBE_EVERY = int(os.getenv("LLM_ROUTER_PROBE_EVERY", "20"))
+
+
+def _models(task: str, default: str) -> List[str]:
+    spec = os.getenv(f"LLM_MODELS_{task.upper()}", default)
+    return [m.strip() for m in spec.split(",") if m.strip()]
+
+
+_HINT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# Modelos por tarea, del preferido al de reserva
+MODEL_TIERS: Dict[str, List[str]] = {
+    "decompose": _models("decompose", "gpt-4o-mini"),
+    "hint": _models("hint", _HINT_MODEL),
+    "reading_text": _models("reading_text", "gpt-4o,gpt-4o-mini"),
+    "questions": _models("questions", "gpt-4o,gpt-4o-mini"),
+    "vision": _models("vision", "gpt-4o,gpt-4o-mini"),
+}
+
+# Objetivo de p95 por tarea (segundos)
+P95_TARGETS: Dict[str, float] = {
+    task: float(os.getenv(f"LLM_P95_TARGET_{task.upper()}", default))
+    for task, default in (("decompose", "10"), ("hint", "4"), ("reading_text", "20"),
+                          ("questions", "15"), ("vision", "30"))
+}
+
+# USD por millón de tokens (entrada, salida)
+MODEL_COSTS: Dict[str, Tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Punto de llamada → tarea (prefijo más largo)
+SITE_TASKS: Dict[str, str] = {
+    "generic_engine.decompose": "decompose",
+    "generic_engine.hint": "hint",
+    "generic_engine.prefetch": "hint",
+    "ai_router": "hint",
+    "hints_": "hint",
+    "ai_reading.text_generator": "reading_text",
+    "ai_reading.question_generator": "questions",
+    "ai_reading.answer_generator": "questions",
+    "ai_reading.photo_parser": "vision",
+    "analyze_image": "vision",
+}
+
+_lock = threading.Lock()
+_latencies: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}   # (instante, segundos)
+_degraded_calls: Dict[str, int] = {}
+
+
+def task_for(site: str) -> str:
+    """Tarea de un punto de llamada ("other" si no está clasificado)."""
+    best, task = -1, "other"
+    for prefix, name in SITE_TASKS.items():
+        if site.startswith(prefix) and len(prefix) > best:
+            best, task = len(prefix), name
+    return task
+
+
+def _p95(task: str, model: str) -> Optional[float]:
+    """p95 de la ventana reciente, o None si no hay muestras suficientes."""
+    oldest = time.monotonic() - MAX_AGE
+    with _lock:
+        samples = sorted(s for t, s in _latencies.get((task, model), ()) if t >= oldest)
+    if len(samples) < MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, math.ceil(0.95 * len(samples)) - 1)]
+
+
+def _cost(model: str) -> float:
+    return sum(MODEL_COSTS.get(model, (0.0, 0.0)))
+
+
+def _under_load() -> bool:
+    return llm_resilience.in_flight() >= LOAD_THRESHOLD * llm_resilience.MAX_CONCURRENCY
+
+
+def _select(task: str, tiers: List[str]) -> Tuple[str, str]:
+    """(modelo, motivo) según carga y latencia observada."""
+    if _under_load():
+        return min(tiers, key=_cost), "load"
+
+    target = P95_TARGETS.get(task, math.inf)
+    latencies = {model: _p95(task, model) for model in tiers}
+    for model in tiers:
+        p95 = latencies[model]
+        if p95 is None or p95 <= target:
+            return model, "preferred" if model == tiers[0] else "latency"
+    # Ninguno cumple el objetivo: el más rápido (y a igualdad, el más barato)
+    model = min(tiers, key=lambda m: (latencies[m], _cost(m)))
+    return model, "preferred" if model == tiers[0] else "latency"
+
+
+def choose_model(task: str) -> str:
+    """Modelo para la siguiente llamada de `task` (decompose, hint, reading_text, questions, vision)."""
+    tiers = MODEL_TIERS[task]
+    if not ROUTING_ENABLED or len(tiers) == 1:
+        metrics.LLM_MODEL_CHOICES.inc(task, tiers[0], "preferred")
+        return tiers[0]
+
+    model, reason = _select(task, tiers)
+    if reason == "latency":
+        # De vez en cuando se vuelve a probar el preferido para renovar su p95
+        with _lock:
+            n = _degraded_calls[task] = _degraded_calls.get(task, 0) + 1
+        if n % PROBE_EVERY == 0:
+            model, reason = tiers[0], "preferred"
+    if reason != "preferred":
+        logger.info(f"🔀 {task}: {model} en lugar de {tiers[0]} ({reason})")
+    metrics.LLM_MODEL_CHOICES.inc(task, model, reason)
+    return model
+
+
+def observe(site: str, model: str, seconds: float, usage: Any = None) -> None:
+    """Anota la latencia (y el coste, si hay `usage`) de una llamada terminada."""
+    task = task_for(site)
+    with _lock:
+        window = _latencies.get((task, model))
+        if window is None:
+            window = _latencies[(task, model)] = deque(maxlen=WINDOW)
+        window.append((time.monotonic(), seconds))
+    if usage is not None and model in MODEL_COSTS:
+        cost_in, cost_out = MODEL_COSTS[model]
+        cost = ((getattr(usage, "prompt_tokens", 0) or 0) * cost_in
+                + (getattr(usage, "completion_tokens", 0) or 0) * cost_out) / 1_000_000
+        metrics.LLM_COST.inc(task, model, amount=cost)
+
+
+def usage_report() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Uso por tarea y modelo: elecciones, p95 reciente y coste estimado."""
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for (task, model, _reason), count in metrics.LLM_MODEL_CHOICES.values().items():
+        entry = report.setdefault(task, {}).setdefault(model, {"choices": 0.0})
+        entry["choices"] += count
+    for (task, model), cost in metrics.LLM_COST.values().items():
+        report.setdefault(task, {}).setdefault(model, {"choices": 0.0})["cost_usd"] = round(cost, 6)
+    with _lock:
+        keys = list(_latencies)
+    for task, model in keys:
+        p95 = _p95(task, model)
+        if p95 is not None:
+            report.setdefault(task, {}).setdefault(model, {"choices": 0.0})["p95_seconds"] = round(p95, 3)
+    return report
+
+
+def reset() -> None:
+    """Olvida las latencias observadas (tests)."""
+    with _lock:
+        _latencies.clear()
+        _degraded_calls.clear()
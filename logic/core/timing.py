@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+timing.py
+--------------------------------------------------
+Medición ligera de latencias por etapa para Tutorín.
+
+Cada petición HTTP abre un "registro de tiempos" (RequestTimings) guardado
+en un ContextVar. Las funciones instrumentadas con `span()` o `@timed()`
+suman su duración a ese registro, y al cerrar la petición:
+
+- se genera la cabecera `Server-Timing` (nlu, engine, hint, openai, db...)
+- se vuelcan las duraciones a histogramas agregados por etapa y motor,
+  de los que se obtienen p50/p95/p99 para /metrics/latency
+  (y al histograma Prometheus tutorin_stage_duration_seconds)
+
+Etapas usadas en el proyecto:
+    nlu          → modules.ai_analyzer.analyze_prompt
+    engine_load  → carga dinámica del motor
+    engine       → ejecución de handle_step
+    hint         → logic.ai_hints.ai_router.generate_hint_with_ai
+    openai       → llamadas a la API de OpenAI (llm_gateway)
+    image_prep   → preprocesado de fotos antes de GPT-4 Vision (image_prep)
+    tts          → síntesis de voz con gTTS (solo en fallos de la caché de audio)
+    db           → funciones de db.py
+
+Las etapas pueden solaparse (p. ej. "hint" incluye su llamada a "openai").
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from logic.core import metrics
+
+# Número máximo de muestras que se guardan por (etapa, motor)
+RESERVOIR_SIZE = int(os.getenv("TIMING_RESERVOIR_SIZE", "2048"))
+
+# Etiqueta usada cuando una etapa no pertenece a ningún motor concreto
+NO_ENGINE = "none"
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar("tutorin_timings", default=None)
+
+
+# ═══════════════════════════════════════════════════════════════
+# REGISTRO POR PETICIÓN
+# ═══════════════════════════════════════════════════════════════
+
+class RequestTimings:
+    """Acumula la duración de cada etapa dentro de una única petición."""
+
+    __slots__ = ("started", "stages", "labels")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}   # etapa → [ms_total, llamadas]
+        self.labels: Dict[str, str] = {}
+
+    def add(self, stage: str, ms: float) -> None:
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [ms, 1]
+        else:
+            entry[0] += ms
+            entry[1] += 1
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def server_timing_header(self) -> str:
+        """Devuelve el valor de la cabecera Server-Timing (RFC de W3C)."""
+        parts = [
+            f'{stage};dur={ms:.1f};desc="x{int(count)}"'
+            for stage, (ms, count) in self.stages.items()
+        ]
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+
+def start_request():
+    """Abre un registro de tiempos para la petición actual. Devuelve el token del ContextVar."""
+    return _current.set(RequestTimings())
+
+
+def finish_request(token) -> Optional[RequestTimings]:
+    """
+    Cierra el registro de la petición actual, vuelca sus etapas
+    a los histogramas agregados y lo devuelve.
+    """
+    timings = _current.get()
+    _current.reset(token)
+    if timings is None:
+        return None
+
+    engine = timings.labels.get("engine", NO_ENGINE)
+    for stage, (ms, _count) in timings.stages.items():
+        _observe(stage, engine, ms)
+    _observe("total", engine, timings.elapsed_ms())
+    return timings
+
+
+def current() -> Optional[RequestTimings]:
+    """Registro de tiempos de la petición en curso (o None fuera de una petición)."""
+    return _current.get()
+
+
+def set_label(key: str, value: Any) -> None:
+    """Asocia una etiqueta (p. ej. engine) a la petición en curso."""
+    timings = _current.get()
+    if timings is not None and value:
+        timings.labels[key] = str(value)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SPANS
+# ═══════════════════════════════════════════════════════════════
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Mide el bloque y suma su duración a la etapa indicada.
+    Fuera de una petición, la muestra va directamente al histograma.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000.0
+        timings = _current.get()
+        if timings is not None:
+            timings.add(stage, ms)
+        else:
+            _observe(stage, NO_ENGINE, ms)
+
+
+def timed(stage: str) -> Callable:
+    """Decorador equivalente a envolver la función completa en `span(stage)`."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ═══════════════════════════════════════════════════════════════
+# HISTOGRAMAS AGREGADOS
+# ═══════════════════════════════════════════════════════════════
+
+_samples: Dict[Tuple[str, str], Deque[float]] = {}
+_counts: Dict[Tuple[str, str], int] = {}
+_samples_lock = threading.Lock()
+
+
+def _observe(stage: str, engine: str, ms: float) -> None:
+    key = (stage, engine)
+    bucket = _samples.get(key)
+    if bucket is None:
+        with _samples_lock:
+            bucket = _samples.setdefault(key, deque(maxlen=RESERVOIR_SIZE))
+            _counts.setdefault(key, 0)
+    # deque.append es atómico bajo el GIL; el contador es aproximado por diseño
+    bucket.append(ms)
+    _counts[key] += 1
+    metrics.STAGE_LATENCY.observe(ms / 1000.0, stage, engine)
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = max(0, math.ceil(p * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+def latency_summary() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Devuelve p50/p95/p99 (ms) por etapa y motor:
+    {"engine": {"addition_engine": {"count": 12, "p50": 1.2, "p95": ..., "p99": ...}}}
+    """
+    with _samples_lock:
+        items = [(key, list(values), _counts.get(key, 0)) for key, values in _samples.items()]
+
+    summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for (stage, engine), values, count in sorted(items):
+        values.sort()
+        summary.setdefault(stage, {})[engine] = {
+            "count": count,
+            "p50": round(_percentile(values, 0.50), 2),
+            "p95": round(_percentile(values, 0.95), 2),
+            "p99": round(_percentile(values, 0.99), 2),
+        }
+    return summary
+
+
+def reset() -> None:
+    """Vacía los histogramas (útil en tests y benchmarks)."""
+    with _samples_lock:
+        _samples.clear()
+        _counts.clear()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+uploads.py
+--------------------------------------------------
+Recepción de fotos por streaming, con límite de tamaño y sin copias completas.
+
+Antes cada foto se cargaba entera en memoria (`await file.read()`) y se
+duplicaba al pasarla a base64; /reading/from-photos recibía hasta cinco
+base64 dentro de un JSON. Ahora:
+
+- `UploadLimitMiddleware` corta el cuerpo de las rutas de imágenes en cuanto
+  supera el límite: rechaza por Content-Length sin leer nada y, si el cuerpo
+  llega troceado, cuenta los bytes según se reciben (413).
+- `spool_upload()` copia el UploadFile por bloques a un SpooledTemporaryFile
+  (en memoria hasta UPLOAD_SPOOL_BYTES, en disco a partir de ahí) y corta
+  con 413 al pasar de UPLOAD_MAX_BYTES.
+- `decode_base64()` hace lo mismo, por bloques, con una imagen que llega en
+  base64 (cuerpo JSON de /reading/from-photos).
+
+Pillow abre directamente el fichero spooled (ver logic.core.image_prep), así
+que la foto original nunca está completa en memoria; a base64 solo se pasa la
+versión ya reducida.
+
+Configuración:
+    UPLOAD_MAX_BYTES     tamaño máximo por imagen (15 MB)
+    UPLOAD_MAX_FILES     imágenes máximas por petición (5)
+    UPLOAD_SPOOL_BYTES   a partir de aquí el fichero temporal pasa a disco (1 MB)
+"""
+
+import base64
+import json
+import logging
+import os
+import tempfile
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger("tutorin.uploads")
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_MAX_FILES = int(os.getenv("UPLOAD_MAX_FILES", "5"))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+CHUNK_SIZE = 64 * 1024
+_B64_CHUNK = 4 * 16 * 1024     # múltiplo de 4 caracteres
+
+# Rutas con subida de imágenes (prefijos)
+UPLOAD_PATHS = ("/analyze/image", "/reading/from-photo")
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"La imagen es demasiado grande (máximo {limit / (1024 * 1024):.1f} MB)"
+    )
+
+
+def _spool() -> tempfile.SpooledTemporaryFile:
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> BinaryIO:
+    """
+    Copia la subida por bloques a un fichero temporal (rebobinado).
+    Lanza HTTPException 413 si supera `max_bytes`. El llamador debe cerrarlo.
+    """
+    spooled = _spool()
+    total = 0
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:
+                raise _too_large(max_bytes)
+            spooled.write(chunk)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def decode_base64(data: str, max_bytes: int = UPLOAD_MAX_BYTES) -> BinaryIO:
+    """
+    Decodifica una imagen base64 (con o sin prefijo data:) por bloques a un
+    fichero temporal rebobinado. Lanza 413 si supera `max_bytes` y
+    binascii.Error (ValueError) si no es base64 válido.
+    """
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    if len(data) * 3 // 4 > max_bytes + 2:
+        raise _too_large(max_bytes)
+    if any(c in data for c in "\r\n \t"):
+        data = "".join(data.split())
+
+    spooled = _spool()
+    try:
+        for start in range(0, len(data), _B64_CHUNK):
+            spooled.write(base64.b64decode(data[start:start + _B64_CHUNK]))
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+# ═══════════════════════════════════════════════════════════════
+# LÍMITE DEL CUERPO DE LA PETICIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def body_limit() -> int:
+    """Cuerpo máximo de una ruta de imágenes: todas las fotos en base64 + margen."""
+    return (UPLOAD_MAX_BYTES * 4 // 3 + 4) * max(1, UPLOAD_MAX_FILES) + 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """Middleware ASGI que corta con 413 los cuerpos demasiado grandes en UPLOAD_PATHS."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(UPLOAD_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        limit = body_limit()
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            declared = 0
+        if declared > limit:
+            logger.warning(f"⚠️ Subida rechazada en {scope['path']}: {declared} bytes")
+            await _send_413(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI deja pasar HTTPException al parsear el cuerpo → 413
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_413(send, limit: int) -> None:
+    body = json.dumps({"detail": _too_large(limit).detail}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
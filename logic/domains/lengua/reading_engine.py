@@ -16,6 +16,7 @@ Pasos típicos:
 import re
 import json
 from typing import Dict, Any, List, Optional, Tuple
+from logic.core.answers import normalize
 
 # ═══════════════════════════════════════════════════════════════
 # SISTEMA DE PISTAS
@@ -59,10 +60,43 @@ def _norm_cycle(cycle: str | None) -> str:
     if c in {"3", "c3"}: return "c3"
     return "c2"
 
+# ═══════════════════════════════════════════════════════════════
+# EJERCICIOS GUARDADOS (referencia por exercise_id)
+# ═══════════════════════════════════════════════════════════════
+
+# Los ejercicios creados en /reading/* se guardan con db.save_reading_exercise.
+# En /solve basta con enviar "reading:<exercise_id>" en lugar del JSON completo.
+READING_REF_PREFIX = "reading:"
+
+
+def reading_ref(exercise_id: str) -> str:
+    """Referencia corta a un ejercicio guardado (lo que viaja como `question`)."""
+    return f"{READING_REF_PREFIX}{exercise_id}"
+
+
+def parse_reading_ref(question: str) -> Optional[str]:
+    """Devuelve el exercise_id si `question` es una referencia "reading:<id>"."""
+    q = (question or "").strip()
+    if q.startswith(READING_REF_PREFIX):
+        return q[len(READING_REF_PREFIX):].strip() or None
+    return None
+
+
+def load_reading_exercise(exercise_id: str) -> Optional[Dict[str, Any]]:
+    """Obtiene un ejercicio guardado (db.py lo mantiene parseado en caché)."""
+    import db
+    exercise = db.get_reading_exercise(exercise_id)
+    if exercise and "text" in exercise and "questions" in exercise:
+        return exercise
+    return None
+
+
 def _parse_reading_exercise(question: str) -> Optional[Dict[str, Any]]:
     """
     Parsea un ejercicio de lectura.
-    Formato esperado:
+    Formato recomendado: "reading:<exercise_id>" (ejercicio guardado en BD).
+
+    Formato JSON completo:
     {
         "text": "El texto a leer...",
         "questions": [
@@ -75,6 +109,10 @@ def _parse_reading_exercise(question: str) -> Optional[Dict[str, Any]]:
     TEXTO: [texto]
     PREGUNTA: [pregunta]
     """
+    exercise_id = parse_reading_ref(question)
+    if exercise_id:
+        return load_reading_exercise(exercise_id)
+
     try:
         # Intentar parsear JSON
         data = json.loads(question)
@@ -116,8 +154,8 @@ def _check_answer_similarity(user_answer: str, expected_answer: str) -> Tuple[bo
     Verifica similitud entre respuestas.
     Retorna (es_correcta, similitud_porcentaje)
     """
-    user = user_answer.lower().strip()
-    expected = expected_answer.lower().strip()
+    user = normalize(user_answer)
+    expected = normalize(expected_answer)
 
     # Coincidencia exacta
     if user == expected:
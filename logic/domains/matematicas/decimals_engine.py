@@ -11,14 +11,13 @@ Motor para operaciones con números decimales.
 import re
 from typing import Dict, Any, Optional, Tuple
 
+# Tipo de respuesta que compara /solve (logic/core/answers.py)
+ANSWER_TYPE = "decimal"
+
 # ══════════════════════════════════════════════════════════════
 # FUNCIONES AUXILIARES
 # ══════════════════════════════════════════════════════════════
 
-def _canon(s: str) -> str:
-    """Normaliza texto para comparación."""
-    return str(s or "").strip().lower().replace(",", ".")
-
 def _extract_operation(expr: str) -> Optional[Tuple[float, str, float]]:
     """
     Extrae números decimales y operador de una expresión.
@@ -9,6 +9,9 @@ from fractions import Fraction
 import re
 from math import lcm
 
+# Tipo de respuesta que compara /solve (logic/core/answers.py)
+ANSWER_TYPES = {"frac_mcm": "integer", "frac_equiv": "pair", "frac_operacion": "fraction", "frac_simplificar": "fraction"}
+
 # ═══════════════════════════════════════════════════════════════
 # SISTEMA DE PISTAS (CORREGIDO)
 # ═══════════════════════════════════════════════════════════════
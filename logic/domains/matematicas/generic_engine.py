@@ -5,28 +5,37 @@ Motor de problemas con IA pedagógica completa.
 ✅ Detecta múltiples formas de pedir ayuda
 ✅ Validación flexible mejorada
 ✅ Sistema de pistas contextual robusto
+✅ Pistas precalculadas: tras descomponer el problema se generan en segundo
+   plano las pistas de nivel 1-3 de cada paso (GENERIC_HINT_PREFETCH)
+✅ Resolución local: los problemas sencillos de una o dos operaciones se
+   descomponen sin IA (local_solver), también sin conexión
+✅ Plantillas: las variantes de un problema ya descompuesto (otros números o
+   nombres) se recalculan en local (problem_templates)
 """
 
-import re
 import os
 import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
+from logic.core import answers, metrics
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
+from logic.domains.matematicas import local_solver, problem_templates
 
 # Cargar variables de entorno
 load_dotenv()
 
 # Inicializar cliente OpenAI
 try:
-    from openai import OpenAI
-    
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         print("[GENERIC_ENGINE] ⚠️ OPENAI_API_KEY no está configurada")
         AI_AVAILABLE = False
         client = None
     else:
-        client = OpenAI(api_key=api_key)
+        client = get_client()
         AI_AVAILABLE = True
         print("[GENERIC_ENGINE] ✅ OpenAI inicializado correctamente")
         
@@ -75,23 +84,22 @@ def _is_asking_for_help(user_answer: str) -> bool:
 # 1. ANÁLISIS Y DESCOMPOSICIÓN DEL PROBLEMA
 # ══════════════════════════════════════════════════════════════
 
-DECOMPOSITION_PROMPT = """Eres Tutorín, un profesor de matemáticas de primaria experto en resolver problemas paso a paso.
-
-PROBLEMA:
-{problem}
-
-Descompón este problema siguiendo una estructura pedagógica clara que ayude al niño a comprender y resolver.
+# Instrucciones fijas en el mensaje de sistema y el enunciado al final, para
+# que lo que cambia en cada llamada quede separado y medido (PROMPT_BUDGETS).
+# Con ~700 tokens no llega al mínimo de 1024 que OpenAI exige para servir un
+# prefijo desde su caché de prompts: el ahorro viene de reducir el prompt.
+DECOMPOSITION_PROMPT = """Eres Tutorín, un profesor de matemáticas de primaria experto en descomponer problemas paso a paso. Respondes SOLO con JSON válido.
 
-Responde SOLO con JSON en este formato exacto:
+Descompón el problema que te envíen con una estructura pedagógica clara que ayude al niño a comprenderlo y resolverlo, en este formato exacto:
 
-{{
+{
   "tipo_problema": "simple" | "medio" | "complejo",
-  "datos": {{
+  "datos": {
     "conocidos": ["lista de datos que da el problema"],
     "desconocido": "qué debemos calcular"
-  }},
+  },
   "pasos": [
-    {{
+    {
       "numero": 0,
       "tipo": "comprension",
       "descripcion": "Entender el problema y los datos",
@@ -99,8 +107,8 @@ Responde SOLO con JSON en este formato exacto:
       "pregunta": "Pregunta sobre comprensión del enunciado",
       "respuesta_esperada": "respuesta de comprensión",
       "pista_contextual": "Pista específica de este problema si dice 'no sé'"
-    }},
-    {{
+    },
+    {
       "numero": 1,
       "tipo": "calculo",
       "descripcion": "Descripción clara del paso",
@@ -110,53 +118,55 @@ Responde SOLO con JSON en este formato exacto:
       "respuesta_esperada": "valor numérico exacto",
       "explicacion_adicional": "contexto o ayuda visual",
       "pista_contextual": "Pista específica si no sabe"
-    }}
+    }
   ],
   "respuesta_final": "valor final del problema",
   "unidad": "unidad de medida si aplica (€, kg, metros, etc.)"
-}}
+}
 
 REGLAS IMPORTANTES:
-1. SIEMPRE incluir un paso 0 de COMPRENSIÓN del problema
-2. En el paso 0, preguntar sobre los DATOS del problema o QUÉ deben calcular
-3. La respuesta_esperada del paso 0 debe ser FLEXIBLE (ej: "cuanto paga alumno")
-4. Problemas SIMPLES (2-3 pasos): 1 comprensión + 1-2 cálculos
-5. Problemas MEDIOS (4-5 pasos): 1 comprensión + 3-4 cálculos
-6. Problemas COMPLEJOS (6+ pasos): 1 comprensión + 5+ cálculos
-7. Cada paso debe ser MUY CONCRETO y hacer UNA SOLA PREGUNTA
-8. Para FRACCIONES: convierte a decimal en respuesta_esperada
-9. La pista_contextual debe ser ESPECÍFICA del problema, no genérica
-10. Las respuestas esperadas de comprensión deben ser PALABRAS CLAVE, no frases completas
-
-Ejemplo de respuesta esperada FLEXIBLE:
-- Mal: "cuanto debe pagar cada alumno exactamente"
-- Bien: "cuanto paga alumno" (palabras clave: cuanto, paga, alumno)
-
-RECUERDA: 
-- El paso 0 SIEMPRE es de comprensión
-- Cada pista_contextual debe mencionar números y operaciones ESPECÍFICAS del problema
-- NO uses pistas genéricas como "piensa bien" o "lee con atención"
+1. El paso 0 SIEMPRE es de COMPRENSIÓN: pregunta por los DATOS del problema o por QUÉ hay que calcular
+2. Su respuesta_esperada son PALABRAS CLAVE flexibles, no frases completas (mal: "cuanto debe pagar cada alumno exactamente"; bien: "cuanto paga alumno")
+3. SIMPLES: 1 comprensión + 1-2 cálculos. MEDIOS: 1 comprensión + 3-4 cálculos. COMPLEJOS: 1 comprensión + 5 o más cálculos
+4. Cada paso debe ser MUY CONCRETO y hacer UNA SOLA PREGUNTA
+5. Para FRACCIONES: convierte a decimal en respuesta_esperada
+6. Cada pista_contextual es ESPECÍFICA del problema y menciona sus números y operaciones; NO uses pistas genéricas como "piensa bien" o "lee con atención"
 """
 
+DECOMPOSITION_INPUT = """PROBLEMA:
+{problem}"""
+
+
+def _decomposition_messages(problem: str) -> List[Dict[str, str]]:
+    """Mensajes de la llamada de descomposición (prefijo fijo + enunciado)."""
+    return [
+        {"role": "system", "content": DECOMPOSITION_PROMPT},
+        {"role": "user", "content": DECOMPOSITION_INPUT.format(problem=problem)},
+    ]
+
 def _decompose_problem(problem: str) -> Optional[Dict[str, Any]]:
     """Usa IA para descomponer el problema en pasos manejables"""
+    # Problemas sencillos (una o dos operaciones con palabras clave claras): sin IA
+    min_confidence = local_solver.MIN_CONFIDENCE if AI_AVAILABLE else local_solver.OFFLINE_MIN_CONFIDENCE
+    local = local_solver.decompose(problem, min_confidence)
+    if local:
+        return local
+    
+    # Misma estructura que un problema ya descompuesto: recalcular en local
+    templated = problem_templates.lookup(problem)
+    if templated:
+        print(f"[GENERIC_ENGINE] ♻️ Descomposición desde plantilla ({len(templated.get('pasos', []))} pasos)")
+        return templated
+    
     if not AI_AVAILABLE:
         print("[GENERIC_ENGINE] ⚠️ IA no disponible para descomposición")
         return None
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres Tutorín, profesor de primaria experto en descomponer problemas. Respondes SOLO con JSON válido."
-                },
-                {
-                    "role": "user",
-                    "content": DECOMPOSITION_PROMPT.format(problem=problem)
-                }
-            ],
+        response = chat_completion(
+            client, "generic_engine.decompose",
+            model=choose_model("decompose"),
+            messages=_decomposition_messages(problem),
             response_format={"type": "json_object"},
             temperature=0.3,
             max_tokens=1000
@@ -167,6 +177,8 @@ def _decompose_problem(problem: str) -> Optional[Dict[str, Any]]:
         
         print(f"[GENERIC_ENGINE] ✅ Problema descompuesto en {len(result.get('pasos', []))} pasos")
         print(f"[GENERIC_ENGINE] 📊 Tipo: {result.get('tipo_problema', 'desconocido')}")
+        if problem_templates.remember(problem, result):
+            print("[GENERIC_ENGINE] 🧩 Descomposición guardada como plantilla")
         return result
         
     except Exception as e:
@@ -180,54 +192,65 @@ def _decompose_problem(problem: str) -> Optional[Dict[str, Any]]:
 # 2. GENERACIÓN DE PISTAS PROGRESIVAS
 # ══════════════════════════════════════════════════════════════
 
-HINT_PROMPT = """Eres Tutorín, un profesor de primaria paciente y pedagógico.
+# Instrucciones fijas en el mensaje de sistema; el problema, el paso y la
+# respuesta del niño en el del usuario (~320 tokens fijos, sin caché de prompts)
+HINT_PROMPT = """Eres Tutorín, un profesor de primaria paciente y pedagógico. Das pistas concisas y específicas en texto plano.
 
-CONTEXTO:
-Problema original: {problem}
-Paso actual: {step_description}
-Pregunta que hice: {question}
-Respuesta del niño: {user_answer}
-Respuesta correcta: {expected_answer}
-Número de intentos fallidos: {error_count}
-Pista contextual específica: {contextual_hint}
-Explicación adicional: {extra_help}
-
-IMPORTANTE: Usa la pista contextual específica ({contextual_hint}) como base para tu respuesta.
-Esta pista está diseñada específicamente para este problema y este paso.
-
-Genera UNA PISTA pedagógica según el nivel de error:
-
-NIVEL 0 (primer intento - pidió ayuda): 
-- USA la pista contextual específica
-- Sé motivador y directo
-- Menciona los números concretos del problema
-- Ejemplo: "{contextual_hint}"
+Recibirás el problema, el paso actual, la respuesta del niño, los intentos fallidos y una pista contextual. Usa la pista contextual como base: está pensada para este problema y este paso.
 
-NIVEL 1 (1 error):
-- Amplía la pista contextual con más detalles
-- Menciona la operación necesaria
-- Da una estrategia concreta
-
-NIVEL 2 (2 errores):
-- Proceso paso a paso muy detallado
-- Usa la explicación adicional si está disponible
-- Puedes mencionar herramientas (dedos, papel, etc.)
-
-NIVEL 3+ (3+ errores):
-- Explicación completa con la solución
-- Muestra el cálculo exacto
-- Verifica que entiendan el proceso
+Genera UNA PISTA según el número de intentos fallidos:
+- 0 (pidió ayuda): la pista contextual, motivadora y directa, con los números concretos del problema
+- 1: amplía la pista contextual con más detalles, menciona la operación necesaria y da una estrategia concreta
+- 2: proceso paso a paso muy detallado; usa la explicación adicional si la hay; puedes mencionar herramientas (dedos, papel, etc.)
+- 3 o más: explicación completa con la solución y el cálculo exacto; verifica que entiendan el proceso
 
 FORMATO DE RESPUESTA:
-- Máximo 3 líneas
-- Lenguaje simple de primaria
+- Máximo 3 líneas, lenguaje simple de primaria, sin jerga matemática compleja
 - Incluye emojis apropiados (💭💡📝👨‍🏫🎯)
-- NO uses jerga matemática compleja
 - SIEMPRE menciona números específicos del problema
-
-Responde SOLO con la pista en texto plano, sin JSON ni HTML.
+- Responde SOLO con la pista en texto plano, sin JSON ni HTML
 """
 
+HINT_INPUT = """Problema original: {problem}
+Paso actual: {step_description}
+Pregunta que hice: {question}
+Respuesta del niño: {user_answer}
+Respuesta correcta: {expected_answer}
+Intentos fallidos: {error_count}
+Pista contextual: {contextual_hint}
+Explicación adicional: {extra_help}"""
+
+def _request_hint(problem: str, step_info: Dict, user_answer: str, error_count: int,
+                  site: str = "generic_engine.hint") -> str:
+    """Pide la pista a la IA (lanza la excepción del SDK si falla)"""
+    extra_help = step_info.get("explicacion_adicional", "")
+    contextual = step_info.get("pista_contextual", "")
+    contextual_hint = contextual if contextual else "Lee el problema con atención y piensa en los datos que te dan."
+    
+    response = chat_completion(
+        client, site,
+        model=choose_model("hint"),
+        messages=[
+            {"role": "system", "content": HINT_PROMPT},
+            {
+                "role": "user",
+                "content": HINT_INPUT.format(
+                    problem=problem,
+                    step_description=step_info.get("descripcion", ""),
+                    question=step_info.get("pregunta", ""),
+                    user_answer=user_answer,
+                    expected_answer=step_info.get("respuesta_esperada", ""),
+                    error_count=error_count,
+                    contextual_hint=contextual_hint,
+                    extra_help=extra_help
+                )
+            }
+        ],
+        temperature=0.4,
+        max_tokens=150
+    )
+    return response.choices[0].message.content.strip()
+
 def _generate_hint(problem: str, step_info: Dict, user_answer: str, error_count: int) -> str:
     """Genera pista pedagógica adaptada al nivel de error"""
     # Fallback primario: usar pista contextual del paso
@@ -239,36 +262,14 @@ def _generate_hint(problem: str, step_info: Dict, user_answer: str, error_count:
             return f"💡 {contextual}"
         return "💡 Intenta de nuevo. Piensa con calma en la operación que necesitas hacer."
     
+    # Pista precalculada en segundo plano para este paso y nivel
+    cached = _cached_hint(step_info, error_count)
+    if cached:
+        print(f"[GENERIC_ENGINE] 💡 Pista precalculada (nivel {_hint_level(error_count)}): {cached[:50]}...")
+        return cached
+    
     try:
-        extra_help = step_info.get("explicacion_adicional", "")
-        contextual_hint = contextual if contextual else "Lee el problema con atención y piensa en los datos que te dan."
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Eres Tutorín, profesor de primaria. Das pistas pedagógicas concisas y específicas en texto plano."
-                },
-                {
-                    "role": "user",
-                    "content": HINT_PROMPT.format(
-                        problem=problem,
-                        step_description=step_info.get("descripcion", ""),
-                        question=step_info.get("pregunta", ""),
-                        user_answer=user_answer,
-                        expected_answer=step_info.get("respuesta_esperada", ""),
-                        error_count=error_count,
-                        contextual_hint=contextual_hint,
-                        extra_help=extra_help
-                    )
-                }
-            ],
-            temperature=0.4,
-            max_tokens=150
-        )
-        
-        hint = response.choices[0].message.content.strip()
+        hint = _request_hint(problem, step_info, user_answer, error_count)
         print(f"[GENERIC_ENGINE] 💡 Pista IA generada (nivel {error_count}): {hint[:50]}...")
         return hint
         
@@ -281,66 +282,87 @@ def _generate_hint(problem: str, step_info: Dict, user_answer: str, error_count:
         return "💡 Revisa tu cálculo con cuidado. ¿Qué operación necesitas hacer?"
 
 
+# ══════════════════════════════════════════════════════════════
+# 2b. PISTAS PRECALCULADAS (PREFETCH)
+# ══════════════════════════════════════════════════════════════
+# Tras la descomposición ya se conocen la pregunta, la respuesta esperada y
+# la pista contextual de cada paso, así que las pistas de error se generan
+# en paralelo mientras el niño lee el enunciado. Se guardan en el propio
+# paso (campo "pistas_nivel") dentro de _problem_cache y los turnos con
+# error las sirven sin esperar a la IA. Si aún no están listas, se genera
+# la pista en directo como antes. Solo se encolan las pistas que faltan: si
+# otro alumno ya empezó el mismo problema, se reutiliza su descomposición y
+# sus pistas (ya listas o en curso).
+
+HINT_PREFETCH_ENABLED = os.getenv("GENERIC_HINT_PREFETCH", "1") == "1"
+HINT_PREFETCH_WORKERS = int(os.getenv("GENERIC_HINT_PREFETCH_WORKERS", "4"))
+PREFETCH_LEVELS = (1, 2, 3)
+
+# La respuesta del niño aún no se conoce: el prompt recibe este marcador
+_PREFETCH_ANSWER = "(respuesta incorrecta)"
+
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+
+# Pistas encoladas y aún sin terminar: (id del paso, nivel)
+_prefetch_pending = set()
+_prefetch_lock = threading.Lock()
+
+def _hint_level(error_count: int) -> int:
+    """Nivel de pista precalculada para el número de errores (1-3)"""
+    return min(max(error_count, PREFETCH_LEVELS[0]), PREFETCH_LEVELS[-1])
+
+def _cached_hint(step_info: Dict, error_count: int) -> Optional[str]:
+    if not HINT_PREFETCH_ENABLED:
+        return None
+    hint = (step_info.get("pistas_nivel") or {}).get(_hint_level(error_count))
+    metrics.CACHE_REQUESTS.inc("generic_hints", "hit" if hint else "miss")
+    return hint
+
+def _prefetch_one(problem: str, step_info: Dict, level: int) -> None:
+    try:
+        hint = _request_hint(problem, step_info, _PREFETCH_ANSWER, level, site="generic_engine.prefetch")
+    except Exception as e:
+        print(f"[GENERIC_ENGINE] ⚠️ Error precalculando pista (nivel {level}): {e}")
+        return
+    finally:
+        with _prefetch_lock:
+            _prefetch_pending.discard((id(step_info), level))
+    if hint:
+        step_info.setdefault("pistas_nivel", {})[level] = hint
+
+def _prefetch_hints(problem: str, decomposition: Dict[str, Any]) -> List[Future]:
+    """Encola la generación de las pistas de nivel 1-3 de cada paso"""
+    global _prefetch_executor
+    if not (HINT_PREFETCH_ENABLED and AI_AVAILABLE):
+        return []
+    if _prefetch_executor is None:
+        _prefetch_executor = ThreadPoolExecutor(
+            max_workers=max(1, HINT_PREFETCH_WORKERS), thread_name_prefix="hint-prefetch"
+        )
+    futures = []
+    with _prefetch_lock:
+        for paso in decomposition.get("pasos", []):
+            for level in PREFETCH_LEVELS:
+                if level in (paso.get("pistas_nivel") or {}) or (id(paso), level) in _prefetch_pending:
+                    continue
+                _prefetch_pending.add((id(paso), level))
+                futures.append(_prefetch_executor.submit(_prefetch_one, problem, paso, level))
+    if futures:
+        print(f"[GENERIC_ENGINE] 🧵 Precalculando {len(futures)} pistas en segundo plano")
+    return futures
+
+
 # ══════════════════════════════════════════════════════════════
 # 3. VALIDACIÓN DE RESPUESTAS (MEJORADA v2)
 # ══════════════════════════════════════════════════════════════
 
-def _normalize_text(text: str) -> str:
-    """Normaliza texto para comparación flexible"""
-    # Convertir a minúsculas
-    text = text.lower().strip()
-    
-    # Remover acentos comunes
-    replacements = {
-        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-        'ü': 'u', 'ñ': 'n'
-    }
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
-    # Remover signos de puntuación
-    text = re.sub(r'[¿?¡!.,;:]', '', text)
-    
-    return text
-
-def _extract_keywords(text: str) -> List[str]:
-    """Extrae palabras clave significativas (>3 caracteres)"""
-    normalized = _normalize_text(text)
-    words = normalized.split()
-    # Filtrar palabras cortas y stopwords comunes
-    stopwords = ['de', 'el', 'la', 'los', 'las', 'un', 'una', 'que', 'del', 'al']
-    keywords = [w for w in words if len(w) > 2 and w not in stopwords]
-    return keywords
-
-def _are_similar_words(word1: str, word2: str) -> bool:
-    """Verifica si dos palabras son similares (misma raíz o una contiene a la otra)"""
-    # Normalizar ambas palabras
-    w1 = _normalize_text(word1)
-    w2 = _normalize_text(word2)
-    
-    # Comparación exacta
-    if w1 == w2:
-        return True
-    
-    # Si ambas tienen al menos 4 caracteres, comparar raíz
-    if len(w1) >= 4 and len(w2) >= 4:
-        # Extraer raíz (primeras 4 letras)
-        root1 = w1[:4]
-        root2 = w2[:4]
-        
-        if root1 == root2:
-            return True
-        
-        # Verificar si una palabra contiene a la otra
-        if w1 in w2 or w2 in w1:
-            return True
-    
-    # Para palabras más cortas, verificar si una está contenida en la otra
-    if len(w1) >= 3 and len(w2) >= 3:
-        if w1 in w2 or w2 in w1:
-            return True
-    
-    return False
+def _clean_answer(text: Any) -> str:
+    return str(text).strip().replace(",", ".").lower()
+
+def _index_answers(decomposition: Dict[str, Any]) -> None:
+    """Precalcula el índice de palabras clave de la respuesta esperada de cada paso"""
+    for paso in decomposition.get("pasos", []):
+        answers.keyword_index(str(paso.get("respuesta_esperada", "")))
 
 def _validate_answer(user_answer: str, expected: str, step_type: str = "calculo") -> bool:
     """
@@ -353,8 +375,8 @@ def _validate_answer(user_answer: str, expected: str, step_type: str = "calculo"
     """
     try:
         # Limpiar respuestas
-        user_clean = user_answer.strip().replace(",", ".").lower()
-        expected_clean = str(expected).strip().replace(",", ".").lower()
+        user_clean = _clean_answer(user_answer)
+        expected_clean = _clean_answer(expected)
         
         print(f"[GENERIC_ENGINE] 🔍 Validando: '{user_clean}' vs '{expected_clean}' (tipo: {step_type})")
         
@@ -378,57 +400,9 @@ def _validate_answer(user_answer: str, expected: str, step_type: str = "calculo"
                 pass
         
         # Para pasos de COMPRENSIÓN: validación flexible por palabras clave
-        print("[GENERIC_ENGINE] 🔍 Validación de comprensión por palabras clave...")
-        
-        # Normalizar textos
-        user_normalized = _normalize_text(user_clean)
-        expected_normalized = _normalize_text(expected_clean)
-        
-        # Comparación normalizada
-        if user_normalized == expected_normalized:
-            print("[GENERIC_ENGINE] ✅ Coincidencia normalizada")
-            return True
-        
-        # Extraer palabras clave de ambas respuestas
-        expected_keywords = _extract_keywords(expected_clean)
-        user_keywords = _extract_keywords(user_clean)
-        
-        if not expected_keywords:
-            print("[GENERIC_ENGINE] ⚠️ No hay palabras clave en respuesta esperada")
-            # Si la respuesta esperada no tiene palabras clave, aceptar cualquier respuesta no vacía
-            return len(user_clean.strip()) > 0
-        
-        print(f"[GENERIC_ENGINE] 🔍 Palabras esperadas: {expected_keywords}")
-        print(f"[GENERIC_ENGINE] 🔍 Palabras del usuario: {user_keywords}")
-        
-        # Contar coincidencias usando similitud de palabras
-        matches = 0
-        matched_words = []
-        for exp_word in expected_keywords:
-            for user_word in user_keywords:
-                if _are_similar_words(exp_word, user_word):
-                    matches += 1
-                    matched_words.append(f"{exp_word}≈{user_word}")
-                    print(f"[GENERIC_ENGINE] 🔍 Palabra similar: '{exp_word}' ≈ '{user_word}'")
-                    break  # Solo contar una vez por palabra esperada
-        
-        # Calcular ratio de coincidencia
-        match_ratio = matches / len(expected_keywords)
-        print(f"[GENERIC_ENGINE] 🔍 Coincidencia: {matches}/{len(expected_keywords)} = {match_ratio*100:.0f}%")
-        print(f"[GENERIC_ENGINE] 🔍 Palabras coincidentes: {matched_words}")
-        
-        # Aceptar si al menos 50% de palabras clave coinciden (más flexible)
-        if match_ratio >= 0.5:
-            print(f"[GENERIC_ENGINE] ✅ Validación por similitud: {match_ratio*100:.0f}% ({matches} de {len(expected_keywords)} palabras)")
-            return True
-        
-        # Si solo hay 1-2 palabras esperadas, ser aún más flexible
-        if len(expected_keywords) <= 2 and matches >= 1:
-            print(f"[GENERIC_ENGINE] ✅ Validación flexible (pocas palabras): {matches} coincidencia(s)")
-            return True
-        
-        print(f"[GENERIC_ENGINE] ❌ No hay suficiente coincidencia ({match_ratio*100:.0f}%)")
-        return False
+        is_correct = answers.keyword_match(user_clean, str(expected))
+        print(f"[GENERIC_ENGINE] {'✅' if is_correct else '❌'} Validación por palabras clave")
+        return is_correct
             
     except Exception as e:
         print(f"[GENERIC_ENGINE] ⚠️ Error validando: {e}")
@@ -458,7 +432,13 @@ def handle_step(question: str, step_now: int, last_answer: str, error_count: int
     if step_now == 0:
         print(f"[GENERIC_ENGINE] 🔍 Analizando problema: {question[:80]}...")
         
-        decomposition = _decompose_problem(question)
+        # Mismo problema ya empezado (p. ej. otro alumno de la clase): se
+        # reutiliza la descomposición con sus pistas precalculadas
+        cache_key = hash(question)
+        decomposition = _problem_cache.get(cache_key)
+        metrics.CACHE_REQUESTS.inc("generic_decomposition", "hit" if decomposition else "miss")
+        if not decomposition:
+            decomposition = _decompose_problem(question)
         
         if not decomposition:
             return {
@@ -477,8 +457,10 @@ def handle_step(question: str, step_now: int, last_answer: str, error_count: int
             }
         
         # Guardar en cache (usando hash del problema como key)
-        cache_key = hash(question)
-        _problem_cache[cache_key] = decomposition
+        if cache_key not in _problem_cache:
+            _problem_cache[cache_key] = decomposition
+            _index_answers(decomposition)
+        _prefetch_hints(question, decomposition)
         
         tipo = decomposition.get("tipo_problema", "medio")
         num_pasos = len(decomposition.get("pasos", []))
@@ -525,6 +507,7 @@ def handle_step(question: str, step_now: int, last_answer: str, error_count: int
     # Pasos 1+: Ejecución paso a paso
     cache_key = hash(question)
     decomposition = _problem_cache.get(cache_key)
+    metrics.CACHE_REQUESTS.inc("generic_decomposition", "hit" if decomposition else "miss")
     
     if not decomposition:
         # Reanalizar si perdimos el cache
@@ -532,6 +515,8 @@ def handle_step(question: str, step_now: int, last_answer: str, error_count: int
         decomposition = _decompose_problem(question)
         if decomposition:
             _problem_cache[cache_key] = decomposition
+            _index_answers(decomposition)
+            _prefetch_hints(question, decomposition)
     
     if not decomposition:
         return {
@@ -655,7 +640,8 @@ def handle_step(question: str, step_now: int, last_answer: str, error_count: int
         "topic": "problemas",
         "hint_type": f"problem_step_{step_num}",
         "next_step": step_now + 1,
-        "step_type": step_type  # ← Enviar el tipo de paso para validación correcta
+        "step_type": step_type,  # ← Enviar el tipo de paso para validación correcta
+        "answer_type": "words" if step_type == "comprension" else "unit",
     }
 
 
@@ -12,15 +12,16 @@ Motor para cálculo de áreas y perímetros.
 import re
 import math
 from typing import Dict, Any, Optional, Tuple, List
+from logic.core.answers import canon, matches, to_number
+
+# Tipo de respuesta que compara /solve (logic/core/answers.py)
+ANSWER_TYPES = {"geo_formula": "formula", "geo_substitute": "formula"}
+ANSWER_TYPE = "decimal"
 
 # ══════════════════════════════════════════════════════════════
 # FUNCIONES AUXILIARES
 # ══════════════════════════════════════════════════════════════
 
-def _canon(s: str) -> str:
-    """Normaliza texto para comparación."""
-    return str(s or "").strip().lower().replace(" ", "").replace(",", ".").replace("×", "*").replace("x", "*")
-
 def _parse_geometry(question: str) -> Optional[Tuple[str, str, List[float]]]:
     """
     Detecta figura geométrica, tipo de problema y valores.
@@ -184,7 +185,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     if step == 0:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"✨ Vamos a calcular el <b>{tipo_nombre}</b> de un <b>{fig}</b>.<br/><br/>"
                 f"📝 <b>Paso 1:</b> Primero necesitamos la fórmula correcta.<br/><br/>"
@@ -221,11 +222,8 @@ def handle_step(
             }
         
         # Validar respuesta del usuario
-        user_answer = _canon(answer)
-        expected_answer = _canon(formula)
-        
         # Comparación flexible (permitir variaciones en formato)
-        if user_answer == expected_answer or user_answer.replace("(", "").replace(")", "") == expected_answer.replace("(", "").replace(")", ""):
+        if matches(answer, formula, "formula"):
             return {
                 "status": "ask",
                 "message": "✅ ¡Correcto! Ahora vamos a sustituir los valores.",
@@ -266,7 +264,7 @@ def handle_step(
             formula_filled = formula.replace("radio", radio_str)
         
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"📝 <b>Paso 2:</b> Sustituye los valores en la fórmula.<br/><br/>"
                 f"💡 <b>Fórmula:</b> {formula}<br/>"
@@ -291,11 +289,8 @@ def handle_step(
             }
         
         # Validar respuesta del usuario
-        user_answer = _canon(answer)
-        expected_answer = _canon(formula_filled)
-        
         # Comparación flexible
-        if user_answer == expected_answer or user_answer.replace("(", "").replace(")", "") == expected_answer.replace("(", "").replace(")", ""):
+        if matches(answer, formula_filled, "formula"):
             return {
                 "status": "ask",
                 "message": "✅ ¡Perfecto! Ahora vamos a calcular el resultado.",
@@ -331,7 +326,7 @@ def handle_step(
             }
         
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             # Preparar expresión para mostrar
             if fig == "cuadrado":
                 if tipo == "perimetro":
@@ -370,7 +365,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_value = float(_canon(answer))
+            user_value = to_number(answer)
             expected_value = result
             
             # Tolerancia de 0.1 para redondeos
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+local_solver.py
+--------------------------------------------------
+Resolución local (sin IA) de problemas de una o dos operaciones.
+
+Muchos problemas de primaria son una suma, resta, multiplicación o división
+con palabras clave claras ("le dan", "quedan", "cada uno", "entre"). Para
+ellos `decompose()` devuelve la misma estructura que DECOMPOSITION_PROMPT
+de generic_engine (datos, paso 0 de comprensión, pasos de cálculo,
+respuesta_final, unidad) en milisegundos y sin conexión.
+
+Funcionamiento:
+1. Se extraen los números del enunciado (2 o 3 → 1 o 2 operaciones).
+2. Cada número a partir del segundo se combina con el resultado anterior; la
+   operación se elige por las palabras clave de su tramo del enunciado
+   (desde el número anterior hasta el final de su frase).
+3. La pregunta final ("¿cuántos quedan?", "¿cuánto le toca a cada uno?",
+   "en total"...) confirma o contradice la última operación.
+
+Confianza (0-1): baja si las pistas son débiles o contradictorias, si falta
+la pregunta, si la división no es exacta o si el orden de los datos se ha
+tenido que invertir. Con porcentajes, fracciones o cantidades escritas con
+letras ("dos cajas", "la mitad") no se intenta: faltarían datos. Tampoco
+con comparaciones en el enunciado ("5 más que Luis") ni cuando la pregunta
+pide una operación distinta de la elegida ("¿cuántos grupos hay?" tras
+"grupos de 4"): entonces siempre decide la IA.
+
+generic_engine la usa si la confianza llega a LOCAL_SOLVER_MIN_CONFIDENCE
+(o a LOCAL_SOLVER_OFFLINE_MIN_CONFIDENCE cuando no hay IA).
+"""
+
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from logic.core import metrics
+
+MIN_CONFIDENCE = float(os.getenv("LOCAL_SOLVER_MIN_CONFIDENCE", "0.8"))
+OFFLINE_MIN_CONFIDENCE = float(os.getenv("LOCAL_SOLVER_OFFLINE_MIN_CONFIDENCE", "0.65"))
+
+_NUMBER = re.compile(r"(?<![\w.,])\d+(?:[.,]\d+)?(?!\w)")
+_CLAUSE_END = re.compile(r"[.,;:]|\by\b|\bpero\b")
+
+# (patrón sobre texto en minúsculas y sin tildes, peso): 1.0 pista clara, 0.5 pista débil
+_CUES: Dict[str, List[Tuple[str, float]]] = {
+    "suma": [
+        (r"\ble (dan|regalan|traen)\b", 1.0), (r"\b(gana|recibe|encuentra|anade|consigue)\b", 1.0),
+        (r"\b(llegan|suben|se unen|vienen)\b", 1.0), (r"\d mas\b", 1.0), (r"\bmas\b", 0.5),
+        (r"\bcompra\b", 0.5),
+    ],
+    "resta": [
+        (r"\b(pierde|pierden|gasta|gastan|regala|vende|venden|rompe|quita|quitan|presta)\b", 1.0), (r"\bse (come|comen|van|rompen)\b", 1.0),
+        (r"\b(bajan|salen|se han \w+|usa|utiliza)\b", 1.0), (r"\d menos\b", 1.0), (r"\bda\b", 0.5),
+        (r"\bmenos\b", 0.5),
+    ],
+    "multiplicacion": [
+        (r"\bcada (uno|una)\b", 1.0), (r"\b(cajas|bolsas|paquetes|filas|grupos|equipos|packs|platos) (de|con)\b", 1.0),
+        (r"\bveces\b", 1.0), (r"\bpor (cada|persona)\b", 1.0),
+    ],
+    "division": [
+        (r"\bentre\b", 1.0), (r"\breparte\b|\brepartir\b|\breparten\b", 1.0), (r"\ben grupos de\b", 1.0),
+        (r"\ba partes iguales\b", 1.0), (r"\bcaben\b", 0.5),
+    ],
+}
+
+# Pistas de la pregunta sobre la última operación
+_QUESTION_CUES: Dict[str, str] = {
+    "resta": r"\b(quedan|queda|sobran|sobra|faltan|falta|diferencia)\b|\bmas que\b|\bcuant[oa]s? (\w+ )?mas\b",
+    "division": r"\b(toca|tocan|corresponde|corresponden)\b|\ba cada\b|\bcuant[oa]s? (grupos|cajas|bolsas|equipos)\b",
+    "suma": r"\ben total\b|\bjunt[oa]s\b|\bentre (los|las) dos\b|\bahora\b",
+    "multiplicacion": r"\ben total\b|\bpaga\b|\bcuesta(n)?\b",
+}
+
+# Comparaciones en el enunciado ("12, que son 5 más que Luis"): el sentido de
+# la operación depende de a quién se pregunta, así que se dejan a la IA
+_COMPARISON = re.compile(r"\b(mas|menos) que\b|\bveces (mas|menos)\b")
+
+# Sin datos suficientes para una solución local fiable
+_UNSUPPORTED = re.compile(
+    r"%|/|\bpor ciento\b|\bfraccion\b|\bmitad\b|\bdoble\b|\btriple\b|\btercio\b|\bcuarto\b|\bmedia\b|"
+    r"\bdocena\b|\b(dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez|once|doce|quince|veinte|cien|mil)\b"
+)
+
+_STOPWORDS = {"de", "el", "la", "los", "las", "un", "una", "que", "del", "al", "le", "les", "se", "en",
+              "y", "a", "hay", "ahora", "total", "cada"}
+
+_SYMBOLS = {"suma": "+", "resta": "-", "multiplicacion": "×", "division": "÷"}
+_VERBS = {"suma": "suma", "resta": "resta", "multiplicacion": "multiplica", "division": "divide"}
+_HINTS = {
+    "suma": "Junta {a} y {b}: suma {a} + {b}.",
+    "resta": "A {a} quítale {b}: resta {a} - {b}.",
+    "multiplicacion": "Son {a} grupos de {b}: multiplica {a} × {b}.",
+    "division": "Reparte {a} en grupos iguales de {b}: divide {a} ÷ {b}.",
+}
+_EXTRA = {
+    "suma": "Puedes contar hacia delante desde el número mayor.",
+    "resta": "Puedes contar hacia atrás o pensar cuánto falta para llegar.",
+    "multiplicacion": "Multiplicar es sumar {b} muchas veces: {a} veces.",
+    "division": "Piensa qué número multiplicado por {b} da {a}.",
+}
+
+
+class Operation(NamedTuple):
+    name: str
+    a: float
+    b: float
+    result: float
+    clause: str
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def _norm(text: str) -> str:
+    return _strip_accents(text.lower())
+
+
+def _to_number(token: str) -> float:
+    return float(token.replace(",", "."))
+
+
+def _fmt(value: float) -> str:
+    value = round(value, 2)
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def _plain(value: float) -> Any:
+    """Número para `valores`: entero si no tiene decimales."""
+    value = round(value, 2)
+    return int(value) if value == int(value) else value
+
+
+def _split_question(problem: str) -> Tuple[str, str]:
+    """(enunciado, pregunta) separando la última pregunta ("¿...?" o la última frase con "?")."""
+    start = problem.rfind("¿")
+    if start < 0:
+        if not problem.rstrip().endswith("?"):
+            return problem.strip(), ""
+        start = problem.rfind(". ") + 1
+    return problem[:start].strip(), problem[start:].strip()
+
+
+def _score(window: str) -> Dict[str, float]:
+    text = _norm(window)
+    scores = {}
+    for op, cues in _CUES.items():
+        weight = max((w for pattern, w in cues if re.search(pattern, text)), default=0.0)
+        if weight:
+            scores[op] = weight
+    return scores
+
+
+def _apply(op: str, a: float, b: float) -> float:
+    if op == "suma":
+        return a + b
+    if op == "resta":
+        return a - b
+    if op == "multiplicacion":
+        return a * b
+    return a / b
+
+
+_PART_SEPARATOR = re.compile(r"[.;,]|\s+y\s+")
+
+
+def _clause_for(statement: str, start: int, end: int) -> str:
+    """Tramo del enunciado (entre puntos, comas o " y ") que contiene el número en [start, end)."""
+    left = max((m.end() for m in _PART_SEPARATOR.finditer(statement, 0, start)), default=0)
+    right_match = _PART_SEPARATOR.search(statement, end)
+    right = right_match.start() if right_match else len(statement)
+    part = statement[left:right].strip()
+    return part[:1].upper() + part[1:]
+
+
+def _known_data(statement: str) -> List[str]:
+    """Tramos del enunciado con algún número."""
+    data = []
+    for m in _NUMBER.finditer(statement):
+        part = _clause_for(statement, m.start(), m.end())
+        if part not in data:
+            data.append(part)
+    return data
+
+
+def _keywords(question: str) -> str:
+    words = re.findall(r"[a-zñ]+", _norm(question))
+    return " ".join(w for w in words if w not in _STOPWORDS)[:60].strip()
+
+
+def _noun_after(statement: str, end: int) -> str:
+    match = re.match(r"\s*(€|euros?\b|[a-záéíóúñü]+)", statement[end:], re.IGNORECASE)
+    if not match:
+        return ""
+    word = match.group(1).lower()
+    return "€" if word.startswith(("€", "euro")) else word
+
+
+def _unit(statement: str, question: str, operations: List["Operation"]) -> str:
+    """Unidad de la respuesta: la que nombra la pregunta ("¿cuántos lápices...?") o la de los datos."""
+    nouns = [_noun_after(statement, m.end()) for m in _NUMBER.finditer(statement)]
+    asked = re.search(r"cu[aá]nt[oa]s?\s+([a-záéíóúñü]+)", question.lower())
+    if asked and asked.group(1) in nouns:
+        return asked.group(1)
+    if "€" in nouns and re.search(r"\b(dinero|paga|cuesta|gasta)\b", _norm(question)):
+        return "€"
+    if operations[-1].name == "multiplicacion" and len(nouns) > 1:
+        return nouns[1]
+    return nouns[0] if nouns else ""
+
+
+# ═══════════════════════════════════════════════════════════════
+# ANÁLISIS
+# ═══════════════════════════════════════════════════════════════
+
+def analyze(problem: str) -> Tuple[Optional[List[Operation]], float]:
+    """Operaciones detectadas y confianza (None, 0.0 si no se puede resolver localmente)."""
+    statement, question = _split_question(problem or "")
+    if _UNSUPPORTED.search(_norm(problem or "")) or _COMPARISON.search(_norm(statement)):
+        return None, 0.0
+
+    matches = list(_NUMBER.finditer(statement))
+    if len(matches) not in (2, 3) or _NUMBER.search(question):
+        return None, 0.0
+
+    confidence = 1.0
+    operations: List[Operation] = []
+    value = _to_number(matches[0].group(0))
+    for i in range(1, len(matches)):
+        prev_end, current = matches[i - 1].end(), matches[i]
+        tail = statement[current.end():]
+        boundary = _CLAUSE_END.search(tail)
+        window = statement[prev_end:current.end()] + (tail[:boundary.start()] if boundary else tail)
+        if i == 1:
+            window = statement[:matches[0].start()] + window   # "Reparte 12 caramelos entre 4"
+        scores = _score(window)
+
+        is_last = i == len(matches) - 1
+        question_ops = [op for op, pattern in _QUESTION_CUES.items() if re.search(pattern, _norm(question))]
+        if not scores and len(matches) == 2 and len(question_ops) == 1:
+            scores = {question_ops[0]: 0.5}   # "Ana tiene 12 y Luis 5. ¿Cuántos más tiene Ana?"
+        if not scores:
+            return None, 0.0
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        op, weight = ranked[0]
+        if len(ranked) > 1 and ranked[1][1] >= weight:
+            # Empate: decide la pregunta si señala una sola de las candidatas
+            tied = [o for o, w in ranked if w == weight]
+            chosen = [o for o in tied if o in question_ops] if is_last else []
+            if len(chosen) != 1:
+                return None, 0.0
+            op = chosen[0]
+            confidence *= 0.8
+        elif len(ranked) > 1:
+            confidence *= 0.85
+        if weight < 1.0:
+            confidence *= 0.7                 # solo pistas débiles ("más", "cuesta")
+
+        a, b = value, _to_number(current.group(0))
+        if op in ("resta", "division") and a < b:
+            a, b = b, a                       # "le faltan", "en grupos de"
+            confidence *= 0.85
+        if op == "division":
+            if b == 0:
+                return None, 0.0
+            if a % b:
+                confidence *= 0.6             # en primaria suelen ser exactas
+        value = _apply(op, a, b)
+        operations.append(Operation(op, a, b, value, _clause_for(statement, current.start(), current.end())))
+
+    last = operations[-1].name
+    question_ops = [op for op, pattern in _QUESTION_CUES.items() if re.search(pattern, _norm(question))]
+    if question_ops and last not in question_ops:
+        return None, 0.0                      # la pregunta pide otra operación
+    if not question:
+        confidence *= 0.7
+    elif not question_ops:
+        confidence *= 0.9
+    return operations, round(confidence, 3)
+
+
+# ═══════════════════════════════════════════════════════════════
+# DESCOMPOSICIÓN (mismo formato que DECOMPOSITION_PROMPT)
+# ═══════════════════════════════════════════════════════════════
+
+def _build(problem: str, operations: List[Operation], confidence: float) -> Dict[str, Any]:
+    statement, question = _split_question(problem)
+    unidad = _unit(statement, question, operations)
+    desconocido = question.strip("¿? ").lower() or "el resultado"
+
+    conocidos = _known_data(statement)
+    pasos: List[Dict[str, Any]] = [{
+        "numero": 0,
+        "tipo": "comprension",
+        "descripcion": "Entender el problema y los datos",
+        "operacion": "comprension",
+        "pregunta": "¿Qué nos pide calcular el problema?",
+        "respuesta_esperada": _keywords(question) or "resultado",
+        "pista_contextual": f"Fíjate en la pregunta: {question or 'qué hay que calcular'}",
+    }]
+    for n, op in enumerate(operations, start=1):
+        a, b = _fmt(op.a), _fmt(op.b)
+        pasos.append({
+            "numero": n,
+            "tipo": "calculo",
+            "descripcion": f"{_VERBS[op.name].capitalize()} {a} y {b}",
+            "operacion": op.name,
+            "valores": [_plain(op.a), _plain(op.b)],
+            "pregunta": f"{op.clause}. ¿Cuánto es {a} {_SYMBOLS[op.name]} {b}?",
+            "respuesta_esperada": _fmt(op.result),
+            "explicacion_adicional": _EXTRA[op.name].format(a=a, b=b),
+            "pista_contextual": _HINTS[op.name].format(a=a, b=b),
+        })
+
+    return {
+        "tipo_problema": "simple" if len(operations) == 1 else "medio",
+        "datos": {"conocidos": conocidos, "desconocido": desconocido},
+        "pasos": pasos,
+        "respuesta_final": _fmt(operations[-1].result),
+        "unidad": unidad,
+        "origen": "local",
+        "confianza": confidence,
+    }
+
+
+def decompose(problem: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+    """
+    Descomposición local del problema si se reconoce con confianza suficiente,
+    o None (entonces se usa la IA).
+    """
+    try:
+        operations, confidence = analyze(problem)
+    except Exception as e:
+        print(f"[LOCAL_SOLVER] ⚠️ Error analizando el problema: {e}")
+        operations, confidence = None, 0.0
+
+    if not operations or any(op.result < 0 for op in operations):
+        metrics.LOCAL_SOLVER.inc("unsupported")
+        return None
+    if confidence < min_confidence:
+        metrics.LOCAL_SOLVER.inc("low_confidence")
+        print(f"[LOCAL_SOLVER] 🤔 Confianza insuficiente ({confidence:.2f}): se usará la IA")
+        return None
+
+    metrics.LOCAL_SOLVER.inc("solved")
+    ops = ", ".join(f"{_fmt(op.a)} {_SYMBOLS[op.name]} {_fmt(op.b)}" for op in operations)
+    print(f"[LOCAL_SOLVER] ✅ Resuelto en local ({ops}; confianza {confidence:.2f})")
+    return _build(problem, operations, confidence)
@@ -11,6 +11,11 @@ Motor para conversión de unidades de medida.
 
 import re
 from typing import Dict, Any, Optional, Tuple
+from logic.core.answers import canon, to_number
+
+# Tipo de respuesta que compara /solve (logic/core/answers.py)
+ANSWER_TYPES = {"meas_factor": "decimal"}
+ANSWER_TYPE = "unit"
 
 # ══════════════════════════════════════════════════════════════
 # DICCIONARIO DE EQUIVALENCIAS
@@ -37,10 +42,6 @@ _CONVERSIONS = {
 # FUNCIONES AUXILIARES
 # ══════════════════════════════════════════════════════════════
 
-def _canon(s: str) -> str:
-    """Normaliza texto para comparación."""
-    return str(s or "").strip().lower().replace(" ", "").replace(",", ".")
-
 def _parse_conversion(question: str) -> Optional[Tuple[float, str, str]]:
     """
     Detecta expresiones tipo '3 km a m' o '2500 ml a l'.
@@ -157,7 +158,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     if step == 0:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             # Determinar tabla de referencia según tipo
             tabla = ""
             if type_from == "longitud":
@@ -200,7 +201,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_value = float(_canon(answer))
+            user_value = to_number(answer)
             expected_value = factor
             
             # Tolerancia de 0.001 para decimales
@@ -241,7 +242,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     elif step == 1:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             operacion = "multiplicar" if factor >= 1 else "dividir"
             factor_mostrar = factor if factor >= 1 else (1 / factor)
             
@@ -262,7 +263,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_value = float(_canon(answer))
+            user_value = to_number(answer)
             expected_value = result
             
             # Tolerancia de 0.1 para redondeos
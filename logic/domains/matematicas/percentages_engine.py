@@ -10,15 +10,16 @@ Motor para cálculo de porcentajes.
 
 import re
 from typing import Dict, Any, Optional, Tuple
+from logic.core.answers import canon, to_number
+
+# Tipo de respuesta que compara /solve (logic/core/answers.py)
+ANSWER_TYPES = {"perc_frac": "fraction", "perc_multiply": "integer"}
+ANSWER_TYPE = "decimal"
 
 # ══════════════════════════════════════════════════════════════
 # FUNCIONES AUXILIARES
 # ══════════════════════════════════════════════════════════════
 
-def _canon(s: str) -> str:
-    """Normaliza texto para comparación."""
-    return str(s or "").strip().lower().replace(" ", "").replace(",", ".")
-
 def _parse_percentage(question: str) -> Optional[Tuple[int, int]]:
     """
     Detecta expresiones tipo '25% de 80' o '30 por ciento de 50'.
@@ -90,7 +91,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     if step == 0:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"✨ Vamos a calcular el <b>{percent}% de {base}</b>.<br/><br/>"
                 f"📝 <b>Paso 1:</b> Convertir el porcentaje a fracción.<br/><br/>"
@@ -109,10 +110,7 @@ def handle_step(
             }
         
         # Validar respuesta del usuario
-        user_answer = _canon(answer)
-        expected_answer = _canon(f"{percent}/100")
-        
-        if user_answer == expected_answer:
+        if canon(answer) == canon(f"{percent}/100"):
             return {
                 "status": "ask",
                 "message": "✅ ¡Correcto! Ahora vamos a calcular el resultado.",
@@ -136,7 +134,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     elif step == 1:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"📝 <b>Paso 2:</b> Ahora vamos a multiplicar.<br/><br/>"
                 f"💡 <b>¿Por qué multiplicamos?</b><br/>"
@@ -159,7 +157,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_value = int(_canon(answer))
+            user_value = int(canon(answer))
             
             if user_value == multiplication_result:
                 return {
@@ -201,7 +199,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     elif step == 2:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"📝 <b>Paso 3:</b> Ahora divide entre 100.<br/><br/>"
                 f"💡 <b>¿Por qué dividir entre 100?</b><br/>"
@@ -225,7 +223,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_value = float(_canon(answer))
+            user_value = to_number(answer)
             
             # Tolerancia de 0.01 para decimales
             if abs(user_value - final_result) < 0.01:
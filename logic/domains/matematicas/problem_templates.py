@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+problem_templates.py
+--------------------------------------------------
+Reutilización de descomposiciones de generic_engine para problemas con la
+misma estructura y distintos números (y nombres).
+
+"María tiene 5 caramelos y le dan 3 más" y "Pablo tiene 7 caramelos y le
+dan 4 más" son el mismo problema. Tras descomponer el primero con la IA:
+
+1. Se extraen del enunciado los números (→ #) y, opcionalmente, los nombres
+   propios (→ @); el texto resultante es la clave de la plantilla. Solo
+   cuenta como nombre una palabra en mayúscula que aparece también en mitad
+   de una frase, así que los verbos del enunciado ("Gano", "Pierdo") siguen
+   en la clave aunque abran una frase.
+2. La descomposición se parametriza: cada número de `valores` se enlaza
+   con un dato del enunciado ({{n0}}, {{n1}}...) o con el resultado de un
+   paso anterior ({{r1}}...); `respuesta_esperada` y `respuesta_final`
+   pasan a ser resultados. Solo se acepta si al recalcular las operaciones
+   (suma, resta, multiplicación, división) salen las respuestas de la IA.
+3. Para una variante se sustituyen los datos y se recalculan los pasos en
+   local, sin llamar a la IA.
+
+Si hay ambigüedad (dos datos con el mismo valor, una operación desconocida,
+un resultado negativo, una división por cero o un resultado decimal donde
+el original era entero) no se usa la plantilla.
+
+Las plantillas se guardan en la tabla problem_templates.
+Tasa de aciertos sobre el historial: python -m benchmarks.template_hit_rate
+
+Configuración:
+    PROBLEM_TEMPLATES_ENABLED   "1" (por defecto) / "0"
+    PROBLEM_TEMPLATE_NAMES      "1" (por defecto): abstraer también los nombres propios
+"""
+
+import copy
+import hashlib
+import logging
+import math
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import db
+from logic.core import metrics
+
+logger = logging.getLogger("tutorin.problem_templates")
+
+TEMPLATES_ENABLED = os.getenv("PROBLEM_TEMPLATES_ENABLED", "1") == "1"
+TEMPLATE_NAMES = os.getenv("PROBLEM_TEMPLATE_NAMES", "1") == "1"
+
+TOLERANCE = 0.01
+
+_NUMBER = re.compile(r"(?<![\w.,])\d+(?:[.,]\d+)*(?!\w)")
+_THOUSANDS = re.compile(r"^\d{1,3}(?:\.\d{3})+$")
+_NAME = re.compile(r"\b[A-ZÁÉÍÓÚÑ][a-záéíóúüñ]+\b")
+_PLACEHOLDER = re.compile(r"\{\{([npr])(\d+)\}\}")
+_STEP_LABEL = re.compile(r"paso\s*$", re.IGNORECASE)
+
+# Palabras que van en mayúscula al empezar una frase y no son nombres
+_NOT_NAMES = {
+    "a", "al", "ahora", "además", "antes", "cada", "calcula", "con", "cuál", "cuáles", "cuánto",
+    "cuánta", "cuántos", "cuántas", "cómo", "de", "del", "después", "dos", "durante", "el", "ella",
+    "ellos", "en", "entre", "entonces", "es", "esa", "ese", "esta", "este", "estos", "estas", "hay",
+    "hoy", "juntos", "la", "las", "le", "les", "lo", "los", "luego", "mi", "mis", "nos", "para",
+    "pero", "por", "primero", "qué", "quién", "se", "si", "sin", "su", "sus", "también", "tiene",
+    "tienen", "tres", "tu", "un", "una", "unos", "unas", "y", "ya", "ayer", "mañana", "problema",
+}
+
+_OPERATIONS = ("suma", "resta", "multiplicacion", "division")
+
+# Pasos de la plantilla cuyo resultado era entero en el problema original
+_INTEGER_STEPS = "_pasos_enteros"
+
+
+class ParsedProblem(NamedTuple):
+    """Enunciado con los números y nombres extraídos."""
+    key: str
+    numbers: List[Optional[float]]   # None si un número no se pudo leer
+    tokens: List[str]        # números tal como aparecen en el enunciado
+    names: List[str]         # nombres propios distintos, por orden de aparición
+
+
+# ═══════════════════════════════════════════════════════════════
+# ENUNCIADO → CLAVE
+# ═══════════════════════════════════════════════════════════════
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or "").strip()
+    if _THOUSANDS.match(text):
+        text = text.replace(".", "")
+    try:
+        number = float(text.replace(",", "."))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _is_integer(value: float) -> bool:
+    return abs(value - round(value)) < 1e-9
+
+
+def _fmt(value: float) -> str:
+    value = round(value, 2)
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def _starts_sentence(problem: str, start: int) -> bool:
+    before = problem[:start].rstrip(" \t\n¿¡\"«(")
+    return not before or before[-1] in ".!?:;"
+
+
+def _find_names(problem: str) -> List[str]:
+    """
+    Nombres propios: palabras en mayúscula que aparecen al menos una vez en
+    mitad de una frase. Al empezar una frase también van en mayúscula los
+    verbos ("Gano 3", "Pierdo 4"), que deben seguir formando parte de la clave.
+    """
+    candidates: List[str] = []
+    confirmed = set()
+    for match in _NAME.finditer(problem):
+        word = match.group(0)
+        if word.lower() in _NOT_NAMES:
+            continue
+        if word not in candidates:
+            candidates.append(word)
+        if not _starts_sentence(problem, match.start()):
+            confirmed.add(word)
+    return [word for word in candidates if word in confirmed]
+
+
+def parse_problem(problem: str) -> ParsedProblem:
+    """Clave de plantilla del enunciado y los datos que la rellenan."""
+    tokens = _NUMBER.findall(problem)
+    numbers = [_to_number(t) for t in tokens]
+    skeleton = _NUMBER.sub("#", problem)
+    names = _find_names(problem) if TEMPLATE_NAMES else []
+    for i, name in enumerate(names):
+        skeleton = re.sub(rf"\b{re.escape(name)}\b", f"@{i}", skeleton)
+    skeleton = " ".join(skeleton.lower().split())
+    key = hashlib.sha256(skeleton.encode("utf-8")).hexdigest()
+    return ParsedProblem(key, numbers, tokens, names)
+
+
+def _apply(operation: str, values: List[float]) -> Optional[float]:
+    """Resultado de la operación del paso, o None si no se puede recalcular."""
+    if not values:
+        return None
+    if operation == "suma":
+        return sum(values)
+    if operation == "resta":
+        return values[0] - sum(values[1:])
+    if operation == "multiplicacion":
+        return math.prod(values)
+    if operation == "division" and len(values) == 2:
+        return values[0] / values[1] if values[1] else None
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════
+# DESCOMPOSICIÓN → PLANTILLA
+# ═══════════════════════════════════════════════════════════════
+
+def _source(value: float, sources: Dict[str, float]) -> Optional[str]:
+    for ref, source in sources.items():
+        if abs(source - value) < 1e-9:
+            return ref
+    return None
+
+
+def _template_text(text: str, sources: Dict[str, float], names: List[str]) -> str:
+    def number(match: "re.Match") -> str:
+        if _STEP_LABEL.search(text[:match.start()]):
+            return match.group(0)      # "Paso 2" no es un dato
+        value = _to_number(match.group(0))
+        ref = _source(value, sources) if value is not None else None
+        return f"{{{{{ref}}}}}" if ref else match.group(0)
+
+    text = _NUMBER.sub(number, text)
+    for i, name in enumerate(names):
+        text = re.sub(rf"\b{re.escape(name)}\b", f"{{{{p{i}}}}}", text)
+    return text
+
+
+def _template_strings(node: Any, sources: Dict[str, float], names: List[str]) -> Any:
+    if isinstance(node, str):
+        return _template_text(node, sources, names)
+    if isinstance(node, list):
+        return [_template_strings(item, sources, names) for item in node]
+    if isinstance(node, dict):
+        return {k: _template_strings(v, sources, names) for k, v in node.items()}
+    return node
+
+
+def parametrize(parsed: ParsedProblem, decomposition: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convierte la descomposición de la IA en plantilla, o None si no se puede
+    recalcular localmente con seguridad.
+    """
+    sources: Dict[str, float] = {}
+    for i, value in enumerate(parsed.numbers):
+        if value is None or _source(value, sources):
+            return None                 # dato ilegible o dos datos iguales: enlace ambiguo
+        sources[f"n{i}"] = value
+
+    template = copy.deepcopy(decomposition)
+    steps = template.get("pasos") or []
+    integer_steps: List[int] = []
+    for j, paso in enumerate(steps):
+        paso.pop("pistas_nivel", None)
+        operation = paso.get("operacion")
+        if paso.get("tipo") == "comprension" or operation == "comprension":
+            continue
+        if operation not in _OPERATIONS:
+            return None
+        values = [_to_number(v) for v in paso.get("valores") or []]
+        if any(v is None for v in values):
+            return None
+        result = _apply(operation, values)
+        expected = _to_number(paso.get("respuesta_esperada"))
+        if result is None or expected is None or abs(result - expected) > TOLERANCE:
+            return None
+        refs = [_source(v, sources) for v in values]
+        paso["valores"] = [f"{{{{{ref}}}}}" if ref else v for ref, v in zip(refs, values)]
+        if _source(result, sources):
+            return None                 # resultado igual a otro dato: ambiguo
+        sources[f"r{j}"] = result
+        if _is_integer(result):
+            integer_steps.append(j)
+        paso["respuesta_esperada"] = f"{{{{r{j}}}}}"
+
+    final = _to_number(template.get("respuesta_final"))
+    final_ref = _source(final, sources) if final is not None else None
+    if not final_ref:
+        return None
+
+    template = _template_strings(template, sources, parsed.names)
+    template["respuesta_final"] = f"{{{{{final_ref}}}}}"
+    template[_INTEGER_STEPS] = integer_steps
+    return template
+
+
+# ═══════════════════════════════════════════════════════════════
+# PLANTILLA → DESCOMPOSICIÓN
+# ═══════════════════════════════════════════════════════════════
+
+def _render(node: Any, values: Dict[str, float], parsed: ParsedProblem) -> Any:
+    if isinstance(node, str):
+        def fill(match: "re.Match") -> str:
+            kind, index = match.group(1), int(match.group(2))
+            if kind == "n":
+                return parsed.tokens[index]
+            if kind == "p":
+                return parsed.names[index]
+            return _fmt(values[f"r{index}"])
+        return _PLACEHOLDER.sub(fill, node)
+    if isinstance(node, list):
+        return [_render(item, values, parsed) for item in node]
+    if isinstance(node, dict):
+        return {k: _render(v, values, parsed) for k, v in node.items()}
+    return node
+
+
+def _resolve(value: Any, values: Dict[str, float]) -> Optional[float]:
+    if isinstance(value, str):
+        match = _PLACEHOLDER.fullmatch(value)
+        if match:
+            return values.get(f"{match.group(1)}{match.group(2)}")
+    return _to_number(value)
+
+
+def _needs_integer(j: int, operands: List[float], integer_steps: Optional[List[int]]) -> bool:
+    """
+    El resultado del paso j tiene que ser entero si lo era en el problema
+    original; en plantillas antiguas (sin esa marca), si todos los operandos
+    son enteros (se están contando cosas: 13 lápices entre 4 no da 3,25).
+    """
+    if integer_steps is not None:
+        return j in integer_steps
+    return all(_is_integer(v) for v in operands)
+
+
+def instantiate(template: Dict[str, Any], parsed: ParsedProblem) -> Optional[Dict[str, Any]]:
+    """Descomposición para el enunciado `parsed`, recalculada en local (o None)."""
+    if any(v is None for v in parsed.numbers):
+        return None
+    values: Dict[str, float] = {f"n{i}": v for i, v in enumerate(parsed.numbers)}
+    template = dict(template)
+    integer_steps = template.pop(_INTEGER_STEPS, None)
+    steps = copy.deepcopy(template.get("pasos") or [])
+    for j, paso in enumerate(steps):
+        if "valores" not in paso or not str(paso.get("respuesta_esperada", "")).startswith("{{r"):
+            continue
+        operands = [_resolve(v, values) for v in paso["valores"]]
+        if any(v is None for v in operands):
+            return None
+        result = _apply(paso.get("operacion", ""), operands)
+        if result is None or result < 0 or not math.isfinite(result):
+            return None
+        if _needs_integer(j, operands, integer_steps) and not _is_integer(result):
+            return None
+        values[f"r{j}"] = result
+        paso["valores"] = [int(v) if v == int(v) else v for v in operands]
+
+    try:
+        return _render({**template, "pasos": steps}, values, parsed)
+    except (IndexError, KeyError):
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════
+# API PARA generic_engine
+# ═══════════════════════════════════════════════════════════════
+
+def lookup(problem: str) -> Optional[Dict[str, Any]]:
+    """Descomposición obtenida de una plantilla guardada, o None."""
+    if not TEMPLATES_ENABLED:
+        return None
+    try:
+        parsed = parse_problem(problem)
+        template = db.get_problem_template(parsed.key)
+        decomposition = instantiate(template, parsed) if template else None
+    except Exception as e:
+        logger.warning(f"⚠️ Error usando plantilla de problema: {e}")
+        decomposition = None
+    metrics.CACHE_REQUESTS.inc("problem_templates", "hit" if decomposition else "miss")
+    if decomposition:
+        logger.info("♻️ Problema con la misma estructura: descomposición recalculada en local")
+    return decomposition
+
+
+def remember(problem: str, decomposition: Dict[str, Any]) -> bool:
+    """Guarda la descomposición como plantilla si se puede recalcular. True si se guardó."""
+    if not TEMPLATES_ENABLED:
+        return False
+    try:
+        parsed = parse_problem(problem)
+        template = parametrize(parsed, decomposition)
+        if template is None:
+            return False
+        # Comprobación: con los datos originales debe salir la misma respuesta
+        check = instantiate(template, parsed)
+        final = _to_number((check or {}).get("respuesta_final"))
+        original = _to_number(decomposition.get("respuesta_final"))
+        if final is None or original is None or abs(final - original) > TOLERANCE:
+            return False
+        db.save_problem_template(parsed.key, template)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Error guardando plantilla de problema: {e}")
+        return False
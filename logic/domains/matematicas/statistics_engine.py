@@ -11,15 +11,16 @@ Motor para probabilidad y estadística básica.
 
 import re
 from typing import Dict, Any, Optional, Tuple, List
+from logic.core.answers import canon, to_number
+
+# Tipo de respuesta que compara /solve (logic/core/answers.py)
+ANSWER_TYPES = {"stat_intro": "ratio", "stat_decimal": "decimal"}
+ANSWER_TYPE = "percent"
 
 # ══════════════════════════════════════════════════════════════
 # FUNCIONES AUXILIARES
 # ══════════════════════════════════════════════════════════════
 
-def _canon(s: str) -> str:
-    """Normaliza texto para comparación."""
-    return str(s or "").strip().lower().replace(" ", "").replace(",", ".").replace("%", "")
-
 def _parse_statistics(question: str) -> Optional[Tuple[str, List[float]]]:
     """
     Detecta tipo de ejercicio y extrae números.
@@ -125,7 +126,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     if step == 0:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"✨ Vamos a calcular la <b>{tipo_nombre}</b>.<br/><br/>"
                 f"📝 <b>Datos:</b><br/>"
@@ -148,7 +149,7 @@ def handle_step(
             }
         
         # Validar respuesta del usuario
-        user_answer = _canon(answer)
+        user_answer = canon(answer)
         
         # Construir expected con diferentes formatos aceptables
         expected_formats = [
@@ -157,7 +158,7 @@ def handle_step(
         ]
         
         # Validar si coincide con algún formato
-        is_correct = any(user_answer == _canon(fmt) for fmt in expected_formats)
+        is_correct = any(user_answer == canon(fmt) for fmt in expected_formats)
         
         # También validar si es una fracción equivalente simplificada
         if "/" in user_answer:
@@ -198,7 +199,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     elif step == 1:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"📝 <b>Paso 2:</b> Ahora calcula el valor decimal.<br/><br/>"
                 f"💡 <b>Operación:</b> Divide los casos favorables entre el total:<br/>"
@@ -217,7 +218,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_value = float(_canon(answer))
+            user_value = to_number(answer)
             expected_value = prob_decimal
             
             # Tolerancia de 0.01 para redondeos
@@ -258,7 +259,7 @@ def handle_step(
     # ──────────────────────────────────────────────────────────
     elif step == 2:
         # Si no hay respuesta todavía, hacer la pregunta
-        if _canon(answer) == "":
+        if canon(answer) == "":
             msg = (
                 f"📝 <b>Paso 3:</b> Ahora convierte a porcentaje.<br/><br/>"
                 f"💡 <b>Operación:</b> Multiplica por 100:<br/>"
@@ -277,8 +278,7 @@ def handle_step(
         
         # Validar respuesta del usuario
         try:
-            user_answer_clean = _canon(answer)
-            user_value = float(user_answer_clean)
+            user_value = to_number(answer, percent=True)
             expected_value = prob_percent
             
             # Tolerancia de 0.1 para redondeos
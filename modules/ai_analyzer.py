@@ -14,14 +14,17 @@ NUEVA LÓGICA:
 ✅ CORREGIDO: Detecta decimales con multiplicación y división
 """
 
+import inspect
 import json
 import os
 import re
 from typing import Dict, Any
 
 # === IMPORTAR EL NUEVO NÚCLEO ===
+from logic.core.answers import declared_type
 from logic.core.engine_loader import load_engine
 from logic.core.engine_schema import validate_output
+from logic.core.timing import span, timed
 
 # === CARGA DE PALABRAS CLAVE ===
 _BASE = os.path.dirname(os.path.abspath(__file__))
@@ -158,6 +161,7 @@ def _is_pure_math_operation(text: str) -> bool:
 # ================================================================
 # 🧠 FUNCIÓN PRINCIPAL: ANALIZAR EL PROMPT
 # ================================================================
+@timed("nlu")
 def analyze_prompt(prompt: str) -> Dict[str, Any]:
     """
     Detecta la materia, el tipo de operación (intent) y el motor asociado.
@@ -265,7 +269,8 @@ def run_engine_for(engine_name: str, prompt: str, step: int, answer: str, errors
         }
 
     # --- 1️⃣ Cargar el motor dinámicamente ---
-    engine_func = load_engine(engine_name)
+    with span("engine_load"):
+        engine_func = load_engine(engine_name)
     if not engine_func:
         return {
             "status": "error",
@@ -278,7 +283,11 @@ def run_engine_for(engine_name: str, prompt: str, step: int, answer: str, errors
 
     # --- 2️⃣ Ejecutar el motor ---
     try:
-        result = engine_func(prompt, step, answer, errors)
+        with span("engine"):
+            result = engine_func(prompt, step, answer, errors)
+        if isinstance(result, dict):
+            # Tipo de respuesta que declara el motor (si no lo devuelve en la salida)
+            result.setdefault("answer_type", declared_type(inspect.getmodule(engine_func), result.get("hint_type")))
         validate_output(result, engine_name)
         return result
     except Exception as e:
@@ -4,25 +4,52 @@ Modules/audio_utils.py
 Genera o transcribe audio para Tutorín.
 Entrada: voz del alumno (Whisper opcional)
 Salida: voz del asistente (gTTS en español)
+
+Caché de audio (TTS):
+- Cada mensaje se trocea por párrafos y cada trozo se sintetiza una sola vez:
+  el MP3 se guarda en disco con nombre sha256(idioma + texto limpio) y los
+  trozos se concatenan (los MP3 admiten concatenación de tramas, igual que
+  hace gTTS con los textos largos). Así "✅ ¡Correcto! 👍" sale de la caché
+  aunque vaya seguido del siguiente paso.
+- LRU por tamaño: al superar TTS_CACHE_MAX_BYTES se borran los ficheros
+  usados hace más tiempo (la fecha de modificación se renueva en cada acierto).
+- Las frases habituales (COMMON_PHRASES) se pregeneran en el despliegue en
+  TTS_CACHE_DIR/common, que nunca se expulsa: al arrancar la app en segundo
+  plano (TTS_PRERENDER_ON_STARTUP=1, solo las que falten) o al construir la
+  imagen con
+      python -m modules.audio_utils --prerender
+
+Configuración:
+    TTS_CACHE_DIR         carpeta de la caché ("tts_cache")
+    TTS_CACHE_MAX_BYTES   tamaño máximo sin contar las frases fijas (50 MB)
 """
 
-import io
 import os
 import re
 import base64
+import hashlib
+import threading
+from typing import Iterator, List, Optional
+
+import db
+from logic.core import metrics
+from logic.core.timing import span
 
 # --- STT (voz a texto) con OpenAI Whisper opcional ---
 try:
-    from openai import OpenAI
-    _oa_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+    from logic.core.llm_gateway import get_client
+    _oa_client = get_client() if os.getenv("OPENAI_API_KEY") else None
 except Exception:
     _oa_client = None
 
 # --- TTS (texto a voz) con Google Text-to-Speech ---
 try:
     from gtts import gTTS
+    from gtts.lang import tts_langs
+    SPEECH_LANGS = frozenset(tts_langs())
 except Exception:
     gTTS = None
+    SPEECH_LANGS = frozenset(["es", "en", "ca", "gl", "eu", "fr", "pt", "it", "de"])
 
 
 # ============================================================
@@ -84,33 +111,246 @@ def speech_to_text(audio_path: str, language_code: str = "es") -> str:
 
 
 # ============================================================
-# 🔊 Texto → audio (en base64)
+# 💾 Caché de audio en disco
 # ============================================================
-def text_to_speech_b64(text: str, lang: str = "es") -> str:
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Frases que Tutorín repite constantemente (pregeneradas en el despliegue)
+COMMON_PHRASES = [
+    "✅ ¡Correcto! 👍",
+    "🎉 ¡Ejercicio completado!",
+    "❌ No es exactamente. Revisa e intenta de nuevo.",
+    "❌ No es exactamente.",
+    "✅ ¡Correcto! Ahora vamos a calcular el resultado.",
+    "✅ ¡Correcto! Ahora vamos a calcular el valor decimal.",
+    "✅ ¡Correcto! Ahora vamos a sustituir los valores.",
+    "✅ ¡Ejercicio completado!",
+    "🤔 <b>Piensa en los pasos:</b>",
+    "💡 Comprueba que el resto sea menor que el divisor.",
+    "🧮 Escribe la resta en vertical para no confundirte.",
+]
+
+_PARAGRAPHS = re.compile(r"\n\s*\n|(?:<br\s*/?>\s*){2,}", re.IGNORECASE)
+
+_cache_lock = threading.Lock()
+_cache_bytes: Optional[int] = None   # tamaño actual (sin frases fijas); se calcula al primer uso
+
+
+def audio_key(clean_text: str, lang: str = "es") -> str:
+    """Clave de contenido de un audio: sha256 del idioma y el texto ya limpio."""
+    return hashlib.sha256(f"{lang}\n{clean_text}".encode("utf-8")).hexdigest()
+
+
+def _common_path(key: str) -> str:
+    return os.path.join(TTS_CACHE_DIR, "common", f"{key}.mp3")
+
+
+def _lru_path(key: str) -> str:
+    return os.path.join(TTS_CACHE_DIR, key[:2], f"{key}.mp3")
+
+
+def _lru_files() -> List[str]:
+    files = []
+    if not os.path.isdir(TTS_CACHE_DIR):
+        return files
+    for entry in os.scandir(TTS_CACHE_DIR):
+        if entry.is_dir() and entry.name != "common":
+            files.extend(f.path for f in os.scandir(entry.path) if f.name.endswith(".mp3"))
+    return files
+
+
+def _cache_get(key: str) -> Optional[bytes]:
+    for path, touch in ((_common_path(key), False), (_lru_path(key), True)):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if touch:
+            try:
+                os.utime(path)   # renovar para la política LRU
+            except OSError:
+                pass
+        return data
+    return None
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _cache_put(key: str, data: bytes) -> None:
+    global _cache_bytes
+    path = _lru_path(key)
+    try:
+        _write_atomic(path, data)
+    except OSError as e:
+        print("⚠️ No se pudo guardar el audio en caché:", e)
+        return
+    with _cache_lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(os.path.getsize(p) for p in _lru_files())
+        else:
+            _cache_bytes += len(data)
+        if _cache_bytes > TTS_CACHE_MAX_BYTES:
+            _evict()
+
+
+def _evict() -> None:
+    """Borra los audios usados hace más tiempo hasta bajar al 90 % del límite."""
+    global _cache_bytes
+    entries = []
+    for path in _lru_files():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    target = TTS_CACHE_MAX_BYTES * 0.9
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    _cache_bytes = total
+
+
+def _synthesize_stream(clean_text: str, lang: str) -> Iterator[bytes]:
+    """Trozos de MP3 según los va devolviendo gTTS (una petición por fragmento de texto)."""
+    yield from gTTS(text=clean_text, lang=lang).stream()
+
+
+def _synthesize(clean_text: str, lang: str) -> bytes:
+    return b"".join(_synthesize_stream(clean_text, lang))
+
+
+def speech_segments(text: str) -> List[str]:
+    """Párrafos ya limpios en los que se trocea un mensaje para la caché."""
+    # 🧹 Limpieza del texto para que el TTS no lea HTML
+    segments = (clean_html_tags(paragraph) for paragraph in _PARAGRAPHS.split(text or ""))
+    return [segment for segment in segments if segment]
+
+
+def _stream_segment(clean_text: str, lang: str) -> Iterator[bytes]:
+    """MP3 de un trozo de texto ya limpio: caché → gTTS en streaming (y se guarda)."""
+    key = audio_key(clean_text, lang)
+    data = _cache_get(key)
+    if data is not None:
+        metrics.CACHE_REQUESTS.inc("tts", "hit")
+        yield data
+        return
+
+    metrics.CACHE_REQUESTS.inc("tts", "miss")
+    if gTTS is None:
+        print("⚠️ gTTS no está disponible, no se generará audio.")
+        return
+    chunks = []
+    with span("tts"):
+        for chunk in _synthesize_stream(clean_text, lang):
+            chunks.append(chunk)
+            yield chunk
+    _cache_put(key, b"".join(chunks))
+
+
+def stream_speech(text: str, lang: str = "es") -> Iterator[bytes]:
     """
-    Convierte texto en audio mp3 codificado en base64.
+    Audio MP3 del mensaje por trozos: los párrafos en caché salen al momento y
+    el resto según los sintetiza gTTS.
+    """
+    for segment in speech_segments(text):
+        yield from _stream_segment(segment, lang)
+
+
+def cached_speech(text: str, lang: str = "es") -> Optional[bytes]:
+    """MP3 completo si todos sus párrafos están en caché (sin sintetizar nada), o None."""
+    parts = []
+    for segment in speech_segments(text):
+        data = _cache_get(audio_key(segment, lang))
+        if data is None:
+            return None
+        parts.append(data)
+    return b"".join(parts) if parts else None
+
+
+def prerender_common_phrases(lang: str = "es", phrases: Optional[List[str]] = None) -> int:
+    """
+    Genera (si faltan) los audios de las frases habituales en TTS_CACHE_DIR/common.
+    Devuelve cuántos se han sintetizado.
+    """
+    if gTTS is None:
+        print("⚠️ gTTS no está disponible, no se pueden pregenerar audios.")
+        return 0
+    rendered = 0
+    for phrase in phrases or COMMON_PHRASES:
+        clean_text = clean_html_tags(phrase)
+        if not clean_text:
+            continue
+        path = _common_path(audio_key(clean_text, lang))
+        if os.path.exists(path):
+            continue
+        _write_atomic(path, _synthesize(clean_text, lang))
+        rendered += 1
+    print(f"🔊 Frases pregeneradas: {rendered} nuevas en {os.path.join(TTS_CACHE_DIR, 'common')}")
+    return rendered
+
+
+# ============================================================
+# 🔊 Texto → audio
+# ============================================================
+def text_to_speech_bytes(text: str, lang: str = "es") -> bytes:
+    """
+    Convierte texto en audio mp3 (bytes), usando la caché de disco por párrafos.
     Limpia etiquetas HTML y caracteres especiales antes del TTS.
     """
     if not text:
-        return ""
-    if gTTS is None:
-        print("⚠️ gTTS no está disponible, no se generará audio.")
-        return ""
+        return b""
 
     try:
-        # 🧹 Limpieza del texto para que el TTS no lea HTML
-        clean_text = clean_html_tags(text)
+        return b"".join(stream_speech(text, lang))
 
-        # 🎙️ Generación de audio con gTTS
-        tts = gTTS(text=clean_text, lang=lang)
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        buf.seek(0)
+    except Exception as e:
+        print("❌ Error en text_to_speech_bytes:", e)
+        return b""
 
-        # 🔄 Codificación en base64
-        encoded = base64.b64encode(buf.read()).decode("utf-8")
-        return encoded
 
-    except Exception as e:
-        print("❌ Error en text_to_speech_b64:", e)
+def register_speech(text: str, lang: str = "es") -> Optional[str]:
+    """
+    Registra el mensaje para servirlo por GET /speak/{audio_id}.mp3 y devuelve
+    esa URL (None si no hay nada que leer). No sintetiza nada todavía.
+    """
+    if not speech_segments(text):
+        return None
+    audio_id = audio_key(text, lang)
+    db.save_audio_clip(audio_id, text, lang)
+    return f"/speak/{audio_id}.mp3"
+
+
+def text_to_speech_b64(text: str, lang: str = "es") -> str:
+    """
+    Convierte texto en audio mp3 codificado en base64.
+    Limpia etiquetas HTML y caracteres especiales antes del TTS.
+    """
+    audio = text_to_speech_bytes(text, lang)
+    if not audio:
         return ""
+    # 🔄 Codificación en base64
+    return base64.b64encode(audio).decode("utf-8")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--prerender" in sys.argv:
+        prerender_common_phrases()
+    else:
+        print("Uso: python -m modules.audio_utils --prerender")
@@ -7,15 +7,41 @@ Endpoint para analizar imágenes de ejercicios usando GPT-4 Vision
 """
 
 from fastapi import APIRouter, UploadFile, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
-import base64
 import os
-from openai import OpenAI
+from logic.core import image_cache, image_prep, uploads
+from logic.core.llm_gateway import chat_completion, get_client
+from logic.core.model_router import choose_model
 
 router = APIRouter()
 
+# Instrucciones fijas (mensaje de sistema, prefijo común a todas las llamadas);
+# el nivel del alumno va en el mensaje del usuario junto a la imagen
+ANALYZE_IMAGE_PROMPT = """Eres Tutorín, un profesor virtual de Primaria experto en analizar ejercicios escritos a mano o impresos.
+
+Tu tarea es:
+1. Identificar el ejercicio matemático o de lengua en la imagen
+2. Extraer los números, operaciones y texto relevante
+3. Devolver el ejercicio en formato texto claro y SIMPLE
+
+INSTRUCCIONES IMPORTANTES:
+- Si encuentras fracciones, escríbelas como 3/4 (NO como \\frac{3}{4})
+- Si encuentras operaciones, escríbelas simples: 3/4 + 1/2
+- Si hay varios ejercicios, devuelve solo el primero
+- Si no hay ejercicio claro, di "No he podido identificar un ejercicio en la imagen"
+- NO añadas explicaciones ni contexto, solo transcribe el ejercicio
+- NO inventes problemas de palabras si solo ves números y operaciones
+
+EJEMPLOS:
+- Si ves fracciones: "3/4 + 1/2"
+- Si ves sumas: "234 + 567"
+- Si ves división: "864 ÷ 24"
+
+NO resuelvas el ejercicio, solo transcríbelo."""
+
 # Inicializar cliente de OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = get_client()
 
 @router.post("/image")
 async def analyze_image(
@@ -25,17 +51,24 @@ async def analyze_image(
     """
     Analiza una imagen subida por el alumno usando GPT-4 Vision.
     Extrae el ejercicio matemático y devuelve una pregunta estructurada.
+    Las fotos de una ficha ya transcrita reutilizan su resultado (image_cache).
     """
     try:
-        # Leer la imagen
-        image_bytes = await file.read()
-        
         # Validar que sea una imagen
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
         
-        # Convertir a base64
-        image_b64 = base64.b64encode(image_bytes).decode('utf-8')
+        # Leer por bloques (413 si es demasiado grande) y enderezar, reducir y
+        # recodificar la foto fuera del event loop
+        with await uploads.spool_upload(file) as spooled:
+            image = await run_in_threadpool(image_prep.prepare_image, spooled, "analyze_image")
+
+        # ¿Ya se transcribió esta misma ficha (u otra foto de ella casi idéntica)?
+        cache_namespace = f"analyze_image:{cycle}"
+        image_key = await run_in_threadpool(image_cache.fingerprint, image.data)
+        extracted_text = image_cache.lookup(cache_namespace, image_key)
+        if extracted_text is not None:
+            return _exercise_response(extracted_text)
         
         # Determinar el nivel educativo
         cycle_info = {
@@ -46,46 +79,25 @@ async def analyze_image(
         nivel = cycle_info.get(cycle, "Primaria")
         
         # Llamar a GPT-4 Vision con prompt mejorado
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = await run_in_threadpool(
+            chat_completion, client, "analyze_image",
+            model=choose_model("vision"),
             messages=[
                 {
                     "role": "system",
-                    "content": f"""Eres Tutorín, un profesor virtual de Primaria experto en analizar ejercicios escritos a mano o impresos.
-
-Tu tarea es:
-1. Identificar el ejercicio matemático o de lengua en la imagen
-2. Extraer los números, operaciones y texto relevante
-3. Devolver el ejercicio en formato texto claro y SIMPLE
-
-El alumno está en {nivel}.
-
-INSTRUCCIONES IMPORTANTES:
-- Si encuentras fracciones, escríbelas como 3/4 (NO como \\frac{{3}}{{4}})
-- Si encuentras operaciones, escríbelas simples: 3/4 + 1/2
-- Si hay varios ejercicios, devuelve solo el primero
-- Si no hay ejercicio claro, di "No he podido identificar un ejercicio en la imagen"
-- NO añadas explicaciones ni contexto, solo transcribe el ejercicio
-- NO inventes problemas de palabras si solo ves números y operaciones
-
-EJEMPLOS:
-- Si ves fracciones: "3/4 + 1/2"
-- Si ves sumas: "234 + 567"
-- Si ves división: "864 ÷ 24"
-
-NO resuelvas el ejercicio, solo transcríbelo."""
+                    "content": ANALYZE_IMAGE_PROMPT
                 },
                 {
                     "role": "user",
                     "content": [
                         {
                             "type": "text",
-                            "text": "¿Qué ejercicio hay en esta imagen?"
+                            "text": f"El alumno está en {nivel}. ¿Qué ejercicio hay en esta imagen?"
                         },
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_b64}"
+                                "url": image.data_url()
                             }
                         }
                     ]
@@ -97,27 +109,36 @@ NO resuelvas el ejercicio, solo transcríbelo."""
         
         # Extraer respuesta
         extracted_text = response.choices[0].message.content.strip()
+        result = _exercise_response(extracted_text)
+        if result["success"]:
+            image_cache.store(cache_namespace, image_key, extracted_text)
+        return result
         
-        # Si no se detectó ejercicio
-        if "no he podido" in extracted_text.lower() or "no encuentro" in extracted_text.lower():
-            return {
-                "success": False,
-                "message": "📸 He visto la imagen, pero no he podido identificar un ejercicio claro. ¿Puedes escribirlo tú o subir otra foto más nítida?",
-                "question": None,
-                "exercise_id": None
-            }
-        
-        # Si se detectó ejercicio
-        return {
-            "success": True,
-            "message": f"📸 He leído: **{extracted_text}** ¿Lo resolvemos paso a paso?",
-            "question": extracted_text,
-            "exercise_id": None
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error al analizar imagen: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Error al procesar la imagen: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def _exercise_response(extracted_text: str) -> dict:
+    """Respuesta de /analyze/image a partir de la transcripción de GPT-4 Vision."""
+    # Si no se detectó ejercicio
+    if "no he podido" in extracted_text.lower() or "no encuentro" in extracted_text.lower():
+        return {
+            "success": False,
+            "message": "📸 He visto la imagen, pero no he podido identificar un ejercicio claro. ¿Puedes escribirlo tú o subir otra foto más nítida?",
+            "question": None,
+            "exercise_id": None
+        }
+
+    # Si se detectó ejercicio
+    return {
+        "success": True,
+        "message": f"📸 He leído: **{extracted_text}** ¿Lo resolvemos paso a paso?",
+        "question": extracted_text,
+        "exercise_id": None
+    }
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+routes/metrics.py
+---------------------------------
+Endpoints de observabilidad de Tutorín.
+
+- GET /metrics          → métricas en formato de texto Prometheus
+- GET /metrics/latency  → percentiles p50/p95/p99 (ms) por etapa y motor
+- GET /metrics/caches   → aciertos, fallos y tasa de acierto por caché
+- GET /metrics/models   → modelo elegido, p95 y coste estimado por tarea de IA
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from logic.core import metrics, model_router
+from logic.core.timing import latency_summary
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """Contadores e histogramas para que los recoja Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/latency")
+def get_latency():
+    """Percentiles de latencia por etapa y motor (ms)."""
+    return {"unit": "ms", "stages": latency_summary()}
+
+
+@router.get("/caches")
+def get_caches():
+    """Aciertos y fallos de las cachés internas (tutorin_cache_requests_total)."""
+    caches = {}
+    for (cache, result), value in metrics.CACHE_REQUESTS.values().items():
+        caches.setdefault(cache, {"hit": 0, "miss": 0})[result] = int(value)
+    for stats in caches.values():
+        total = stats["hit"] + stats["miss"]
+        stats["hit_rate"] = round(stats["hit"] / total, 4) if total else 0.0
+    return {"caches": caches}
+
+
+@router.get("/models")
+def get_models():
+    """Uso de modelos de OpenAI por tarea (logic/core/model_router.py)."""
+    return {"tiers": model_router.MODEL_TIERS, "p95_targets": model_router.P95_TARGETS,
+            "tasks": model_router.usage_report()}
@@ -6,19 +6,24 @@ Endpoints para configurar ejercicios de comprensión lectora.
 Permite 3 flujos: texto manual, generación automática, o desde foto.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 import uuid
 import json
 import logging
-import base64
+import asyncio
 
 from logic.ai_reading.question_parser import parse_questions, validate_questions
 from logic.ai_reading.answer_generator import generate_answers_for_questions
 from logic.ai_reading.text_generator import generate_text_with_gpt4, get_available_topics, get_available_levels
 from logic.ai_reading.question_generator import generate_questions_with_gpt4, validate_generated_questions
 from logic.ai_reading.photo_parser import parse_reading_from_photo, validate_extracted_text
+from logic.ai_reading import reading_pool, reading_jobs, text_dedup
+from logic.ai_reading.reading_jobs import no_progress
+from logic.core import image_prep, uploads
 import db
 
 logger = logging.getLogger("tutorin.reading_setup")
@@ -78,19 +83,53 @@ def _create_exercise(text: str, questions: List[Dict[str, Any]]) -> Dict[str, An
     }
 
 
+def _submit_job(kind: str, pipeline) -> JSONResponse:
+    """
+    Encola el pipeline como trabajo asíncrono y responde 202 con su job_id.
+    Si la cola está llena responde 503 para que el cliente reintente.
+    """
+    try:
+        job_id = reading_jobs.submit(kind, pipeline)
+    except reading_jobs.QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Hay demasiados ejercicios en preparación. Inténtalo de nuevo en unos segundos.",
+            headers={"Retry-After": "10"}
+        )
+    logger.info(f"🧾 Trabajo {kind} encolado: {job_id}")
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/reading/jobs/{job_id}",
+        "events_url": f"/reading/jobs/{job_id}/events",
+    })
+
+
 # ═══════════════════════════════════════════════════════════════
 # ENDPOINT 1: CONFIGURAR CON TEXTO MANUAL
 # ═══════════════════════════════════════════════════════════════
 
 @router.post("/setup", response_model=ReadingExerciseResponse)
-async def setup_reading_exercise(request: SetupReadingRequest):
+async def setup_reading_exercise(
+    request: SetupReadingRequest,
+    run_async: bool = Query(False, alias="async")
+):
     """
     Configura un ejercicio de lectura con texto proporcionado por el usuario.
 
     Flujos:
     1. Si viene questions_text: parsear y generar respuestas con GPT-4
     2. Si NO viene questions_text: generar preguntas automáticamente con GPT-4
+
+    Con ?async=true responde 202 con un job_id (ver /reading/jobs/{job_id}).
     """
+    if run_async:
+        return _submit_job("setup", lambda progress: _setup_pipeline(request, progress))
+    return await _setup_pipeline(request)
+
+
+async def _setup_pipeline(request: SetupReadingRequest, progress=no_progress) -> Dict[str, Any]:
+    """Pipeline de /setup (en la petición o como trabajo asíncrono)."""
     try:
         # Validar texto
         is_valid, error_msg = _validate_text(request.text)
@@ -102,6 +141,7 @@ async def setup_reading_exercise(request: SetupReadingRequest):
         # CASO 1: Usuario proporciona preguntas
         if request.questions_text and request.questions_text.strip():
             logger.info("📝 Usuario proporcionó preguntas, parseando...")
+            progress("extract")
 
             # Parsear preguntas
             questions = parse_questions(request.questions_text)
@@ -123,14 +163,24 @@ async def setup_reading_exercise(request: SetupReadingRequest):
 
             logger.info(f"✅ {len(questions)} preguntas parseadas correctamente")
 
-            # Generar respuestas con GPT-4
+            # Generar respuestas con GPT-4 (o reutilizar las de un texto ya visto)
             logger.info("🤖 Generando respuestas esperadas con GPT-4...")
-            questions = await generate_answers_for_questions(request.text, questions)
+            progress("generate_answers")
+            parsed = questions
+            questions = await text_dedup.reuse_or_generate(
+                request.text, parsed, request.level,
+                lambda: generate_answers_for_questions(request.text, parsed)
+            )
 
         # CASO 2: Generar preguntas automáticamente
         else:
             logger.info("🤖 Generando preguntas automáticamente con GPT-4...")
-            questions = await generate_questions_with_gpt4(request.text, request.level)
+            progress("generate_questions")
+            questions = await text_dedup.reuse_or_generate(
+                request.text, None, request.level,
+                lambda: generate_questions_with_gpt4(request.text, request.level),
+                validate=validate_generated_questions
+            )
 
             if not validate_generated_questions(questions):
                 raise HTTPException(
@@ -145,6 +195,7 @@ async def setup_reading_exercise(request: SetupReadingRequest):
         exercise_id = str(uuid.uuid4())
 
         # Guardar en DB
+        progress("save")
         db.save_reading_exercise(exercise_id, exercise)
 
         logger.info(f"✅ Ejercicio creado: {exercise_id} con {len(questions)} preguntas")
@@ -153,7 +204,7 @@ async def setup_reading_exercise(request: SetupReadingRequest):
             exercise_id=exercise_id,
             exercise=exercise,
             message=f"Ejercicio creado con {len(questions)} preguntas"
-        )
+        ).dict()
 
     except HTTPException:
         raise
@@ -170,10 +221,21 @@ async def setup_reading_exercise(request: SetupReadingRequest):
 # ═══════════════════════════════════════════════════════════════
 
 @router.post("/generate", response_model=ReadingExerciseResponse)
-async def generate_reading_exercise(request: GenerateReadingRequest):
+async def generate_reading_exercise(
+    request: GenerateReadingRequest,
+    run_async: bool = Query(False, alias="async")
+):
     """
     Genera un ejercicio completo (texto + preguntas) automáticamente con GPT-4.
+    Con ?async=true responde 202 con un job_id (ver /reading/jobs/{job_id}).
     """
+    if run_async:
+        return _submit_job("generate", lambda progress: _generate_pipeline(request, progress))
+    return await _generate_pipeline(request)
+
+
+async def _generate_pipeline(request: GenerateReadingRequest, progress=no_progress) -> Dict[str, Any]:
+    """Pipeline de /generate (en la petición o como trabajo asíncrono)."""
     try:
         # Validar nivel
         if request.level not in ["1", "2", "3", "4", "5", "6"]:
@@ -182,35 +244,43 @@ async def generate_reading_exercise(request: GenerateReadingRequest):
                 detail="El nivel debe ser entre 1 y 6"
             )
 
-        logger.info(f"🤖 Generando ejercicio sobre '{request.topic}' para nivel {request.level}...")
+        # 1. Ejercicio pregenerado en segundo plano (respuesta inmediata)
+        exercise = reading_pool.take_exercise(request.topic, request.level)
+        if exercise is not None:
+            logger.info(f"⚡ Ejercicio servido desde la reserva: '{request.topic}' nivel {request.level}")
+        else:
+            logger.info(f"🤖 Generando ejercicio sobre '{request.topic}' para nivel {request.level}...")
 
-        # 1. Generar texto con GPT-4
-        logger.info("📝 Generando texto...")
-        text = await generate_text_with_gpt4(request.topic, request.level)
+            # 2. Generar texto con GPT-4
+            logger.info("📝 Generando texto...")
+            progress("generate_text")
+            text = await generate_text_with_gpt4(request.topic, request.level)
 
-        if not text or len(text.split()) < 50:
-            raise HTTPException(
-                status_code=500,
-                detail="El texto generado es demasiado corto. Inténtalo de nuevo."
-            )
+            if not text or len(text.split()) < 50:
+                raise HTTPException(
+                    status_code=500,
+                    detail="El texto generado es demasiado corto. Inténtalo de nuevo."
+                )
 
-        # 2. Generar preguntas con GPT-4
-        logger.info("❓ Generando preguntas...")
-        questions = await generate_questions_with_gpt4(text, request.level)
+            # 3. Generar preguntas con GPT-4
+            logger.info("❓ Generando preguntas...")
+            progress("generate_questions")
+            questions = await generate_questions_with_gpt4(text, request.level)
 
-        if not validate_generated_questions(questions):
-            raise HTTPException(
-                status_code=500,
-                detail="Error al generar preguntas. Inténtalo de nuevo."
-            )
+            if not validate_generated_questions(questions):
+                raise HTTPException(
+                    status_code=500,
+                    detail="Error al generar preguntas. Inténtalo de nuevo."
+                )
 
-        # Crear ejercicio
-        exercise = _create_exercise(text, questions)
+            # Crear ejercicio
+            exercise = _create_exercise(text, questions)
 
         # Generar ID único
         exercise_id = str(uuid.uuid4())
 
         # Guardar en DB
+        progress("save")
         db.save_reading_exercise(exercise_id, exercise)
 
         logger.info(f"✅ Ejercicio generado: {exercise_id}")
@@ -218,8 +288,8 @@ async def generate_reading_exercise(request: GenerateReadingRequest):
         return ReadingExerciseResponse(
             exercise_id=exercise_id,
             exercise=exercise,
-            message=f"Ejercicio generado sobre '{request.topic}' con {len(questions)} preguntas"
-        )
+            message=f"Ejercicio generado sobre '{request.topic}' con {len(exercise['questions'])} preguntas"
+        ).dict()
 
     except HTTPException:
         raise
@@ -238,7 +308,8 @@ async def generate_reading_exercise(request: GenerateReadingRequest):
 @router.post("/from-photo", response_model=ReadingExerciseResponse)
 async def reading_from_photo(
     file: UploadFile = File(...),
-    level: Optional[str] = Form("3")
+    level: Optional[str] = Form("3"),
+    run_async: bool = Query(False, alias="async")
 ):
     """
     Crea un ejercicio de lectura desde una foto usando GPT-4 Vision.
@@ -247,22 +318,31 @@ async def reading_from_photo(
     1. Extraer texto y preguntas de la foto con GPT-4 Vision
     2. Si no hay preguntas, generarlas automáticamente
     3. Si las preguntas no tienen respuestas, generarlas
+
+    Con ?async=true responde 202 con un job_id (ver /reading/jobs/{job_id}).
     """
-    try:
-        # Validar que sea una imagen
-        if not file.content_type or not file.content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=400,
-                detail="El archivo debe ser una imagen (JPG, PNG, etc.)"
-            )
+    # Validar que sea una imagen
+    if not file.content_type or not file.content_type.startswith('image/'):
+        raise HTTPException(
+            status_code=400,
+            detail="El archivo debe ser una imagen (JPG, PNG, etc.)"
+        )
+
+    # Leer por bloques, reducir y convertir a base64 (el fichero no sobrevive a la petición)
+    with await uploads.spool_upload(file) as spooled:
+        image = await run_in_threadpool(image_prep.prepare_image, spooled, "reading.from_photo")
+    image_b64 = image.data_url()
 
-        # Leer imagen
-        image_bytes = await file.read()
+    if run_async:
+        return _submit_job("from-photo", lambda progress: _photo_pipeline(image_b64, level, progress))
+    return await _photo_pipeline(image_b64, level)
 
-        # Convertir a base64
-        image_b64 = base64.b64encode(image_bytes).decode('utf-8')
 
+async def _photo_pipeline(image_b64: str, level: Optional[str], progress=no_progress) -> Dict[str, Any]:
+    """Pipeline de /from-photo (en la petición o como trabajo asíncrono)."""
+    try:
         logger.info("📸 Procesando foto con GPT-4 Vision...")
+        progress("extract")
 
         # Extraer texto y preguntas
         result = await parse_reading_from_photo(image_b64)
@@ -284,16 +364,24 @@ async def reading_from_photo(
                        "Por favor, sube una foto más clara con un texto de al menos 50 palabras."
             )
 
-        # Si no hay preguntas, generarlas
-        if not questions or len(questions) == 0:
-            logger.info("🤖 No se encontraron preguntas, generándolas automáticamente...")
-            questions = await generate_questions_with_gpt4(text, level)
-
-        # Si las preguntas no tienen respuestas, generarlas
-        needs_answers = any(not q.get("answer") or not q["answer"].strip() for q in questions)
-        if needs_answers:
-            logger.info("🤖 Generando respuestas para las preguntas...")
-            questions = await generate_answers_for_questions(text, questions)
+        async def _complete_questions():
+            completed = questions
+            # Si no hay preguntas, generarlas
+            if not completed or len(completed) == 0:
+                logger.info("🤖 No se encontraron preguntas, generándolas automáticamente...")
+                progress("generate_questions")
+                completed = await generate_questions_with_gpt4(text, level)
+
+            # Si las preguntas no tienen respuestas, generarlas
+            needs_answers = any(not q.get("answer") or not q["answer"].strip() for q in completed)
+            if needs_answers:
+                logger.info("🤖 Generando respuestas para las preguntas...")
+                progress("generate_answers")
+                completed = await generate_answers_for_questions(text, completed)
+            return completed
+
+        # Reutilizar las preguntas de una foto de la misma página, si ya se procesó
+        questions = await text_dedup.reuse_or_generate(text, questions, level, _complete_questions)
 
         # Crear ejercicio
         exercise = _create_exercise(text, questions)
@@ -302,6 +390,7 @@ async def reading_from_photo(
         exercise_id = str(uuid.uuid4())
 
         # Guardar en DB
+        progress("save")
         db.save_reading_exercise(exercise_id, exercise)
 
         logger.info(f"✅ Ejercicio creado desde foto: {exercise_id}")
@@ -310,7 +399,7 @@ async def reading_from_photo(
             exercise_id=exercise_id,
             exercise=exercise,
             message=result["message"]
-        )
+        ).dict()
 
     except HTTPException:
         raise
@@ -332,10 +421,15 @@ class MultiplePhotosRequest(BaseModel):
 
 
 @router.post("/from-photos", response_model=ReadingExerciseResponse)
-async def process_multiple_reading_photos(req: MultiplePhotosRequest):
+async def process_multiple_reading_photos(
+    req: MultiplePhotosRequest,
+    run_async: bool = Query(False, alias="async")
+):
     """
     Procesa múltiples fotos de un ejercicio de lectura.
     Las fotos pueden contener: texto + preguntas, o solo texto (genera preguntas), o todo separado.
+    Con ?async=true responde 202 con un job_id (ver /reading/jobs/{job_id}).
+    Para fotos grandes es preferible /from-photos/upload (multipart, sin base64).
 
     Args:
         req: Request con array de imágenes en base64
@@ -343,27 +437,78 @@ async def process_multiple_reading_photos(req: MultiplePhotosRequest):
     Returns:
         Ejercicio de lectura completo con ID, texto y preguntas
     """
-    try:
-        # Validar cantidad de imágenes
-        if not req.images or len(req.images) == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="Debes subir al menos una foto"
-            )
+    _check_photo_count(len(req.images or []))
+
+    # Reducir las fotos antes de enviarlas a GPT-4 Vision
+    images = []
+    for image in req.images:
+        try:
+            prepared = await run_in_threadpool(image_prep.prepare_base64, image, "reading.from_photos")
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Alguna de las fotos no es una imagen válida en base64")
+        images.append(prepared.data_url())
+
+    if run_async:
+        return _submit_job("from-photos", lambda progress: _photos_pipeline(images, progress))
+    return await _photos_pipeline(images)
+
+
+@router.post("/from-photos/upload", response_model=ReadingExerciseResponse)
+async def upload_multiple_reading_photos(
+    files: List[UploadFile] = File(...),
+    run_async: bool = Query(False, alias="async")
+):
+    """
+    Igual que /from-photos, pero con las fotos como multipart/form-data
+    (campo "files" repetido): se leen por bloques sin pasar por base64.
+    """
+    _check_photo_count(len(files))
 
-        if len(req.images) > 5:
+    images = []
+    for file in files:
+        if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(
                 status_code=400,
-                detail="Máximo 5 fotos por ejercicio"
+                detail="Todos los archivos deben ser imágenes (JPG, PNG, etc.)"
             )
+        with await uploads.spool_upload(file) as spooled:
+            prepared = await run_in_threadpool(image_prep.prepare_image, spooled, "reading.from_photos")
+        images.append(prepared.data_url())
+
+    if run_async:
+        return _submit_job("from-photos", lambda progress: _photos_pipeline(images, progress))
+    return await _photos_pipeline(images)
+
+
+def _check_photo_count(count: int) -> None:
+    """Valida la cantidad de fotos de un ejercicio (1-5)."""
+    if count == 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Debes subir al menos una foto"
+        )
+
+    if count > uploads.UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {uploads.UPLOAD_MAX_FILES} fotos por ejercicio"
+        )
 
-        logger.info(f"📸 Procesando {len(req.images)} fotos...")
+
+async def _photos_pipeline(images: List[str], progress=no_progress) -> Dict[str, Any]:
+    """
+    Pipeline de /from-photos (en la petición o como trabajo asíncrono).
+    `images` son URLs data: ya preprocesadas.
+    """
+    try:
+        logger.info(f"📸 Procesando {len(images)} fotos...")
 
         # Importar función de procesamiento múltiple
         from logic.ai_reading.photo_parser import parse_multiple_reading_photos
 
         # Procesar todas las fotos
-        result = await parse_multiple_reading_photos(req.images)
+        progress("extract")
+        result = await parse_multiple_reading_photos(images)
 
         if not result["text"]:
             raise HTTPException(
@@ -384,6 +529,7 @@ async def process_multiple_reading_photos(req: MultiplePhotosRequest):
         exercise_id = str(uuid.uuid4())
 
         # Guardar en DB
+        progress("save")
         db.save_reading_exercise(exercise_id, exercise)
 
         word_count = len(result["text"].split())
@@ -394,8 +540,8 @@ async def process_multiple_reading_photos(req: MultiplePhotosRequest):
         return ReadingExerciseResponse(
             exercise_id=exercise_id,
             exercise=exercise,
-            message=f"✅ Ejercicio creado desde {len(req.images)} fotos: {word_count} palabras, {questions_count} preguntas"
-        )
+            message=f"✅ Ejercicio creado desde {len(images)} fotos: {word_count} palabras, {questions_count} preguntas"
+        ).dict()
 
     except ValueError as ve:
         logger.error(f"❌ Error de validación: {ve}")
@@ -412,6 +558,70 @@ async def process_multiple_reading_photos(req: MultiplePhotosRequest):
         )
 
 
+# ═══════════════════════════════════════════════════════════════
+# TRABAJOS ASÍNCRONOS (?async=true)
+# ═══════════════════════════════════════════════════════════════
+
+def _job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos públicos de un trabajo."""
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": job["progress"],
+        "exercise_id": job["exercise_id"],
+        "result": job["result"],
+        "error": job["error"],
+        "error_status": job["error_status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_reading_job(job_id: str):
+    """Estado de un trabajo: queued | running | done | error, con etapa y progreso."""
+    job = reading_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return _job_view(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_reading_job(job_id: str):
+    """
+    Eventos SSE con el estado del trabajo cada vez que cambia
+    (event: queued | running | done | error). Se cierra al terminar.
+    """
+    if not reading_jobs.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    async def events():
+        last = None
+        idle = 0.0
+        while True:
+            job = reading_jobs.get_job(job_id)
+            if job is None:
+                return
+            view = _job_view(job)
+            snapshot = (view["status"], view["stage"], view["progress"])
+            if snapshot != last:
+                last = snapshot
+                idle = 0.0
+                yield f"event: {view['status']}\ndata: {json.dumps(view, ensure_ascii=False)}\n\n"
+                if view["status"] in reading_jobs.TERMINAL_STATUSES:
+                    return
+            elif idle >= 15.0:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.5)
+            idle += 0.5
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # ═══════════════════════════════════════════════════════════════
 # ENDPOINTS INFORMATIVOS
 # ═══════════════════════════════════════════════════════════════
@@ -426,3 +636,9 @@ async def get_topics():
 async def get_levels():
     """Devuelve lista de niveles educativos disponibles"""
     return {"levels": get_available_levels()}
+
+
+@router.get("/pool")
+async def get_pool():
+    """Estado de la reserva de ejercicios pregenerados para /generate"""
+    return reading_pool.pool_status()
@@ -3,33 +3,140 @@
 routes/solve.py
 Endpoint principal de Tutorín - VERSIÓN CORREGIDA
 ✅ FIX: Ahora usa hint_types específicos del motor en TODOS los casos
+
+POST /solve/stream: mismo turno por Server-Sent Events. La parte fija del
+mensaje ("❌ No es exactamente.", "✅ ¡Correcto!") y los tokens de la pista
+de GPT se envían según están disponibles (event: delta) y al final llega el
+cuerpo completo de /solve (event: result). Sin `Accept: text/event-stream`
+responde el JSON de siempre.
 """
-from typing import Optional
-from fastapi import APIRouter
+import asyncio
+import contextvars
+import json
+from typing import Callable, Optional
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uuid
 from modules.ai_analyzer import analyze_prompt, run_engine_for
+from logic.domains.lengua.reading_engine import load_reading_exercise, parse_reading_ref, reading_ref
 from logic.utils import is_unknown_answer
 from logic.ai_hints.ai_router import generate_hint_with_ai
+from logic.core import metrics, timing
+from logic.core.answers import canon, matches
+from logic.core.llm_gateway import stream_tokens
+from modules.audio_utils import register_speech
 from db import get_progress, upsert_progress, save_history
 
 router = APIRouter()
 
 class SolveRequest(BaseModel):
     user_id: Optional[str] = None
-    question: str
+    question: str = ""  # vacía o "reading:<id>" en ejercicios de lectura guardados
     last_answer: Optional[str] = ""
     exercise_id: Optional[str] = None
     context: Optional[str] = ""
     cycle: Optional[str] = "c2"
+    audio: bool = False  # True → la respuesta incluye "audio_url" (GET /speak/{id}.mp3)
+
+# NLU fija para ejercicios de lectura guardados (no hace falta analizar el texto)
+_READING_NLU = {"subject": "lengua", "intent": "lectura", "engine": "reading_engine", "confidence": 1.0}
+
+
+def _reading_reference(req: SolveRequest) -> Optional[str]:
+    """
+    Si el turno pertenece a un ejercicio de lectura guardado, devuelve su
+    referencia corta ("reading:<id>"). Se acepta:
+    - question = "reading:<id>"
+    - question vacía (o el JSON completo, clientes antiguos) con el exercise_id
+      devuelto por /reading/*
+    """
+    question = (req.question or "").strip()
+    if parse_reading_ref(question):
+        return question
+    if req.exercise_id and (not question or question.startswith("{")):
+        if load_reading_exercise(req.exercise_id):
+            return reading_ref(req.exercise_id)
+    return None
+
+
+def _no_emit(text: str) -> None:
+    """Callback vacío: /solve sin streaming."""
 
-def _canon(s: str) -> str:
-    """Normaliza texto para comparación"""
-    return str(s or "").replace(" ", "").replace(",", ".").lower()
 
 @router.post("/")
 def solve(req: SolveRequest):
     """Orquestador principal: gestiona paso actual, errores y motores."""
+    return _run_turn(req)
+
+
+@router.post("/stream")
+async def solve_stream(req: SolveRequest, request: Request):
+    """
+    Turno de /solve por SSE:
+      event: start   → {"exercise_id"} nada más empezar
+      event: delta   → {"text"} fragmentos del mensaje según se generan
+      event: result  → el mismo cuerpo que POST /solve (mensaje definitivo)
+      event: error   → {"detail"} si el turno falla
+    Los clientes sin soporte de streaming reciben el JSON de POST /solve.
+    """
+    if "text/event-stream" not in request.headers.get("accept", ""):
+        return await run_in_threadpool(_run_turn, req)
+
+    # El exercise_id se fija antes para poder enviarlo en el primer evento
+    req = req.copy(update={"exercise_id": req.exercise_id or str(uuid.uuid4())})
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def put(event: Optional[str], data: Optional[dict] = None) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    def emit(text: str) -> None:
+        put("delta", {"text": text})
+
+    def work() -> None:
+        try:
+            with stream_tokens(emit):
+                put("result", _run_turn(req, emit))
+        except Exception as e:
+            print(f"[ERROR] /solve/stream: {e}")
+            put("error", {"detail": "No pude procesar este ejercicio."})
+        finally:
+            put(None)
+
+    # Copia del contexto: conserva el desglose de latencias de la petición
+    loop.run_in_executor(None, contextvars.copy_context().run, work)
+
+    async def stream():
+        yield _sse("start", {"exercise_id": req.exercise_id})
+        while True:
+            event, data = await events.get()
+            if event is None:
+                return
+            yield _sse(event, data)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _run_turn(req: SolveRequest, emit: Callable[[str], None] = _no_emit) -> dict:
+    result = _solve_turn(req, emit)
+    metrics.SOLVE_TURNS.inc((result.get("nlu") or {}).get("engine"), result.get("status"))
+    if req.audio:
+        result["audio_url"] = register_speech(result.get("message", ""))
+    return result
+
+def _solve_turn(req: SolveRequest, emit: Callable[[str], None] = _no_emit) -> dict:
+    """
+    Resuelve un turno de /solve y devuelve el cuerpo de la respuesta.
+    `emit(texto)` recibe la parte fija del mensaje en cuanto se conoce
+    (antes de esperar a GPT) para /solve/stream.
+    """
     
     # ===== LOGS DE DIAGNÓSTICO =====
     print("=" * 60)
@@ -42,10 +149,16 @@ def solve(req: SolveRequest):
     step_now, error_count, prev_ctx = get_progress(exercise_id)
     print(f"[BD_ANTES] step={step_now} | errors={error_count}")
     
-    # Detectar tema y motor
-    nlu = analyze_prompt(req.question or "")
+    # Detectar tema y motor (los ejercicios de lectura guardados no pasan por NLU)
+    question = _reading_reference(req)
+    if question:
+        nlu = dict(_READING_NLU)
+    else:
+        question = req.question or ""
+        nlu = analyze_prompt(question)
     engine = nlu.get("engine") or "generic_engine"
     topic = nlu.get("intent") or "general"
+    timing.set_label("engine", engine)
     
     # ---------------------------------------------------
     # 1️⃣ CASO "NO SÉ" → PISTA
@@ -57,7 +170,7 @@ def solve(req: SolveRequest):
         print(f"[PISTA] Usuario pidió ayuda. Llamando motor con step={step_now}")
         det = run_engine_for(
             engine,
-            prompt=req.question,
+            prompt=question,
             step=step_now,
             answer=req.last_answer or "",
             errors=error_count,
@@ -85,7 +198,7 @@ def solve(req: SolveRequest):
         new_ctx = (prev_ctx + "\n" + msg).strip()
         upsert_progress(exercise_id, step_now, error_count, new_ctx, user_id=req.user_id)
         save_history(
-            req.user_id, exercise_id, req.question, req.last_answer, msg, step_now, error_count
+            req.user_id, exercise_id, question, req.last_answer, msg, step_now, error_count
         )
         print(f"[GUARDANDO] step={step_now} | errors={error_count} (pista)")
         return {
@@ -105,7 +218,7 @@ def solve(req: SolveRequest):
     print(f"[MOTOR] Llamando {engine} con step={step_now}")
     det = run_engine_for(
         engine,
-        prompt=req.question,
+        prompt=question,
         step=step_now,
         answer=req.last_answer or "",
         errors=error_count,
@@ -125,6 +238,7 @@ def solve(req: SolveRequest):
     status = det.get("status", "ask")
     next_step = int(det.get("next_step", step_now))
     hint_type = det.get("hint_type", "general_error")
+    answer_type = det.get("answer_type") or "text"
     
     print(f"[MOTOR] Retornó: status={status} | expected={expected} | next_step={next_step}")
 
@@ -133,11 +247,11 @@ def solve(req: SolveRequest):
     # ---------------------------------------------------
     
     # 3a. Primera vez en este paso (sin respuesta todavía)
-    if _canon(req.last_answer) == "":
+    if canon(req.last_answer) == "":
         new_ctx = (prev_ctx + "\n" + message).strip()
         upsert_progress(exercise_id, step_now, error_count, new_ctx, user_id=req.user_id)
         save_history(
-            req.user_id, exercise_id, req.question, req.last_answer, message, step_now, error_count
+            req.user_id, exercise_id, question, req.last_answer, message, step_now, error_count
         )
         print(f"[GUARDANDO] step={step_now} | errors={error_count} (primera vez sin respuesta)")
         return {
@@ -156,7 +270,7 @@ def solve(req: SolveRequest):
         new_ctx = (prev_ctx + "\n" + message).strip()
         upsert_progress(exercise_id, next_step, 0, new_ctx, user_id=req.user_id)
         save_history(
-            req.user_id, exercise_id, req.question, req.last_answer, message, next_step, 0
+            req.user_id, exercise_id, question, req.last_answer, message, next_step, 0
         )
         print(f"[GUARDANDO] step={next_step} | errors=0 (sin validación)")
         return {
@@ -171,11 +285,12 @@ def solve(req: SolveRequest):
         }
 
     # 3c. Respuesta INCORRECTA → incrementar errores, mantener paso
-    print(f"[COMPARACIÓN] user=[{_canon(req.last_answer)}] vs expected=[{_canon(expected)}]")
+    print(f"[COMPARACIÓN] user=[{canon(req.last_answer)}] vs expected=[{canon(expected)}] ({answer_type})")
     
-    if _canon(req.last_answer) != _canon(expected):
+    if not matches(req.last_answer, expected, answer_type):
         print("[DEBUG] ❌ Comparación FALLÓ")
         error_count = min(9, error_count + 1)
+        emit("❌ No es exactamente. ")
         ai_hint = generate_hint_with_ai(
             topic,
             hint_type,
@@ -188,7 +303,7 @@ def solve(req: SolveRequest):
         new_ctx = (prev_ctx + "\n" + feedback).strip()
         upsert_progress(exercise_id, step_now, error_count, new_ctx, user_id=req.user_id)
         save_history(
-            req.user_id, exercise_id, req.question, req.last_answer, feedback, step_now, error_count
+            req.user_id, exercise_id, question, req.last_answer, feedback, step_now, error_count
         )
         print(f"[GUARDANDO] step={step_now} | errors={error_count} (respuesta incorrecta)")
         return {
@@ -207,12 +322,13 @@ def solve(req: SolveRequest):
     print(f"[DEBUG] Obteniendo siguiente paso: next_step={next_step}")
     
     success_msg = "✅ ¡Correcto! 👍"
+    emit(f"{success_msg}\n\n")
     
     # Llamar al motor para obtener el SIGUIENTE PASO
     print(f"[DEBUG] Llamando motor con step={next_step} para obtener siguiente pregunta")
     next_det = run_engine_for(
         engine,
-        prompt=req.question,
+        prompt=question,
         step=next_step,
         answer="",
         errors=0,
@@ -229,7 +345,7 @@ def solve(req: SolveRequest):
         
         upsert_progress(exercise_id, next_step, 0, new_ctx, user_id=req.user_id)
         save_history(
-            req.user_id, exercise_id, req.question, req.last_answer, combined_message, next_step, 0
+            req.user_id, exercise_id, question, req.last_answer, combined_message, next_step, 0
         )
         
         print(f"[GUARDANDO] step={next_step} | errors=0 (respuesta correcta, MOSTRANDO SIGUIENTE PASO)")
@@ -253,7 +369,7 @@ def solve(req: SolveRequest):
         
         upsert_progress(exercise_id, next_step, 0, new_ctx, user_id=req.user_id)
         save_history(
-            req.user_id, exercise_id, req.question, req.last_answer, final_message, next_step, 0
+            req.user_id, exercise_id, question, req.last_answer, final_message, next_step, 0
         )
         
         print(f"[GUARDANDO] step={next_step} | errors=0 (ejercicio completado)")
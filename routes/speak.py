@@ -1,13 +1,107 @@
-from fastapi import APIRouter
-from fastapi.responses import JSONResponse
-from models import ChatRequest
-from logic.utils import normalize_for_tts
+# -*- coding: utf-8 -*-
+"""
+routes/speak.py
+---------------------------------
+Voz de Tutorín como audio binario (audio/mpeg), sin base64 dentro del JSON.
+
+- POST /speak/              → registra un texto y devuelve su URL de audio
+- GET  /speak/{audio_id}.mp3 → el MP3
+
+Si todos los párrafos del mensaje están en la caché de audio
+(modules/audio_utils.py) se sirve entero, con ETag, Content-Length y
+peticiones Range (206) para que el navegador pueda buscar y reanudar. Si no,
+se envía en streaming según gTTS va sintetizando cada fragmento.
+
+El audio_id es una huella del texto, así que la URL de un mismo mensaje no
+cambia: el audio completo servido desde la caché se puede cachear
+indefinidamente. El streaming se envía con "no-store" (y sin ETag), porque
+si la síntesis falla a medias el cliente se quedaría con un audio cortado.
+"""
+
+import re
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+import db
+from modules import audio_utils
 
-# Si no quieres depender de ElevenLabs durante la depuración, devolvemos un "mock"
 router = APIRouter()
 
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class SpeakRequest(BaseModel):
+    """Texto que se quiere escuchar"""
+    message: str = Field(..., min_length=1, description="Texto (se admite el HTML de los mensajes)")
+    lang: Optional[str] = Field("es", description="Idioma de la voz")
+
+
 @router.post("/")
-def speak(request: ChatRequest):
-    text = normalize_for_tts(request.message)
-    # Mock: devolvemos URL “falsa” o texto
-    return JSONResponse({"ok": True, "tts": f"[AUDIO_MOCK] {text}"})
+def speak(request: SpeakRequest):
+    """Registra el texto y devuelve la URL de su audio (sin sintetizar todavía)."""
+    lang = (request.lang or "es").strip().lower()
+    if lang not in audio_utils.SPEECH_LANGS:
+        raise HTTPException(status_code=400, detail=f"Idioma no soportado: {request.lang}")
+    audio_url = audio_utils.register_speech(request.message, lang)
+    if not audio_url:
+        raise HTTPException(status_code=400, detail="No hay texto que leer")
+    return {"ok": True, "audio_url": audio_url}
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """(inicio, fin) inclusivos de una cabecera Range de un solo tramo; None si no aplica."""
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        length = min(int(end), size)
+        return size - length, size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+@router.get("/{audio_id}.mp3")
+async def get_audio(audio_id: str, request: Request):
+    """MP3 del texto registrado (200, 206 con Range, 304 con If-None-Match)."""
+    clip = db.get_audio_clip(audio_id)
+    if not clip:
+        raise HTTPException(status_code=404, detail="Audio no encontrado")
+
+    etag = f'"{audio_id}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    audio = await run_in_threadpool(audio_utils.cached_speech, clip["text"], clip["lang"])
+    if audio is None and range_header:
+        # Para servir un tramo hace falta el audio completo
+        audio = await run_in_threadpool(audio_utils.text_to_speech_bytes, clip["text"], clip["lang"])
+
+    if audio is None:
+        return StreamingResponse(
+            audio_utils.stream_speech(clip["text"], clip["lang"]), media_type="audio/mpeg",
+            headers={"Cache-Control": "no-store"}
+        )
+    if not audio:
+        raise HTTPException(status_code=503, detail="No se pudo generar el audio")
+
+    headers["Accept-Ranges"] = "bytes"
+    size = len(audio)
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range is None:
+        return Response(content=audio, media_type="audio/mpeg", headers=headers)
+
+    start, end = byte_range
+    if start >= size or start > end:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=audio[start:end + 1], status_code=206, media_type="audio/mpeg", headers=headers)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+conftest.py
+--------------------------------------------------
+Las pruebas nunca usan ./tutorin.db: si no se indica SQLITE_PATH, la base
+de datos va a un directorio temporal (antes de importar db).
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="tutorin_tests_"), "tests.db"))
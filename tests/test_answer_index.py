@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+test_answer_index.py
+--------------------------------------------------
+Índice precalculado de palabras clave de las respuestas esperadas
+(logic/core/answers.py, usado por generic_engine): mismo resultado que la
+comparación palabra a palabra que hacía antes _are_similar_words.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.core import answers
+from logic.domains.matematicas import generic_engine
+
+PAIRS = [
+    ("cuanto paga alumno", "cuánto paga cada alumno"),
+    ("cuanto paga alumno", "lo que pone cada niño"),
+    ("precio total entradas", "el precio de todas"),
+    ("precio total entradas", "precios"),
+    ("caramelos repartidos entre amigos", "repartir caramelos"),
+    ("kilómetros recorridos", "km"),
+    ("dividir", "división"),
+    ("dividir", "multiplicar"),
+    ("sumar", "suma"),
+    ("ana", "banana"),
+    ("sol sol luna", "sol"),
+    ("el de la", "cualquier cosa"),
+    ("velocidad media del tren", "la velocidad"),
+    ("velocidad media del tren", "tren rápido"),
+    ("¿Cuántas manzanas quedan?", "cuantas manzanas quedan"),
+]
+
+
+def _are_similar_words(w1: str, w2: str) -> bool:
+    """Comparación anterior: misma raíz de 4 letras o una contiene a la otra"""
+    if w1 == w2:
+        return True
+    if len(w1) >= 4 and len(w2) >= 4 and w1[:4] == w2[:4]:
+        return True
+    return len(w1) >= 3 and len(w2) >= 3 and (w1 in w2 or w2 in w1)
+
+
+def _reference(user: str, expected: str) -> int:
+    user_keywords = answers.keywords(user)
+    return sum(any(_are_similar_words(e, u) for u in user_keywords) for e in answers.keywords(expected))
+
+
+@pytest.mark.parametrize("expected,user", PAIRS)
+def test_index_matches_word_by_word_comparison(expected, user):
+    index = answers.KeywordIndex(expected)
+    assert index.matches(answers.keywords(user)) == _reference(user, expected)
+
+
+def test_validation_keeps_its_thresholds():
+    validate = generic_engine._validate_answer
+    assert validate("cuánto paga cada alumno", "cuanto paga alumno", "comprension")
+    assert not validate("lo que pone cada niño", "cuanto paga alumno", "comprension")
+    assert validate("precios", "precio total entradas", "comprension") is False
+    assert validate("la velocidad", "velocidad media del tren", "comprension") is False
+    assert validate("tren rápido", "dividir tren", "comprension")
+    assert validate("12,5", "12.5")
+    assert not validate("13", "12.5")
+    assert validate("algo", "el de la", "comprension")
+
+
+def test_decomposition_answers_are_indexed_when_cached():
+    decomposition = {"pasos": [
+        {"tipo": "comprension", "respuesta_esperada": "cuántos cromos reparte Luis"},
+        {"tipo": "calculo", "respuesta_esperada": 24},
+    ]}
+    answers.keyword_index.cache_clear()
+    generic_engine._index_answers(decomposition)
+    assert answers.keyword_index.cache_info().currsize == 2
+
+    assert generic_engine._validate_answer("reparte cromos", "cuántos cromos reparte Luis", "comprension")
+    assert answers.keyword_index.cache_info().hits == 1
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+test_answers.py
+--------------------------------------------------
+Canonización y comparación de respuestas por tipo (logic/core/answers.py)
+y tipo de respuesta que declaran los motores para /solve.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.core import answers
+from modules.ai_analyzer import run_engine_for
+
+
+def test_canon_is_a_single_pass_of_the_old_replacements():
+    assert answers.canon(" 12,5 ") == "12.5"
+    assert answers.canon("Sí") == "si"
+    assert answers.canon(None) == ""
+    assert answers.canon_formula("(Base × Altura) / 2") == "base*altura/2"
+    assert answers.to_number("3 000,5") == 3000.5
+    assert answers.to_number("25 %", percent=True) == 25.0
+    with pytest.raises(ValueError):
+        answers.to_number("doce")
+
+
+@pytest.mark.parametrize("user,expected,kind,ok", [
+    ("2,50", "2.5", "decimal", True),
+    ("3.333", "3.33", "decimal", True),
+    ("0.002", "0.001", "decimal", False),
+    ("24,0", "24", "integer", True),
+    ("24.5", "24", "integer", False),
+    ("15 / 20", "15/20", "fraction", True),
+    ("3/4", "15/20", "fraction", False),
+    ("1/2", "5/10", "ratio", True),
+    ("0,5", "5/10", "ratio", True),
+    ("6 y 8", "6 y 8", "pair", True),
+    ("6y8", "6 y 8", "pair", True),
+    ("6; 8", "6 y 8", "pair", True),
+    ("8 y 6", "6 y 8", "pair", False),
+    ("3000 metros", "3000", "unit", True),
+    ("24", "24 euros", "unit", True),
+    ("3 km", "3 m", "unit", False),
+    ("25 %", "25", "percent", True),
+    ("25 por ciento", "25%", "percent", True),
+    ("base x altura", "base × altura", "formula", True),
+    ("cuánto paga cada alumno", "cuanto paga alumno", "words", True),
+    ("si", "sí", "text", True),
+    ("12.50", "12.5", "text", False),
+])
+def test_matches_by_answer_type(user, expected, kind, ok):
+    assert answers.matches(user, expected, kind) is ok
+
+
+@pytest.mark.parametrize("kind", answers.ANSWER_TYPES)
+def test_typed_comparison_accepts_whatever_canonical_text_accepted(kind):
+    assert answers.matches("Abc 1,5", "abc1.5", kind)
+    assert not answers.matches("", "7", kind)
+
+
+def test_expected_answers_are_parsed_once():
+    answers._expected.cache_clear()
+    for _ in range(3):
+        answers.matches("0,75", "3/4", "ratio")
+    assert answers._expected.cache_info().misses == 1
+
+
+@pytest.mark.parametrize("engine,prompt,step,answer_type", [
+    ("fractions_engine", "1/2 + 1/4", 1, "integer"),
+    ("fractions_engine", "1/2 + 1/4", 2, "pair"),
+    ("fractions_engine", "1/2 + 1/4", 0, "text"),
+    ("percentages_engine", "25% de 80", 0, "fraction"),
+    ("measures_engine", "3 km a m", 1, "unit"),
+])
+def test_engines_declare_their_answer_type(engine, prompt, step, answer_type):
+    result = run_engine_for(engine, prompt, step, "", 0)
+    assert result["answer_type"] == answer_type
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+test_audio_cache.py
+--------------------------------------------------
+Pruebas de la caché de audio en disco de modules/audio_utils.py.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules import audio_utils
+
+
+@pytest.fixture
+def synth(tmp_path, monkeypatch):
+    """Sustituye gTTS por un sintetizador local que registra cada llamada."""
+    calls = []
+
+    def fake_synthesize(clean_text, lang):
+        calls.append(clean_text)
+        yield f"<mp3:{clean_text}>".encode("utf-8")
+
+    monkeypatch.setattr(audio_utils, "TTS_CACHE_DIR", str(tmp_path / "tts"))
+    monkeypatch.setattr(audio_utils, "_cache_bytes", None)
+    monkeypatch.setattr(audio_utils, "gTTS", object())
+    monkeypatch.setattr(audio_utils, "_synthesize_stream", fake_synthesize)
+    return calls
+
+
+def test_repeated_paragraphs_are_synthesized_once(synth):
+    first = audio_utils.text_to_speech_bytes("✅ ¡Correcto! 👍\n\n¿Cuánto es 3 + 4?")
+    second = audio_utils.text_to_speech_bytes("✅ ¡Correcto! 👍\n\n🎉 ¡Ejercicio completado!")
+
+    assert first.startswith("<mp3:✅ ¡Correcto! 👍>".encode("utf-8"))
+    assert second.startswith(first[:len("<mp3:✅ ¡Correcto! 👍>".encode("utf-8"))])
+    assert synth.count("✅ ¡Correcto! 👍") == 1
+    assert len(synth) == 3
+
+
+def test_prerendered_phrases_need_no_synthesis(synth):
+    audio_utils.prerender_common_phrases(phrases=["🎉 ¡Ejercicio completado!"])
+    synth.clear()
+
+    audio = audio_utils.text_to_speech_b64("🎉 ¡Ejercicio completado!")
+
+    assert audio
+    assert synth == []
+
+
+def test_lru_evicts_least_recently_used(synth, monkeypatch):
+    monkeypatch.setattr(audio_utils, "TTS_CACHE_MAX_BYTES", 60)
+    audio_utils.text_to_speech_bytes("primera frase larga")
+    old_key = audio_utils.audio_key("primera frase larga")
+    os.utime(audio_utils._lru_path(old_key), (1, 1))
+
+    audio_utils.text_to_speech_bytes("segunda frase larga")
+    audio_utils.text_to_speech_bytes("tercera frase larga")
+
+    assert not os.path.exists(audio_utils._lru_path(old_key))
+    assert os.path.exists(audio_utils._lru_path(audio_utils.audio_key("tercera frase larga")))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+test_generic_hint_prefetch.py
+--------------------------------------------------
+Pistas precalculadas de generic_engine: tras la descomposición se generan
+las pistas de nivel 1-3 de cada paso y los turnos con error no llaman a la IA.
+"""
+
+import os
+import sys
+from concurrent.futures import wait
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db
+from benchmarks.stub_llm import StubOpenAI
+from logic.domains.matematicas import generic_engine
+
+PROBLEM = "Ana tiene 12 caramelos y reparte 4 a cada amigo. ¿A cuántos amigos reparte?"
+
+
+@pytest.fixture(autouse=True)
+def tmp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "prefetch.db"))
+    db._init()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubOpenAI()
+    monkeypatch.setattr(generic_engine, "client", stub)
+    monkeypatch.setattr(generic_engine, "AI_AVAILABLE", True)
+    monkeypatch.setattr(generic_engine, "HINT_PREFETCH_ENABLED", True)
+    monkeypatch.setattr(generic_engine, "_problem_cache", {})
+    return stub
+
+
+def test_error_turns_are_served_from_prefetched_hints(stub, monkeypatch):
+    futures = []
+    original = generic_engine._prefetch_hints
+    monkeypatch.setattr(generic_engine, "_prefetch_hints",
+                        lambda *args: futures.extend(original(*args)) or futures)
+
+    generic_engine.handle_step(PROBLEM, 0, "", 0)
+    decomposition = generic_engine._problem_cache[hash(PROBLEM)]
+    steps = decomposition["pasos"]
+    assert len(futures) == 3 * len(steps)
+    wait(futures, timeout=10)
+    for paso in steps:
+        assert sorted(paso["pistas_nivel"]) == [1, 2, 3]
+
+    calls = stub.calls
+    for errors in (1, 2, 5):
+        result = generic_engine.handle_step(PROBLEM, 1, "99", errors)
+        assert steps[0]["pistas_nivel"][generic_engine._hint_level(errors)] in result["message"]
+    assert stub.calls == calls
+
+
+def test_missing_prefetch_falls_back_to_live_hint(stub, monkeypatch):
+    monkeypatch.setattr(generic_engine, "HINT_PREFETCH_ENABLED", False)
+    generic_engine.handle_step(PROBLEM, 0, "", 0)
+    assert "pistas_nivel" not in generic_engine._problem_cache[hash(PROBLEM)]["pasos"][0]
+
+    calls = stub.calls
+    generic_engine.handle_step(PROBLEM, 1, "99", 1)
+    assert stub.calls == calls + 1
+
+
+def test_restarting_a_prefetched_problem_reuses_decomposition_and_hints(stub, monkeypatch):
+    futures = []
+    original = generic_engine._prefetch_hints
+    monkeypatch.setattr(generic_engine, "_prefetch_hints",
+                        lambda *args: futures.extend(original(*args)) or futures)
+
+    generic_engine.handle_step(PROBLEM, 0, "", 0)
+    decomposition = generic_engine._problem_cache[hash(PROBLEM)]
+    queued = len(futures)
+    generic_engine.handle_step(PROBLEM, 0, "", 0)
+    assert len(futures) == queued      # las pistas en curso no se vuelven a encolar
+    wait(futures, timeout=10)
+    calls = stub.calls
+
+    generic_engine.handle_step(PROBLEM, 0, "", 0)
+
+    assert generic_engine._problem_cache[hash(PROBLEM)] is decomposition
+    assert len(futures) == queued
+    assert stub.calls == calls
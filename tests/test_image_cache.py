@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+test_image_cache.py
+--------------------------------------------------
+Pruebas de la caché de transcripciones por huella perceptual (logic/core/image_cache.py).
+"""
+
+import io
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.core import image_cache
+from logic.core.image_cache import BKTree, Fingerprint, ImageCache, hamming
+
+
+def _worksheet(layout, exercises, noise=0, quality=90, brighten=0):
+    """
+    JPEG sintético: `layout` fija los "renglones" impresos de la ficha y
+    `exercises` los trazos del ejercicio; `noise` añade grano.
+    """
+    Image = pytest.importorskip("PIL.Image")
+    from PIL import ImageDraw
+
+    rnd = random.Random(layout)
+    img = Image.new("L", (800, 600), 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(40, 440, 40):
+        x = 40
+        while x < 740:
+            w = rnd.randint(20, 120)
+            draw.rectangle([x, y, min(x + w, 760), y + 16], fill=rnd.randint(0, 120))
+            x += w + rnd.randint(10, 40)
+    strokes = random.Random(exercises)
+    for i in range(6):
+        left = 60 + i * 110
+        for _ in range(4):
+            start = (left + strokes.randint(0, 60), 480 + strokes.randint(0, 60))
+            end = (left + strokes.randint(0, 60), 480 + strokes.randint(0, 60))
+            draw.line([start, end], fill=0, width=5)
+    if noise:
+        grain = random.Random(layout + 1000)
+        pixels = img.load()
+        for _ in range(noise):
+            pixels[grain.randrange(800), grain.randrange(600)] = grain.randint(0, 255)
+    if brighten:
+        img = img.point(lambda v: min(255, v + brighten))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_bktree_finds_hashes_within_distance():
+    tree = BKTree()
+    for value in (0b0000, 0b0001, 0b0111, 0b1111_0000):
+        tree.add(value)
+
+    found = tree.search(0b0000, 1)
+
+    assert [h for _, h in found] == [0b0000, 0b0001]
+    assert all(d == hamming(0, h) for d, h in found)
+
+
+def test_entries_expire_after_ttl():
+    cache = ImageCache(ttl_seconds=-1, max_entries=10)
+    cache.put(Fingerprint("abc"), "3/4 + 1/2")
+
+    assert cache.get(Fingerprint("abc")) is None
+
+
+def test_retakes_of_the_same_worksheet_hit():
+    image_cache.clear()
+    original = _worksheet(layout=1, exercises=1)
+
+    image_cache.store("test", image_cache.fingerprint(original), "234 + 567")
+
+    for retake in (_worksheet(1, 1, noise=400, quality=60), _worksheet(1, 1, brighten=15, quality=70)):
+        assert image_cache.lookup("test", image_cache.fingerprint(retake)) == "234 + 567"
+    assert image_cache.lookup("other_namespace", image_cache.fingerprint(original)) is None
+
+
+def test_same_layout_with_other_exercises_misses():
+    image_cache.clear()
+    original = image_cache.fingerprint(_worksheet(layout=1, exercises=1))
+    other_exercises = image_cache.fingerprint(_worksheet(layout=1, exercises=2))
+
+    image_cache.store("test", original, "234 + 567")
+
+    # El dHash los da por casi iguales: la miniatura es la que los separa
+    assert hamming(original.dhash, other_exercises.dhash) <= image_cache.MAX_DISTANCE
+    assert image_cache.lookup("test", other_exercises) is None
+    assert image_cache.lookup("test", image_cache.fingerprint(_worksheet(layout=2, exercises=1))) is None
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+test_image_prep.py
+--------------------------------------------------
+Pruebas del preprocesado de fotos para GPT-4 Vision (logic/core/image_prep.py).
+"""
+
+import base64
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.core import image_prep
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _photo(size, color, fmt="JPEG", orientation=None):
+    img = Image.new("RGB", size, color)
+    for x in range(0, size[0], 7):
+        for y in range(0, size[1], 5):
+            img.putpixel((x, y), (0, 0, 0))
+    buf = io.BytesIO()
+    kwargs = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        kwargs["exif"] = exif
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+def test_large_photo_is_downscaled_and_relabelled():
+    raw = _photo((3000, 2000), (250, 250, 245), fmt="BMP")
+
+    prepared = image_prep.prepare_image(raw, "test")
+
+    assert prepared.mime == "image/jpeg"
+    assert prepared.original_size == len(raw)
+    assert len(prepared.data) < len(raw)
+    with Image.open(io.BytesIO(prepared.data)) as img:
+        assert max(img.size) == image_prep.MAX_DIMENSION
+        assert img.mode == "L"
+
+
+def test_colour_is_kept_and_exif_orientation_applied():
+    raw = _photo((2400, 1200), (220, 40, 40), orientation=6)   # girada 90°
+
+    prepared = image_prep.prepare_image(raw, "test")
+
+    with Image.open(io.BytesIO(prepared.data)) as img:
+        assert img.mode == "RGB"
+        assert img.size[1] > img.size[0]
+
+
+def test_small_image_keeps_original_and_real_mime():
+    raw = _photo((40, 30), (255, 255, 255), fmt="PNG")
+
+    prepared = image_prep.prepare_base64(base64.b64encode(raw).decode(), "test")
+
+    assert prepared.data == raw
+    assert prepared.data_url().startswith("data:image/png;base64,")
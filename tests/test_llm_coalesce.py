@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+test_llm_coalesce.py
+--------------------------------------------------
+Agrupación de llamadas idénticas a OpenAI (logic/core/llm_coalesce.py).
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db
+from benchmarks.stub_llm import STUB_HINT, StubOpenAI
+from logic.core import llm_coalesce, metrics
+from logic.core.llm_gateway import chat_completion
+
+PARAMS = {"model": "stub", "messages": [{"role": "user", "content": "Dame una pista"}], "temperature": 0.4}
+
+
+@pytest.fixture(autouse=True)
+def tmp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "coalesce.db"))
+    db._init()
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    monkeypatch.setattr(llm_coalesce, "SHARED_ENABLED", True)
+
+
+def _coalesced(scope: str) -> float:
+    return metrics.LLM_COALESCED.values().get(("test", scope), 0)
+
+
+def test_request_key_is_canonical():
+    reordered = {"temperature": 0.4, "messages": PARAMS["messages"], "model": "stub"}
+    assert llm_coalesce.request_key(PARAMS) == llm_coalesce.request_key(reordered)
+    assert llm_coalesce.request_key(PARAMS) != llm_coalesce.request_key({**PARAMS, "temperature": 0.5})
+
+
+def test_concurrent_identical_calls_share_one_request():
+    stub = StubOpenAI(latency_ms=200)
+    before = _coalesced("local")
+    results = []
+
+    def call():
+        response = chat_completion(stub, "test", **PARAMS)
+        results.append(response.choices[0].message.content)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert stub.calls == 1
+    assert results == [STUB_HINT] * 8
+    assert _coalesced("local") - before == 7
+
+
+def test_generation_sites_are_never_coalesced():
+    stub = StubOpenAI(latency_ms=100)
+    threads = [
+        threading.Thread(target=chat_completion, args=(stub, "ai_reading.text_generator"), kwargs=PARAMS)
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert stub.calls == 3
+
+
+def test_shared_coordination_is_off_by_default():
+    chat_completion(StubOpenAI(), "test", **PARAMS)
+
+    assert not db.llm_lock_held(llm_coalesce.request_key(PARAMS))
+    assert db.get_llm_result(llm_coalesce.request_key(PARAMS)) is None
+
+
+def test_waits_for_the_result_of_another_worker(shared):
+    stub = StubOpenAI()
+    key = llm_coalesce.request_key(PARAMS)
+    assert db.acquire_llm_lock(key, "otro-worker", 30)
+    assert not db.acquire_llm_lock(key, "tercero", 30)
+
+    def other_worker():
+        time.sleep(0.2)
+        db.save_llm_result(key, {"content": "respuesta del otro worker"}, 10)
+        db.release_llm_lock(key, "otro-worker")
+
+    threading.Thread(target=other_worker).start()
+    before = _coalesced("shared")
+    response = chat_completion(stub, "test", **PARAMS)
+
+    assert response.choices[0].message.content == "respuesta del otro worker"
+    assert stub.calls == 0
+    assert _coalesced("shared") - before == 1
+
+
+def test_calls_itself_when_the_other_worker_gives_up(shared):
+    stub = StubOpenAI()
+    key = llm_coalesce.request_key(PARAMS)
+    db.acquire_llm_lock(key, "otro-worker", 30)
+    threading.Timer(0.1, db.release_llm_lock, (key, "otro-worker")).start()
+
+    response = chat_completion(stub, "test", **PARAMS)
+    assert response.choices[0].message.content == STUB_HINT
+    assert stub.calls == 1
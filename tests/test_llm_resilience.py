@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+test_llm_resilience.py
+--------------------------------------------------
+Timeouts, reintentos, límite de concurrencia, circuit breaker y hedging de
+las llamadas a OpenAI (logic/core/llm_resilience.py).
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stub_llm import STUB_HINT, StubOpenAI
+from logic.core import llm_coalesce, llm_resilience, metrics
+from logic.core.llm_gateway import chat_completion
+from logic.domains.matematicas import generic_engine
+
+PARAMS = {"model": "stub", "messages": [{"role": "user", "content": "Dame una pista"}]}
+
+
+class FlakyOpenAI(StubOpenAI):
+    """Stub que falla las primeras `failures` llamadas y puede tardar en algunas."""
+
+    def __init__(self, failures: int = 0, error: Exception = TimeoutError("timeout"), delays=()):
+        super().__init__()
+        self.failures = failures
+        self.error = error
+        self.delays = list(delays)
+        self.timeouts = []
+        create = self.chat.completions.create
+
+        def flaky_create(**kwargs):
+            self.timeouts.append(kwargs.get("timeout"))
+            n = len(self.timeouts)
+            if n <= len(self.delays):
+                time.sleep(self.delays[n - 1])
+            if n <= self.failures:
+                self.calls += 1
+                raise self.error
+            return create(**kwargs)
+
+        self.chat.completions.create = flaky_create
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(llm_coalesce, "COALESCE_ENABLED", False)
+    monkeypatch.setattr(llm_resilience, "BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(llm_resilience, "BREAKER_MIN_CALLS", 4)
+    llm_resilience.breaker.reset()
+    yield
+    llm_resilience.breaker.reset()
+
+
+def test_timeouts_depend_on_the_call_site(monkeypatch):
+    monkeypatch.setitem(llm_resilience.SITE_TIMEOUTS, "hints_division", 3.0)
+    assert llm_resilience.timeout_for("hints_division") == 3.0
+    assert llm_resilience.timeout_for("hints_fractions") == llm_resilience.SITE_TIMEOUTS["hints_"]
+    assert llm_resilience.timeout_for("ai_reading.photo_parser.multi") == 45.0
+    assert llm_resilience.timeout_for("otro") == llm_resilience.DEFAULT_TIMEOUT
+
+    client = FlakyOpenAI()
+    chat_completion(client, "hints_division", **PARAMS)
+    assert client.timeouts == [3.0]
+
+
+def test_transient_errors_are_retried():
+    client = FlakyOpenAI(failures=2)
+    before = metrics.LLM_RETRIES.values().get(("test",), 0)
+
+    response = chat_completion(client, "test", **PARAMS)
+    assert response.choices[0].message.content == STUB_HINT
+    assert client.calls == 3
+    assert metrics.LLM_RETRIES.values()[("test",)] - before == 2
+
+
+def test_other_errors_are_not_retried():
+    client = FlakyOpenAI(failures=1, error=ValueError("petición incorrecta"))
+    with pytest.raises(ValueError):
+        chat_completion(client, "test", **PARAMS)
+    assert client.calls == 1
+    assert llm_resilience.breaker.state == llm_resilience.CLOSED
+
+
+def test_breaker_opens_and_recovers(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "MAX_RETRIES", 0)
+    client = FlakyOpenAI(failures=4)
+    for _ in range(4):
+        with pytest.raises(TimeoutError):
+            chat_completion(client, "test", **PARAMS)
+    assert llm_resilience.breaker.state == llm_resilience.OPEN
+
+    with pytest.raises(llm_resilience.LLMUnavailable):
+        chat_completion(client, "test", **PARAMS)
+    assert client.calls == 4
+    assert metrics.LLM_BREAKER_STATE.values()[()] == 2
+
+    # Pasado el enfriamiento, una llamada de prueba correcta lo cierra
+    monkeypatch.setattr(llm_resilience, "BREAKER_COOLDOWN", 0.0)
+    assert chat_completion(client, "test", **PARAMS).choices[0].message.content == STUB_HINT
+    assert llm_resilience.breaker.state == llm_resilience.CLOSED
+
+
+def test_slow_calls_open_the_breaker(monkeypatch):
+    monkeypatch.setitem(llm_resilience.SITE_TIMEOUTS, "test", 0.2)
+    client = FlakyOpenAI(delays=[0.17] * 4)
+    for _ in range(4):
+        chat_completion(client, "test", **PARAMS)
+    assert llm_resilience.breaker.state == llm_resilience.OPEN
+
+
+def test_slowness_is_relative_to_the_site_timeout(monkeypatch):
+    monkeypatch.setitem(llm_resilience.SITE_TIMEOUTS, "test", 0.2)
+    monkeypatch.setitem(llm_resilience.SITE_TIMEOUTS, "test_vision", 1.0)
+    client = FlakyOpenAI(delays=[0.17] * 4)
+    for i in range(4):
+        chat_completion(client, "test_vision", **{**PARAMS, "temperature": i / 10})
+    assert llm_resilience.breaker.state == llm_resilience.CLOSED
+
+
+def test_open_breaker_falls_back_to_the_contextual_hint(monkeypatch):
+    client = FlakyOpenAI()
+    monkeypatch.setattr(generic_engine, "client", client)
+    monkeypatch.setattr(generic_engine, "AI_AVAILABLE", True)
+    monkeypatch.setattr(llm_resilience.breaker, "_state", llm_resilience.OPEN)
+    monkeypatch.setattr(llm_resilience.breaker, "_opened_at", time.monotonic())
+
+    step = {"pregunta": "¿Cuánto es 5 + 3?", "respuesta_esperada": "8", "pista_contextual": "Junta 5 y 3"}
+    hint = generic_engine._generate_hint("María tiene 5 caramelos...", step, "7", 1)
+    assert hint == "💡 Junta 5 y 3"
+    assert client.calls == 0
+
+
+def test_concurrency_is_capped(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(llm_resilience, "QUEUE_TIMEOUT", 0.05)
+    slow = FlakyOpenAI(delays=[0.3])
+    busy = threading.Thread(target=chat_completion, args=(slow, "test"), kwargs=PARAMS)
+    busy.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(llm_resilience.LLMUnavailable):
+            chat_completion(FlakyOpenAI(), "test", **{**PARAMS, "temperature": 0.1})
+    finally:
+        busy.join()
+    assert metrics.LLM_REJECTED.values().get(("test", "saturated"), 0) >= 1
+
+
+def test_hedged_request_wins_over_a_slow_one(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(llm_resilience, "HEDGE_DELAY", 0.05)
+    client = FlakyOpenAI(delays=[1.0])
+    before = metrics.LLM_HEDGED.values().get(("hints_test", "hedge"), 0)
+
+    t0 = time.perf_counter()
+    response = chat_completion(client, "hints_test", **PARAMS)
+    assert response.choices[0].message.content == STUB_HINT
+    assert time.perf_counter() - t0 < 0.5
+    assert metrics.LLM_HEDGED.values()[("hints_test", "hedge")] - before == 1
+
+
+def test_async_callers_do_not_block_the_event_loop(monkeypatch):
+    from logic.ai_reading import text_generator
+
+    monkeypatch.setattr(text_generator, "client", StubOpenAI(latency_ms=300))
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.02)
+
+    async def scenario():
+        await asyncio.gather(text_generator.generate_text_with_gpt4("animales", "3"), ticker())
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    assert ticks[-1] - started < 0.2
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+test_local_solver.py
+--------------------------------------------------
+Resolución local de problemas de una o dos operaciones
+(logic/domains/matematicas/local_solver.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.domains.matematicas import generic_engine, local_solver
+
+
+@pytest.mark.parametrize("problem, operations, final", [
+    ("María tiene 5 caramelos y le dan 3 más. ¿Cuántos tiene ahora?", ["suma"], "8"),
+    ("Juan tiene 15 canicas y pierde 6. ¿Cuántas le quedan?", ["resta"], "9"),
+    ("Hay 4 cajas con 6 lápices cada una. ¿Cuántos lápices hay en total?", ["multiplicacion"], "24"),
+    ("Luis reparte 12 caramelos entre 4 amigos. ¿Cuántos caramelos le tocan a cada uno?", ["division"], "3"),
+    ("En una caja hay 48 huevos. Se rompen 5 y se venden 20. ¿Cuántos huevos quedan?", ["resta", "resta"], "23"),
+    ("En un autobús van 25 personas. En la parada bajan 7 y suben 4. ¿Cuántas personas hay ahora?",
+     ["resta", "suma"], "22"),
+])
+def test_solves_simple_problems(problem, operations, final):
+    result = local_solver.decompose(problem)
+    assert result is not None
+    steps = result["pasos"]
+    assert steps[0]["tipo"] == "comprension"
+    assert [p["operacion"] for p in steps[1:]] == operations
+    assert result["respuesta_final"] == final
+    assert steps[-1]["respuesta_esperada"] == final
+    assert result["confianza"] >= local_solver.MIN_CONFIDENCE
+
+
+def test_decomposition_has_the_prompt_structure():
+    result = local_solver.decompose("Hay 4 cajas con 6 lápices cada una. ¿Cuántos lápices hay en total?")
+    assert set(result) >= {"tipo_problema", "datos", "pasos", "respuesta_final", "unidad"}
+    assert result["datos"]["conocidos"] == ["Hay 4 cajas con 6 lápices cada una"]
+    assert result["unidad"] == "lápices"
+    step = result["pasos"][1]
+    assert step["valores"] == [4, 6]
+    assert "4 × 6" in step["pregunta"] and "4 × 6" in step["pista_contextual"]
+    assert generic_engine._validate_answer("24", step["respuesta_esperada"])
+
+
+@pytest.mark.parametrize("problem", [
+    # Datos escritos con letras, porcentajes y problemas de más de dos operaciones
+    "Tiene dos cajas con 6 lápices. ¿Cuántos lápices hay?",
+    "Una camiseta cuesta 20 euros y tiene un 10% de descuento. ¿Cuánto cuesta?",
+    "Una clase de 24 alumnos va de excursión. El autobús cuesta 360 euros y la entrada al museo "
+    "4 euros por alumno. ¿Cuánto paga cada alumno?",
+    "Ana tiene 3 cromos, Luis 4, Eva 5 y Pablo 6. ¿Cuántos tienen?",
+])
+def test_unsupported_problems_go_to_the_model(problem):
+    assert local_solver.decompose(problem) is None
+
+
+@pytest.mark.parametrize("problem", [
+    # Comparación: Luis tiene 12 - 5, no 12 + 5
+    "Ana tiene 12 caramelos, que son 5 más que Luis. ¿Cuántos caramelos tiene Luis?",
+    # La pregunta pide una división y las pistas apuntan a multiplicar
+    "Hay 24 niños en el patio. Se forman grupos de 4. ¿Cuántos grupos hay?",
+    # "cuesta" no indica multiplicar
+    "Un libro cuesta 12 euros. Pago con 20. ¿Cuánto me devuelven?",
+])
+def test_misleading_cues_are_rejected_even_offline(problem):
+    assert local_solver.analyze(problem) == (None, 0.0)
+    assert local_solver.decompose(problem, local_solver.OFFLINE_MIN_CONFIDENCE) is None
+
+
+def test_weak_cues_only_pass_when_offline():
+    problem = "Ana tiene 12 cromos y Luis 5. ¿Cuántos cromos más tiene Ana?"
+    assert local_solver.decompose(problem) is None
+    result = local_solver.decompose(problem, local_solver.OFFLINE_MIN_CONFIDENCE)
+    assert result["respuesta_final"] == "7"
+
+
+def test_generic_engine_works_without_openai(monkeypatch):
+    monkeypatch.setattr(generic_engine, "AI_AVAILABLE", False)
+    monkeypatch.setattr(generic_engine, "_problem_cache", {})
+    problem = "Juan tiene 15 canicas y pierde 6. ¿Cuántas le quedan?"
+
+    start = generic_engine.handle_step(problem, 0, "", 0)
+    assert start["status"] == "ask" and start["expected_answer"] == "empezar"
+    step = generic_engine.handle_step(problem, 2, "", 0)
+    assert step["expected_answer"] == "9"
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+test_metrics.py
+--------------------------------------------------
+Pruebas de las métricas estilo Prometheus (logic/core/metrics.py).
+"""
+
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.core.metrics import Counter, Histogram
+
+
+def test_counter_sums_shards_from_all_threads():
+    counter = Counter("test_turns_total", "Turnos de prueba", ("engine",))
+
+    def worker():
+        for _ in range(1000):
+            counter.inc("addition_engine")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counter.values()[("addition_engine",)] == 4000
+    assert 'test_turns_total{engine="addition_engine"} 4000' in counter.render()
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("test_latency_seconds", "Latencia de prueba", ("site",), buckets=(0.1, 1.0))
+    hist.observe(0.05, "ai_router")
+    hist.observe(0.5, "ai_router")
+    hist.observe(3.0, "ai_router")
+
+    lines = hist.render()
+    assert 'test_latency_seconds_bucket{site="ai_router",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{site="ai_router",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{site="ai_router",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{site="ai_router"} 3' in lines
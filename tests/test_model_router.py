@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+test_model_router.py
+--------------------------------------------------
+Elección de modelo por tarea según niveles, latencia y carga
+(logic/core/model_router.py).
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.stub_llm import StubOpenAI
+from logic.core import llm_coalesce, llm_resilience, metrics, model_router
+from logic.core.llm_gateway import chat_completion
+
+
+@pytest.fixture(autouse=True)
+def fresh_router(monkeypatch):
+    monkeypatch.setattr(model_router, "MIN_SAMPLES", 5)
+    monkeypatch.setattr(model_router, "PROBE_EVERY", 1000)
+    monkeypatch.setitem(model_router.MODEL_TIERS, "reading_text", ["gpt-4o", "gpt-4o-mini"])
+    model_router.reset()
+    yield
+    model_router.reset()
+
+
+def _observe(site: str, model: str, seconds: float, n: int = 5) -> None:
+    for _ in range(n):
+        model_router.observe(site, model, seconds)
+
+
+def test_call_sites_map_to_tasks():
+    assert model_router.task_for("generic_engine.decompose") == "decompose"
+    assert model_router.task_for("hints_fractions") == "hint"
+    assert model_router.task_for("ai_reading.photo_parser.multi") == "vision"
+    assert model_router.task_for("otro") == "other"
+
+
+def test_preferred_model_while_latency_is_on_target():
+    assert model_router.choose_model("reading_text") == "gpt-4o"
+    _observe("ai_reading.text_generator", "gpt-4o", 3.0)
+    assert model_router.choose_model("reading_text") == "gpt-4o"
+
+
+def test_slow_preferred_model_is_downgraded():
+    _observe("ai_reading.text_generator", "gpt-4o", 40.0)
+    before = metrics.LLM_MODEL_CHOICES.values().get(("reading_text", "gpt-4o-mini", "latency"), 0)
+
+    assert model_router.choose_model("reading_text") == "gpt-4o-mini"
+    assert metrics.LLM_MODEL_CHOICES.values()[("reading_text", "gpt-4o-mini", "latency")] - before == 1
+
+    # Si la reserva también es lenta se queda el más rápido
+    _observe("ai_reading.text_generator", "gpt-4o-mini", 50.0)
+    assert model_router.choose_model("reading_text") == "gpt-4o"
+
+
+def test_old_latencies_expire(monkeypatch):
+    _observe("ai_reading.text_generator", "gpt-4o", 40.0)
+    monkeypatch.setattr(model_router, "MAX_AGE", 0.0)
+    assert model_router.choose_model("reading_text") == "gpt-4o"
+
+
+def test_cheapest_model_under_load(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "in_flight", lambda: llm_resilience.MAX_CONCURRENCY)
+    assert model_router.choose_model("reading_text") == "gpt-4o-mini"
+
+
+def test_gateway_reports_latency_and_cost(monkeypatch):
+    monkeypatch.setattr(llm_coalesce, "COALESCE_ENABLED", False)
+    before = metrics.LLM_COST.values().get(("reading_text", "gpt-4o"), 0)
+    model = model_router.choose_model("reading_text")
+    chat_completion(StubOpenAI(), "ai_reading.text_generator", model=model,
+                    messages=[{"role": "user", "content": "Escribe un texto " * 50}])
+
+    assert metrics.LLM_COST.values()[("reading_text", "gpt-4o")] > before
+    report = model_router.usage_report()["reading_text"]["gpt-4o"]
+    assert report["choices"] >= 1 and report["cost_usd"] > 0
+
+    model_router.observe("hints_division", "gpt-4o-mini", 0.1,
+                         SimpleNamespace(prompt_tokens=1_000_000, completion_tokens=0))
+    assert metrics.LLM_COST.values()[("hint", "gpt-4o-mini")] >= 0.15
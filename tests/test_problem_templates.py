@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+test_problem_templates.py
+--------------------------------------------------
+Plantillas de descomposición de generic_engine
+(logic/domains/matematicas/problem_templates.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db
+from benchmarks.corpus import WORD_PROBLEMS
+from benchmarks.stub_llm import StubOpenAI
+from logic.domains.matematicas import generic_engine, problem_templates
+
+CANDIES = "María tiene 5 caramelos y le dan 3 más. ¿Cuántos tiene ahora?"
+# El nombre también aparece en mitad de una frase: se abstrae
+NAMED = "María tiene 5 caramelos y le dan 3 más. ¿Cuántos tiene María ahora?"
+TRIP = next(p for p in WORD_PROBLEMS if p.startswith("Una clase"))
+
+
+@pytest.fixture(autouse=True)
+def tmp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "templates.db"))
+    db._init()
+
+
+def test_variants_share_the_template_key():
+    original = problem_templates.parse_problem(NAMED)
+    variant = problem_templates.parse_problem("Pablo tiene 12 caramelos y le dan 7 más. ¿Cuántos tiene Pablo ahora?")
+    other = problem_templates.parse_problem("Pablo tiene 12 caramelos y pierde 7. ¿Cuántos tiene Pablo ahora?")
+    assert original.key == variant.key != other.key
+    assert variant.numbers == [12.0, 7.0] and variant.names == ["Pablo"]
+
+
+def test_words_only_capitalized_at_sentence_start_stay_in_the_key():
+    won = problem_templates.parse_problem("Tengo 5 canicas. Gano 3. ¿Cuántas canicas tengo?")
+    lost = problem_templates.parse_problem("Tengo 9 canicas. Pierdo 4. ¿Cuántas canicas tengo?")
+    assert won.names == [] and won.key != lost.key
+    assert problem_templates.parse_problem(CANDIES).names == []
+
+
+def test_verb_swapped_variant_is_not_served_from_the_template():
+    won = "Tengo 5 canicas. Gano 3. ¿Cuántas canicas tengo?"
+    assert problem_templates.remember(won, WORD_PROBLEMS[CANDIES])
+    assert problem_templates.lookup("Tengo 9 canicas. Gano 4. ¿Cuántas canicas tengo?")["respuesta_final"] == "13"
+    assert problem_templates.lookup("Tengo 9 canicas. Pierdo 4. ¿Cuántas canicas tengo?") is None
+
+
+def test_inexact_division_falls_back_to_the_model():
+    problem = "Reparto 12 lápices entre 4 amigos. ¿Cuántos lápices recibe cada uno?"
+    decomposition = {
+        **WORD_PROBLEMS[CANDIES],
+        "pasos": [WORD_PROBLEMS[CANDIES]["pasos"][0], {
+            **WORD_PROBLEMS[CANDIES]["pasos"][1],
+            "operacion": "division", "valores": [12, 4],
+            "pregunta": "¿Cuánto es 12 ÷ 4?", "respuesta_esperada": "3",
+        }],
+        "respuesta_final": "3",
+    }
+    assert problem_templates.remember(problem, decomposition)
+    assert problem_templates.lookup(problem.replace("12", "20"))["respuesta_final"] == "5"
+    assert problem_templates.lookup(problem.replace("12", "13")) is None
+
+
+def test_variant_is_recomputed_locally():
+    assert problem_templates.remember(NAMED, WORD_PROBLEMS[CANDIES])
+
+    result = problem_templates.lookup("Pablo tiene 12 caramelos y le dan 7 más. ¿Cuántos tiene Pablo ahora?")
+    step = result["pasos"][1]
+    assert step["valores"] == [12, 7]
+    assert step["respuesta_esperada"] == "19"
+    assert step["pregunta"] == "¿Cuánto es 12 + 7?"
+    assert result["respuesta_final"] == "19"
+    assert result["datos"]["conocidos"] == ["Pablo tiene 12 caramelos", "Le dan 7 más"]
+    assert "Paso 1" in step["descripcion"]
+
+
+def test_chained_steps_use_previous_results():
+    assert problem_templates.remember(TRIP, WORD_PROBLEMS[TRIP])
+
+    variant = TRIP.replace("24 alumnos", "25 alumnos").replace("360", "300").replace("4 euros", "3 euros")
+    result = problem_templates.lookup(variant)
+    assert [p.get("valores") for p in result["pasos"][1:]] == [[300, 25], [12, 3]]
+    assert [p["respuesta_esperada"] for p in result["pasos"][1:]] == ["12", "15"]
+    assert result["respuesta_final"] == "15"
+
+
+def test_ambiguous_or_wrong_decompositions_are_not_stored():
+    same_numbers = "Ana tiene 4 cromos y le dan 4 más. ¿Cuántos tiene?"
+    assert not problem_templates.remember(same_numbers, WORD_PROBLEMS[CANDIES])
+
+    wrong = {**WORD_PROBLEMS[CANDIES], "respuesta_final": "9"}
+    assert not problem_templates.remember(CANDIES, wrong)
+    assert problem_templates.lookup(CANDIES) is None
+
+
+def test_negative_results_fall_back_to_the_model():
+    problem = "En casa hay un cajón con 8 manteles. Al cabo de unos días se han ensuciado 6 manteles. ¿Cuántos manteles no se han ensuciado?"
+    assert problem_templates.remember(problem, WORD_PROBLEMS[problem])
+    assert problem_templates.lookup(problem.replace("8 manteles", "3 manteles")) is None
+
+
+def test_generic_engine_skips_the_model_for_variants(monkeypatch):
+    stub = StubOpenAI()
+    monkeypatch.setattr(generic_engine, "client", stub)
+    monkeypatch.setattr(generic_engine, "AI_AVAILABLE", True)
+    monkeypatch.setattr(generic_engine, "HINT_PREFETCH_ENABLED", False)
+
+    # Dos pasos encadenados: no lo resuelve local_solver, sí la plantilla
+    generic_engine._decompose_problem(TRIP)
+    assert stub.calls == 1
+    result = generic_engine._decompose_problem(TRIP.replace("360", "480"))
+    assert stub.calls == 1
+    assert result["respuesta_final"] == "24"
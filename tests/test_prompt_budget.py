@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+test_prompt_budget.py
+--------------------------------------------------
+Tamaño de los prompts de OpenAI (benchmarks/prompt_tokens.py) y prefijo
+estable para la caché de prompts del proveedor.
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks import prompt_tokens
+from benchmarks.stub_llm import StubOpenAI
+from logic.core import llm_coalesce, metrics
+from logic.core.llm_gateway import chat_completion
+from logic.domains.matematicas import generic_engine
+
+
+@pytest.mark.parametrize("site", sorted(prompt_tokens.EXAMPLES))
+def test_prompt_stays_within_budget(site):
+    result = prompt_tokens.measure()[site]
+    assert result["tokens"] <= result["budget"], (
+        f"{site}: {result['tokens']} tokens > presupuesto {result['budget']}"
+    )
+
+
+def test_static_instructions_are_a_stable_prefix():
+    first = generic_engine._decomposition_messages("Ana tiene 3 cromos y le dan 2. ¿Cuántos tiene?")
+    second = generic_engine._decomposition_messages("Un tren lleva 120 viajeros y bajan 45. ¿Cuántos quedan?")
+    assert first[0] == second[0]
+    # Los mensajes de sistema no llevan datos de la llamada
+    for site, example in prompt_tokens.EXAMPLES.items():
+        system = example()[0]
+        assert system["role"] == "system", site
+        assert not re.search(r"\{[a-z_]+\}", system["content"]), site
+
+
+def test_usage_is_recorded_per_call(monkeypatch):
+    monkeypatch.setattr(llm_coalesce, "COALESCE_ENABLED", False)
+    before = metrics.LLM_TOKENS.values().get(("budget_test", "prompt"), 0)
+    chat_completion(StubOpenAI(), "budget_test", model="stub",
+                    messages=generic_engine._decomposition_messages("Ana tiene 3 cromos"))
+
+    assert metrics.LLM_TOKENS.values()[("budget_test", "prompt")] > before
+    histogram = metrics.LLM_CALL_TOKENS.values()[("budget_test", "completion")]
+    assert sum(histogram[:-1]) >= 1
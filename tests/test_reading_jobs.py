@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+test_reading_jobs.py
+--------------------------------------------------
+Pruebas del modo asíncrono de /reading/* (logic/ai_reading/reading_jobs.py).
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import HTTPException
+
+import db
+from logic.ai_reading import reading_jobs
+
+
+@pytest.fixture(autouse=True)
+def tmp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "jobs.db"))
+    db._init()
+
+
+def _age(job_id, seconds):
+    with db._conn() as con:
+        con.execute(
+            "UPDATE reading_jobs SET updated_at = datetime('now', ?) WHERE job_id = ?",
+            (f"-{seconds} seconds", job_id)
+        )
+
+
+def _wait_terminal(job_id, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = reading_jobs.get_job(job_id)
+        if job and job["status"] in reading_jobs.TERMINAL_STATUSES:
+            return job
+        time.sleep(0.02)
+    return reading_jobs.get_job(job_id)
+
+
+def test_job_reports_stages_and_result():
+    stages = []
+
+    async def pipeline(progress):
+        progress("generate_text")
+        stages.append(reading_jobs.get_job(job_id)["progress"])
+        progress("save")
+        stages.append(reading_jobs.get_job(job_id)["progress"])
+        return {"exercise_id": "ex-1", "exercise": {"text": "t", "questions": []}, "message": "ok"}
+
+    job_id = reading_jobs.submit("generate", pipeline)
+    job = _wait_terminal(job_id)
+
+    assert job["status"] == "done"
+    assert job["progress"] == 100
+    assert job["exercise_id"] == "ex-1"
+    assert job["result"]["message"] == "ok"
+    assert stages == [0, 66]
+
+
+def test_job_keeps_http_error_status():
+    async def pipeline(progress):
+        raise HTTPException(status_code=400, detail="Nivel no válido")
+
+    job = _wait_terminal(reading_jobs.submit("generate", pipeline))
+
+    assert job["status"] == "error"
+    assert job["error_status"] == 400
+    assert job["error"] == "Nivel no válido"
+
+
+def test_recovery_skips_live_jobs_of_other_workers():
+    db.create_reading_job("own", "generate", reading_jobs._OWNER)
+    db.create_reading_job("other-live", "generate", "otro-host-pid-7")
+    db.create_reading_job("other-stale", "generate", "otro-host-pid-8")
+    _age("other-stale", reading_jobs.JOB_STALE_SECONDS + 60)
+
+    reading_jobs.recover_unfinished()
+
+    assert db.get_reading_job("own")["status"] == "error"
+    assert db.get_reading_job("other-live")["status"] == "queued"
+    assert db.get_reading_job("other-stale")["status"] == "error"
+
+
+def test_stale_job_of_another_worker_fails_when_polled():
+    db.create_reading_job("other", "generate", "otro-host-pid-7")
+    assert reading_jobs.get_job("other")["status"] == "queued"
+
+    _age("other", reading_jobs.JOB_STALE_SECONDS + 60)
+    job = reading_jobs.get_job("other")
+
+    assert job["status"] == "error"
+    assert job["error_status"] == 503
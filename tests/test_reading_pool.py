@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+test_reading_pool.py
+--------------------------------------------------
+Pruebas de la reserva de ejercicios pregenerados (logic/ai_reading/reading_pool.py).
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.ai_reading import reading_pool
+
+
+def _wait_depth(pool, key, expected, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pool.depth()[key] == expected:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_pool_fills_and_refills_below_low_watermark(monkeypatch):
+    generated = []
+
+    async def fake_generate(topic, level):
+        generated.append((topic, level))
+        return {"text": f"texto {len(generated)}", "questions": []}
+
+    monkeypatch.setattr(reading_pool, "generate_exercise", fake_generate)
+    pool = reading_pool.ReadingPool([("espacio", "3")], target=3, low_watermark=2, workers=1)
+    pool.start()
+    try:
+        assert _wait_depth(pool, "espacio/3", 3)
+
+        # 3 → 2: sigue en la marca baja, no se rellena
+        assert pool.take("Espacio", "3")["text"] == "texto 1"
+        time.sleep(0.05)
+        assert pool.depth()["espacio/3"] == 2
+
+        # 2 → 1: por debajo de la marca, se rellena hasta el objetivo
+        pool.take("espacio", "3")
+        assert _wait_depth(pool, "espacio/3", 3)
+        assert len(generated) == 5
+
+        # Clave fuera del catálogo
+        assert pool.take("piratas", "3") is None
+    finally:
+        pool.stop()
+
+
+def test_pool_is_off_unless_enabled(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(reading_pool, "_pool", None)
+
+    assert reading_pool.start_pool() is None
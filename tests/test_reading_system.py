@@ -138,6 +138,34 @@ class TestReadingEngine:
         assert "answer" in exercise["questions"][0]
         assert "type" in exercise["questions"][0]
 
+    def test_stored_exercise_by_reference(self, monkeypatch):
+        """Un ejercicio guardado se resuelve por "reading:<id>" y se parsea una sola vez"""
+        import db
+        from logic.domains.lengua import reading_engine
+
+        exercise = {
+            "text": "Los dinosaurios fueron animales fascinantes que vivieron hace millones de años.",
+            "questions": [
+                {"q": "¿Cuándo vivieron los dinosaurios?", "answer": "Hace millones de años", "type": "detail"}
+            ]
+        }
+        calls = []
+
+        def fake_fetch(exercise_id):
+            calls.append(exercise_id)
+            return exercise
+
+        monkeypatch.setattr(db, "_fetch_reading_exercise", fake_fetch)
+        db.clear_reading_cache()
+
+        ref = reading_engine.reading_ref("abc-123")
+        first = reading_engine.handle_step(ref, 1, "", 0)
+        second = reading_engine.handle_step(ref, 1, "", 0)
+
+        assert first["expected_answer"] == "Hace millones de años"
+        assert second["expected_answer"] == first["expected_answer"]
+        assert calls == ["abc-123"]
+
 
 # Tests de integración (requieren mock de OpenAI)
 # Estos tests se pueden ejecutar manualmente o con mocks
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+test_solve_stream.py
+--------------------------------------------------
+Pruebas del turno de /solve por SSE (POST /solve/stream) y del streaming
+de tokens en logic/core/llm_gateway.py.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import db
+from benchmarks.stub_llm import STUB_HINT, StubOpenAI
+from logic.core.llm_gateway import chat_completion, stream_tokens
+from routes import solve as solve_route
+
+MESSAGES = [{"role": "user", "content": "Dame una pista"}]
+
+
+@pytest.fixture(autouse=True)
+def tmp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "stream.db"))
+    db._init()
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_hint_sites_stream_tokens_to_sink():
+    tokens = []
+    with stream_tokens(tokens.append):
+        response = chat_completion(StubOpenAI(), "hints_fractions", model="stub", messages=MESSAGES)
+    assert len(tokens) > 1
+    assert "".join(tokens) == STUB_HINT
+    assert response.choices[0].message.content == STUB_HINT
+
+
+def test_other_sites_and_calls_without_sink_do_not_stream():
+    tokens = []
+    with stream_tokens(tokens.append):
+        chat_completion(StubOpenAI(), "generic_engine.decompose", model="stub", messages=MESSAGES)
+    response = chat_completion(StubOpenAI(), "hints_fractions", model="stub", messages=MESSAGES)
+    assert tokens == []
+    assert response.choices[0].message.content == STUB_HINT
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def fake_turn(req, emit=solve_route._no_emit):
+        emit("❌ No es exactamente. ")
+        hint = chat_completion(StubOpenAI(), "ai_router", model="stub", messages=MESSAGES)
+        return {
+            "exercise_id": req.exercise_id,
+            "status": "feedback",
+            "message": "❌ No es exactamente. " + hint.choices[0].message.content,
+            "nlu": {"engine": "generic_engine"},
+        }
+
+    monkeypatch.setattr(solve_route, "_solve_turn", fake_turn)
+    app = FastAPI()
+    app.include_router(solve_route.router, prefix="/solve")
+    return TestClient(app)
+
+
+def test_stream_sends_prefix_tokens_and_final_result(client):
+    response = client.post("/solve/stream", json={"question": "3/4 + 1/4", "last_answer": "2"},
+                           headers={"Accept": "text/event-stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _events(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "start" and names[-1] == "result"
+    assert names.count("delta") > 2
+
+    exercise_id = events[0][1]["exercise_id"]
+    result = events[-1][1]
+    assert exercise_id and result["exercise_id"] == exercise_id
+    assert events[1][1]["text"] == "❌ No es exactamente. "
+    streamed = "".join(data["text"] for name, data in events if name == "delta")
+    assert streamed == result["message"]
+
+
+def test_clients_without_event_stream_get_json(client):
+    response = client.post("/solve/stream", json={"question": "3/4 + 1/4", "last_answer": "2"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["status"] == "feedback"
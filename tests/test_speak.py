@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+test_speak.py
+--------------------------------------------------
+Pruebas del endpoint de audio binario (routes/speak.py).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import db
+from modules import audio_utils
+from routes.speak import router
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    def fake_synthesize(clean_text, lang):
+        yield b"ID3"
+        yield clean_text.encode("utf-8")
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "speak.db"))
+    db._init()
+    monkeypatch.setattr(audio_utils, "TTS_CACHE_DIR", str(tmp_path / "tts"))
+    monkeypatch.setattr(audio_utils, "_cache_bytes", None)
+    monkeypatch.setattr(audio_utils, "gTTS", object())
+    monkeypatch.setattr(audio_utils, "_synthesize_stream", fake_synthesize)
+
+    app = FastAPI()
+    app.include_router(router, prefix="/speak")
+    return TestClient(app)
+
+
+def test_streams_then_serves_cached_audio_with_ranges(client):
+    url = client.post("/speak/", json={"message": "✅ ¡Correcto! 👍\n\n🎉 ¡Ejercicio completado!"}).json()["audio_url"]
+
+    streamed = client.get(url)
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"] == "audio/mpeg"
+    assert "accept-ranges" not in streamed.headers
+    assert streamed.headers["cache-control"] == "no-store"
+    assert "etag" not in streamed.headers
+
+    cached = client.get(url)
+    assert cached.content == streamed.content
+    assert "immutable" in cached.headers["cache-control"]
+    assert cached.headers["accept-ranges"] == "bytes"
+    assert cached.headers["content-length"] == str(len(cached.content))
+
+    partial = client.get(url, headers={"Range": "bytes=0-2"})
+    assert partial.status_code == 206
+    assert partial.content == b"ID3"
+    assert partial.headers["content-range"] == f"bytes 0-2/{len(cached.content)}"
+
+    not_modified = client.get(url, headers={"If-None-Match": cached.headers["etag"]})
+    assert not_modified.status_code == 304
+
+
+def test_unknown_audio_and_bad_range(client):
+    assert client.get("/speak/nope.mp3").status_code == 404
+
+    url = client.post("/speak/", json={"message": "Hola"}).json()["audio_url"]
+    client.get(url)
+    assert client.get(url, headers={"Range": "bytes=999-"}).status_code == 416
+
+
+def test_unknown_lang_is_rejected(client):
+    response = client.post("/speak/", json={"message": "Hola", "lang": "../../etc"})
+
+    assert response.status_code == 400
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+test_text_dedup.py
+--------------------------------------------------
+Pruebas de la reutilización de preguntas para textos repetidos
+(logic/ai_reading/text_dedup.py).
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import db
+from logic.ai_reading import text_dedup
+
+TEXT = (
+    "Los dinosaurios fueron reptiles que dominaron la Tierra durante más de ciento sesenta "
+    "millones de años. Algunos eran enormes y comían plantas, como el diplodocus, mientras "
+    "que otros, como el tiranosaurio, eran feroces cazadores. Hace sesenta y seis millones "
+    "de años un meteorito chocó contra el planeta y cambió el clima para siempre."
+)
+QUESTIONS = [{"q": "¿Qué comía el diplodocus?", "answer": "Plantas", "type": "detail"}]
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "dedup.db"))
+    db._init()
+
+
+def _generate_counter(calls):
+    async def generate():
+        calls.append(1)
+        return QUESTIONS
+    return generate
+
+
+def test_normalize_ignores_case_accents_and_punctuation():
+    assert text_dedup.normalize_text("¡Había  una VEZ, un niño!") == "habia una vez un niño"
+
+
+def test_same_text_reuses_questions_without_generating():
+    calls = []
+    first = asyncio.run(text_dedup.reuse_or_generate(TEXT, None, "3", _generate_counter(calls)))
+    second = asyncio.run(text_dedup.reuse_or_generate(TEXT.upper(), None, "3", _generate_counter(calls)))
+
+    assert first == second == QUESTIONS
+    assert calls == [1]
+
+
+def test_ocr_noise_still_matches():
+    text_dedup.remember(TEXT, None, "3", QUESTIONS)
+    noisy = TEXT.replace("dinosaurios", "dinosaurlos").replace("planeta", "pla neta")
+
+    assert text_dedup.find(noisy, None, "3") == QUESTIONS
+
+
+def test_different_scope_or_text_does_not_match():
+    text_dedup.remember(TEXT, None, "3", QUESTIONS)
+    own_questions = [{"q": "¿Cuándo chocó el meteorito?", "answer": "", "type": "detail"}]
+
+    assert text_dedup.find(TEXT, None, "5") is None
+    assert text_dedup.find(TEXT, own_questions, "3") is None
+    assert text_dedup.find("Había una vez un pequeño pueblo junto al mar donde vivían pescadores.", None, "3") is None
+
+
+def test_ocr_noise_in_user_questions_still_matches():
+    text_dedup.remember(TEXT, QUESTIONS, "3", QUESTIONS)
+    noisy_text = TEXT.replace("planeta", "pla neta")
+    noisy_questions = [{"q": "¿Qué comia el diplodocus ?", "answer": "", "type": "detail"}]
+    other_questions = [{"q": "¿Qué comía el tiranosaurio?", "answer": "", "type": "detail"}]
+
+    assert text_dedup.find(noisy_text, noisy_questions, "3") == QUESTIONS
+    assert text_dedup.find(noisy_text, other_questions, "3") is None
+
+
+def test_answerless_result_is_not_reused():
+    calls = []
+    unanswered = [{"q": "¿Qué comía el diplodocus?", "answer": "", "type": "detail"}]
+
+    async def generate():
+        calls.append(1)
+        return unanswered
+
+    first = asyncio.run(text_dedup.reuse_or_generate(TEXT, unanswered, "3", generate))
+    second = asyncio.run(text_dedup.reuse_or_generate(TEXT, unanswered, "3", generate))
+
+    assert first == second == unanswered
+    assert calls == [1, 1]
+
+
+def test_custom_validator_rejects_result_before_caching():
+    calls = []
+    asyncio.run(text_dedup.reuse_or_generate(TEXT, None, "3", _generate_counter(calls), validate=lambda q: False))
+    asyncio.run(text_dedup.reuse_or_generate(TEXT, None, "3", _generate_counter(calls)))
+
+    assert calls == [1, 1]
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+test_timing.py
+--------------------------------------------------
+Pruebas del desglose de latencias por etapa (logic/core/timing.py).
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from logic.core import timing
+
+
+def test_spans_accumulate_per_request():
+    timing.reset()
+    token = timing.start_request()
+    with timing.span("nlu"):
+        pass
+    with timing.span("db"):
+        pass
+    with timing.span("db"):
+        pass
+    timing.set_label("engine", "addition_engine")
+    result = timing.finish_request(token)
+
+    assert result.stages["db"][1] == 2
+    header = result.server_timing_header()
+    assert header.startswith("nlu;dur=")
+    assert "total;dur=" in header
+
+    summary = timing.latency_summary()
+    assert summary["db"]["addition_engine"]["count"] == 1
+    assert summary["total"]["addition_engine"]["count"] == 1
+
+
+def test_span_outside_request_goes_to_histogram():
+    timing.reset()
+
+    @timing.timed("db")
+    def fake_query():
+        return 42
+
+    assert fake_query() == 42
+    assert timing.latency_summary()["db"][timing.NO_ENGINE]["count"] == 1
+
+
+def test_percentiles_are_ordered():
+    timing.reset()
+    for ms in range(1, 101):
+        timing._observe("engine", "x", float(ms))
+    stats = timing.latency_summary()["engine"]["x"]
+    assert stats["p50"] == 50.0
+    assert stats["p95"] == 95.0
+    assert stats["p99"] == 99.0
+
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+test_uploads.py
+--------------------------------------------------
+Pruebas de la recepción de fotos por streaming (logic/core/uploads.py).
+"""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from logic.core import uploads
+
+
+def test_spool_upload_rewinds_and_enforces_limit():
+    payload = os.urandom(200_000)
+
+    spooled = asyncio.run(uploads.spool_upload(UploadFile(io.BytesIO(payload)), max_bytes=300_000))
+    with spooled:
+        assert spooled.read() == payload
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(uploads.spool_upload(UploadFile(io.BytesIO(payload)), max_bytes=100_000))
+    assert exc.value.status_code == 413
+
+
+def test_decode_base64_by_chunks():
+    payload = os.urandom(150_001)
+    encoded = "data:image/png;base64," + base64.b64encode(payload).decode()
+
+    with uploads.decode_base64(encoded) as spooled:
+        assert spooled.read() == payload
+
+    with pytest.raises(HTTPException):
+        uploads.decode_base64(encoded, max_bytes=1000)
+
+
+def test_middleware_rejects_oversized_bodies(monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_BYTES", 1000)
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_FILES", 1)
+
+    app = FastAPI()
+    app.add_middleware(uploads.UploadLimitMiddleware)
+
+    @app.post("/analyze/image")
+    async def echo(file: UploadFile):
+        return {"size": len(await file.read())}
+
+    client = TestClient(app)
+    ok = client.post("/analyze/image", files={"file": ("a.jpg", b"x" * 500, "image/jpeg")})
+    too_big = client.post("/analyze/image", files={"file": ("a.jpg", b"x" * 200_000, "image/jpeg")})
+
+    assert ok.status_code == 200
+    assert too_big.status_code == 413